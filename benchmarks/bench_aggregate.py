@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""
+Benchmark of FileStorage.avg()
+
+Times the average price_by_night per city computed over the columns
+against a loop over every Place instance, for a growing number of Place
+instances. Run from the repository root with:
+    python3 -m benchmarks.bench_aggregate [count ...]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+from benchmarks.bench_reload import make_place
+from models.engine.file_storage import FileStorage
+
+
+def scan(storage):
+    """Returns the average price_by_night per city_id, building every
+    Place
+    """
+    groups = {}
+    for obj in storage.all("Place").values():
+        group = groups.setdefault(obj.city_id, [0, 0])
+        group[0] += 1
+        group[1] += obj.price_by_night
+    return {city_id: total / count
+            for city_id, (count, total) in groups.items()}
+
+
+def bench(count, repeat=5):
+    """Returns the time in seconds of one scan and of one aggregate
+    over the columns of count Places
+    """
+    objects_dict = {}
+    for i in range(count):
+        place = make_place(i)
+        place["city_id"] = f"city-{i % 100}"
+        objects_dict[f"Place.{place['id']}"] = place
+    with open("file.json", "w", encoding="utf-8") as json_file:
+        json.dump(objects_dict, json_file)
+
+    FileStorage._FileStorage__objects = {}
+    storage = FileStorage()
+    storage.reload()
+    storage.avg("Place", "price_by_night", by="city_id")
+    start = time.perf_counter()
+    for _ in range(repeat):
+        averages = storage.avg("Place", "price_by_night", by="city_id")
+    columns = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        expected = scan(storage)
+    scanned = (time.perf_counter() - start) / repeat
+    FileStorage._FileStorage__objects = {}
+    assert averages == expected
+    return scanned, columns
+
+
+def main(counts):
+    """Prints the aggregate times for each object count"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            print(f"{'objects':>10} {'scan ms':>10} {'columns ms':>10}")
+            for count in counts:
+                scanned, columns = bench(count)
+                print(f"{count:>10} {scanned * 1000:>10.3f} "
+                      f"{columns * 1000:>10.3f}")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+Benchmark of FileStorage.reload() with the Places split in buckets
+
+Times the reload of a growing number of Place instances kept in
+sharded files, in one shard and in BUCKETS buckets decoded by one
+process or by one process per CPU. Run from the repository root with:
+    python3 -m benchmarks.bench_buckets [count ...]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+from unittest.mock import patch
+from benchmarks.bench_reload import make_place
+from models.place import Place
+from models.engine.file_storage import FileStorage
+
+BUCKETS = 8
+
+
+def bench(count, buckets, workers):
+    """Returns the time in seconds to reload count Places written in
+    buckets files, decoded by workers processes
+    """
+    objects = {}
+    for i in range(count):
+        place = make_place(i)
+        objects[f"Place.{place['id']}"] = Place(**place)
+    with patch.object(FileStorage, "sharded", True), \
+            patch.object(FileStorage, "BUCKETS", {"Place": buckets}), \
+            patch.object(FileStorage, "WORKERS", workers):
+        FileStorage._FileStorage__objects = objects
+        FileStorage().save()
+        FileStorage._FileStorage__objects = {}
+        start = time.perf_counter()
+        FileStorage().reload()
+        elapsed = time.perf_counter() - start
+    FileStorage._FileStorage__objects = {}
+    shutil.rmtree("data")
+    return elapsed
+
+
+def main(counts):
+    """Prints the reload time for each object count"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            print(f"{os.cpu_count()} CPUs, {BUCKETS} buckets")
+            print(f"{'objects':>10} {'1 shard s':>10} {'serial s':>10} "
+                  f"{'parallel s':>10}")
+            for count in counts:
+                print(f"{count:>10} {bench(count, 0, 1):>10.3f} "
+                      f"{bench(count, BUCKETS, 1):>10.3f} "
+                      f"{bench(count, BUCKETS, None):>10.3f}")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
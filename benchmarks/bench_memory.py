@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+"""
+Benchmark of the memory held by the models
+
+Measures with tracemalloc the memory of a growing number of Place
+instances built from their dictionaries, with the regular model and with
+its compact version. Run from the repository root with:
+    python3 -m benchmarks.bench_memory [count ...]
+"""
+import sys
+import tracemalloc
+from benchmarks.bench_reload import make_place
+from models.place import Place
+from models.compact import compact
+
+
+def measure(model, records):
+    """Returns the number of bytes allocated to build an instance of
+    model from each of records
+    """
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    objects = [model(**record) for record in records]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def main(counts):
+    """Prints the memory per instance for each object count"""
+    print(f"{'objects':>10} {'regular B':>10} {'compact B':>10} "
+          f"{'saved':>8}")
+    for count in counts:
+        records = [make_place(i) for i in range(count)]
+        regular = measure(Place, records)
+        compacted = measure(compact(Place), records)
+        print(f"{count:>10} {regular / count:>10.0f} "
+              f"{compacted / count:>10.0f} "
+              f"{1 - compacted / regular:>8.0%}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""
+Benchmark of HBNBCommand.precmd()
+
+Counts the console lines turned into commands per second, against the
+previous implementation trying five regular expressions in turn. Run
+from the repository root with:
+    python3 -m benchmarks.bench_precmd [count]
+"""
+import re
+import sys
+import time
+from console import HBNBCommand
+
+
+LINES = [
+    'create User',
+    'User.count()',
+    'User.show("0d9c9ae4-4a2f-4bd2-9d4a-0e6f1f2d6b8b")',
+    'User.update("0d9c9ae4-4a2f-4bd2-9d4a-0e6f1f2d6b8b", "name", "Ada")',
+    'User.update("0d9c9ae4-4a2f-4bd2-9d4a-0e6f1f2d6b8b", "age", 89)',
+    'User.update("0d9c9ae4-4a2f-4bd2-9d4a-0e6f1f2d6b8b", {"age": 89})',
+    ]
+
+REGEX = [
+    r'^(\w+)\.(\w+)\(\)$',
+    r'^(\w+)\.(\w+)\("([^"|.]*?)"\)$',
+    r'^(\w+)\.(\w+)\("(.*?)",\s"(.*?)",\s(".*?")\)$',
+    r'^(\w+)\.(\w+)\("(.*?)",\s"(.*?)",\s([0-9].*?)\)$',
+    r'^(\w+)\.(\w+)\("(.*?)",\s(\{.*?\})\)$'
+    ]
+
+
+def regex_precmd(line):
+    """Returns line parsed as the console did before DOT_CALL"""
+    match = None
+    i = 0
+    while not match and i < len(REGEX):
+        match = re.match(REGEX[i], line)
+        i += 1
+    if match:
+        m_list = list(match.groups())
+        m_list[0], m_list[1] = m_list[1], m_list[0]
+        line = " ".join(m_list)
+    return line
+
+
+def bench(precmd, count):
+    """Returns the number of lines parsed per second by precmd"""
+    lines = LINES * (count // len(LINES))
+    start = time.perf_counter()
+    for line in lines:
+        precmd(line)
+    return len(lines) / (time.perf_counter() - start)
+
+
+def main(count):
+    """Prints the lines parsed per second by both implementations"""
+    console = HBNBCommand()
+    for line in LINES:
+        assert console.precmd(line) == regex_precmd(line), line
+    print(f"{'precmd':>12} {'lines/s':>12}")
+    print(f"{'regex list':>12} {bench(regex_precmd, count):>12.0f}")
+    print(f"{'DOT_CALL':>12} {bench(console.precmd, count):>12.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 600000)
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""
+Benchmark of FileStorage.where()
+
+Times a range query on price_by_night and max_guest against a scan of
+every Place, for a growing number of Place instances. Run from the
+repository root with:
+    python3 -m benchmarks.bench_query [count ...]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+from benchmarks.bench_reload import make_place
+from models.engine.file_storage import FileStorage
+
+CONDITIONS = [("price_by_night", "gte", 50), ("price_by_night", "lte", 52),
+              ("max_guest", "gte", 4)]
+
+
+def scan(storage):
+    """Returns the keys of the Places matching CONDITIONS, checking
+    every Place
+    """
+    return [key for key, obj in storage.all("Place").items()
+            if 50 <= obj.price_by_night <= 52 and obj.max_guest >= 4]
+
+
+def bench(count, repeat=20):
+    """Returns the time in seconds of one scan and of one indexed query
+    of count Places
+    """
+    objects_dict = {}
+    for i in range(count):
+        place = make_place(i)
+        objects_dict[f"Place.{place['id']}"] = place
+    with open("file.json", "w", encoding="utf-8") as json_file:
+        json.dump(objects_dict, json_file)
+
+    FileStorage._FileStorage__objects = {}
+    storage = FileStorage()
+    storage.reload()
+    storage.where("Place", CONDITIONS)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        expected = scan(storage)
+    scanned = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        keys = list(storage.where("Place", CONDITIONS))
+    indexed = (time.perf_counter() - start) / repeat
+    FileStorage._FileStorage__objects = {}
+    assert sorted(keys) == sorted(expected)
+    return scanned, indexed
+
+
+def main(counts):
+    """Prints the query times for each object count"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            print(f"{'objects':>10} {'scan ms':>10} {'index ms':>10}")
+            for count in counts:
+                scanned, indexed = bench(count)
+                print(f"{count:>10} {scanned * 1000:>10.3f} "
+                      f"{indexed * 1000:>10.3f}")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+"""
+Benchmark of FileStorage.reload()
+
+Times the reload of file.json holding a growing number of Place
+instances, all of them built right away. Run from the repository root
+with:
+    python3 -m benchmarks.bench_reload [count ...]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import tempfile
+from datetime import datetime
+from models.engine.file_storage import FileStorage
+
+
+def make_place(i):
+    """Returns the dictionary of the i-th Place of the benchmark"""
+    now = datetime.now().isoformat()
+    return {"__class__": "Place", "id": str(uuid.uuid4()),
+            "created_at": now, "updated_at": now,
+            "city_id": str(uuid.uuid4()), "user_id": str(uuid.uuid4()),
+            "name": f"Place {i}", "description": "Cozy flat near the sea",
+            "number_rooms": i % 5, "number_bathrooms": i % 3,
+            "max_guest": i % 8, "price_by_night": i % 300,
+            "latitude": 37.77, "longitude": -122.41}
+
+
+def bench(count):
+    """Returns the time in seconds to reload count Places"""
+    objects_dict = {}
+    for i in range(count):
+        place = make_place(i)
+        objects_dict[f"Place.{place['id']}"] = place
+    with open("file.json", "w", encoding="utf-8") as json_file:
+        json.dump(objects_dict, json_file)
+
+    FileStorage._FileStorage__objects = {}
+    FileStorage.lazy = False
+    start = time.perf_counter()
+    FileStorage().reload()
+    elapsed = time.perf_counter() - start
+    FileStorage._FileStorage__objects = {}
+    return elapsed
+
+
+def main(counts):
+    """Prints the reload time for each object count"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            print(f"{'objects':>10} {'seconds':>10} {'objects/s':>12}")
+            for count in counts:
+                elapsed = bench(count)
+                print(f"{count:>10} {elapsed:>10.3f} {count / elapsed:>12.0f}")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
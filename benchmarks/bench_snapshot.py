@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+"""
+Benchmark of FileStorage.reload() from a binary snapshot
+
+Times the reload of a growing number of Place instances from file.json,
+building every instance with all(), and from the marshal snapshot
+written when FileStorage.binary is set. Run from the repository root
+with:
+    python3 -m benchmarks.bench_snapshot [count ...]
+"""
+import os
+import sys
+import time
+import tempfile
+from unittest.mock import patch
+from benchmarks.bench_reload import make_place
+from models.place import Place
+from models.engine.file_storage import FileStorage
+
+
+def bench(count, binary):
+    """Returns the time in seconds to reload count Places and build
+    their instances, and the size in bytes of the file read
+    """
+    objects = {}
+    for i in range(count):
+        place = make_place(i)
+        objects[f"Place.{place['id']}"] = Place(**place)
+    with patch.object(FileStorage, "binary", binary):
+        FileStorage._FileStorage__objects = objects
+        FileStorage().save()
+        del objects
+        FileStorage._FileStorage__objects = {}
+        start = time.perf_counter()
+        FileStorage().reload()
+        FileStorage().all()
+        elapsed = time.perf_counter() - start
+    FileStorage._FileStorage__objects = {}
+    fname = "file.bin" if binary else "file.json"
+    size = os.path.getsize(fname)
+    os.remove(fname)
+    return elapsed, size
+
+
+def main(counts):
+    """Prints the reload time and file size for each object count"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            print(f"{'objects':>10} {'json s':>8} {'binary s':>9} "
+                  f"{'speedup':>8} {'json MB':>8} {'binary MB':>10}")
+            for count in counts:
+                json_time, json_size = bench(count, False)
+                binary_time, binary_size = bench(count, True)
+                print(f"{count:>10} {json_time:>8.3f} {binary_time:>9.3f} "
+                      f"{json_time / binary_time:>7.1f}x "
+                      f"{json_size / 1e6:>8.1f} {binary_size / 1e6:>10.1f}")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -1,40 +1,65 @@
 #!/usr/bin/python3
 """Contains the entry point of the command interpreter"""
+import io
+import os
 import re
+import sys
 import cmd
+import csv
 import json
+import math
+import time
+import uuid
+from contextlib import redirect_stdout
+from datetime import datetime
 from models import storage, MODELS
 
 
-regex = [
-    r'^(\w+)\.(\w+)\(\)$',
-    r'^(\w+)\.(\w+)\("([^"|.]*?)"\)$',
-    r'^(\w+)\.(\w+)\("(.*?)",\s"(.*?)",\s(".*?")\)$',
-    r'^(\w+)\.(\w+)\("(.*?)",\s"(.*?)",\s([0-9].*?)\)$',
-    r'^(\w+)\.(\w+)\("(.*?)",\s(\{.*?\})\)$'
-    ]
+DOT_CALL = re.compile(r'(\w+)\.(\w+)\((.*?)\)((?:\.\w+\(.*?\))*)$')
+CHAIN = re.compile(r'\.(\w+)\((.*?)\)')
+ARGUMENT = re.compile(r'\s*("[^"]*"|\{.*\}|[^,]*?)\s*(?:,|$)')
+TERM = re.compile(r'\s*(\w+)=("[^"]*"|[^\s"]*)\s*')
 
 
 class HBNBCommand(cmd.Cmd):
     """Represents the console"""
     prompt = "(hbnb) "
+    BUFFER_SIZE = 1 << 16
 
     def precmd(self, line):
-        """Excuted just before the comand line is interpreted"""
-        match = None
-        i = 0
-        while not match and i < len(regex):
-            match = re.match(regex[i], line)
-            i += 1
+        """Excuted just before the comand line is interpreted
 
+        Turns <class>.<command>(<args>) into <command> <class> <args>,
+        removing the quotes of the first two arguments. Each chained
+        .<name>(<args>) call is added as <name>=<args>, its arguments
+        unquoted and joined by commas.
+        """
+        match = DOT_CALL.match(line)
         if match:
-            m_list = list(match.groups())
-            tmp = m_list[0]
-            m_list[0] = m_list[1]
-            m_list[1] = tmp
-            line = " ".join(m_list)
+            _class_, command, args, chain = match.groups()
+            words = [command, _class_]
+            for word in self.__arguments(args):
+                if len(words) < 4 and word[:1] == '"' == word[-1:]:
+                    word = word[1:-1]
+                words.append(word)
+            for name, args in CHAIN.findall(chain):
+                values = [word[1:-1] if word[:1] == '"' == word[-1:]
+                          else word for word in self.__arguments(args)]
+                words.append(f"{name}={','.join(values)}")
+            line = " ".join(words)
         return cmd.Cmd.precmd(self, line)
 
+    @staticmethod
+    def __arguments(args):
+        """Returns the list of the comma separated arguments in args"""
+        words = []
+        pos = 0
+        while pos < len(args):
+            arg = ARGUMENT.match(args, pos)
+            pos = arg.end()
+            words.append(arg.group(1))
+        return words
+
     def do_create(self, line):
         """Creates a new instance of a Model"""
         if not line:
@@ -57,10 +82,10 @@ class HBNBCommand(cmd.Cmd):
             print("** class doesn't exist **")
         elif len(args) < 2:
             print("** instance id missing **")
-        elif f"{args[0]}.{args[1]}" not in storage.all():
+        elif storage.get(args[0], args[1]) is None:
             print("** no instance found **")
         else:
-            print(storage.all()[f"{args[0]}.{args[1]}"])
+            print(storage.get(args[0], args[1]))
 
     def do_destroy(self, line):
         """Deletes an instance based on the class name and id"""
@@ -71,10 +96,10 @@ class HBNBCommand(cmd.Cmd):
             print("** class doesn't exist **")
         elif len(args) < 2:
             print("** instance id missing **")
-        elif f"{args[0]}.{args[1]}" not in storage.all():
+        elif storage.get(args[0], args[1]) is None:
             print("** no instance found **")
         else:
-            del storage.all()[f"{args[0]}.{args[1]}"]
+            storage.delete(storage.get(args[0], args[1]))
             storage.save()
 
     def do_all(self, line):
@@ -87,9 +112,8 @@ class HBNBCommand(cmd.Cmd):
                 objs_str.append(str(value))
             print(objs_str)
         elif line in MODELS:
-            for value in storage.all().values():
-                if value.__class__.__name__ == line:
-                    objs_str.append(str(value))
+            for value in storage.all(line).values():
+                objs_str.append(str(value))
             print(objs_str)
         else:
             print("** class doesn't exist **")
@@ -103,14 +127,14 @@ class HBNBCommand(cmd.Cmd):
             print("** class doesn't exist **")
         elif len(args) < 2:
             print("** instance id missing **")
-        elif f"{args[0]}.{args[1]}" not in storage.all():
+        elif storage.get(args[0], args[1]) is None:
             print("** no instance found **")
         elif len(args) < 3:
             print("** attribute name missing **")
         elif len(args) < 4:
             print("** value missing **")
         else:
-            obj = storage.all()[f"{args[0]}.{args[1]}"]
+            obj = storage.get(args[0], args[1])
             if "{" in args[2]:
                 attrs = " ".join(args[2:]).replace("'", '"')
                 try:
@@ -121,47 +145,373 @@ class HBNBCommand(cmd.Cmd):
                 except json.decoder.JSONDecodeError:
                     pass
                 return False
-            name = args[2]
-            value = args[3]
+            setattr(obj, args[2], self.__parse_value(args[3]))
+            obj.save()
+
+    @staticmethod
+    def __parse_value(value):
+        """Returns value as an int, a float or an unquoted string"""
+        if value.isdigit():
+            return int(value)
+        if value[:1] == '"' == value[-1:]:
+            return value[1:-1]
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+    def do_count(self, line):
+        """Retrieves the number of instances of a class, or of each value
+        of an attribute: count [<class> [by=<name>]]
+        """
+        args = line.split()
+        by = self.__group(args)
+        if not args and by is None:
+            print(storage.count())
+        elif not args:
+            print("** class name missing **")
+        elif len(args) > 1 or args[0] not in MODELS:
+            print("** class doesn't exist **")
+        else:
+            print(storage.count(args[0], by))
+
+    def do_stats(self, line):
+        """Prints the count, sum, average, minimum and maximum of a
+        numeric attribute of the instances of a class, or of each value
+        of another attribute: stats <class> <name> [by=<name>]
+        """
+        args = line.split()
+        by = self.__group(args)
+        if not args:
+            print("** class name missing **")
+        elif args[0] not in MODELS:
+            print("** class doesn't exist **")
+        elif len(args) < 2:
+            print("** attribute name missing **")
+        else:
+            print(storage.stats(args[0], args[1], by))
+
+    @staticmethod
+    def __group(args):
+        """Removes the trailing by=<name> argument of args, returning the
+        name or None
+        """
+        if args and re.fullmatch(r'by=("?)\w+\1', args[-1]):
+            return args.pop()[3:].strip('"')
+        return None
 
-            if value.isdigit():
-                value = int(value)
-            elif (value[0] == '"' and value[-1] == '"'):
-                value = value[1:-1]
+    def do_where(self, line):
+        """Prints the instances of a class matching conditions:
+        where <class> [<name>[__<operator>]=<value> ...]
+        [limit=<n>] [select=<name>,...]
+        The operators are eq (default), ne, lt, lte, gt, gte and contains.
+        """
+        _class_, _, terms = line.strip().partition(" ")
+        if not _class_:
+            print("** class name missing **")
+            return
+        if _class_ not in MODELS:
+            print("** class doesn't exist **")
+            return
+        conditions, limit, names = [], None, None
+        pos = 0
+        terms = terms.strip()
+        while pos < len(terms):
+            term = TERM.match(terms, pos)
+            if term is None:
+                print(f"** invalid condition {terms[pos:].split()[0]} **")
+                return
+            pos = term.end()
+            name, value = term.groups()
+            if name == "limit":
+                if not value.isdigit():
+                    print("** invalid limit **")
+                    return
+                limit = int(value)
+            elif name == "select":
+                names = [name for name in value.split(",") if name]
             else:
+                name, sep, op = name.rpartition("__")
+                if not sep:
+                    name, op = op, "eq"
+                if op not in storage.OPERATORS:
+                    print(f"** unknown operator {op} **")
+                    return
+                conditions.append((name, op, self.__parse_value(value)))
+        objs = storage.where(_class_, conditions, limit).values()
+        if names is None:
+            print([str(obj) for obj in objs])
+            return
+        rows = []
+        for obj in objs:
+            record = obj.to_dict()
+            row = {"id": obj.id}
+            for name in names:
+                row[name] = record.get(name, getattr(obj, name, None))
+            rows.append(row)
+        print(rows)
+
+    def do_search(self, line):
+        """Prints the instances of a class containing the given words,
+        the most relevant first: search <class> <words> [limit=<n>]
+        A word ending with * matches every word starting with it.
+        """
+        args = line.split()
+        limit = None
+        if args and re.fullmatch(r"limit=\d+", args[-1]):
+            limit = int(args.pop()[6:])
+        if not args:
+            print("** class name missing **")
+        elif args[0] not in MODELS:
+            print("** class doesn't exist **")
+        elif len(args) < 2:
+            print("** words missing **")
+        else:
+            objs = storage.search(args[0], " ".join(args[1:]), limit)
+            print([str(obj) for obj in objs.values()])
+
+    def do_near(self, line):
+        """Prints the instances of a class at most a distance away from
+        a point, nearest first: near <class> <latitude> <longitude> <km>
+        """
+        args = line.split()
+        numbers = self.__coordinates(args, 3)
+        if numbers is not None:
+            objs = storage.near(args[0], *numbers).values()
+            print([str(obj) for obj in objs])
+
+    def do_within(self, line):
+        """Prints the instances of a class inside a box:
+        within <class> <south> <west> <north> <east>
+        """
+        args = line.split()
+        numbers = self.__coordinates(args, 4)
+        if numbers is not None:
+            objs = storage.within(args[0], *numbers).values()
+            print([str(obj) for obj in objs])
+
+    @staticmethod
+    def __coordinates(args, count):
+        """Returns the count finite numbers following the class name in
+        args, or None after printing what is wrong
+        """
+        if not args:
+            print("** class name missing **")
+        elif args[0] not in MODELS:
+            print("** class doesn't exist **")
+        elif len(args) != count + 1:
+            print("** invalid coordinates **")
+        else:
+            try:
+                numbers = [float(arg) for arg in args[1:]]
+            except ValueError:
+                numbers = []
+            if numbers and all(map(math.isfinite, numbers)):
+                return numbers
+            print("** invalid coordinates **")
+        return None
+
+    def do_begin(self, line):
+        """Starts a transaction: changes are saved on commit only"""
+        storage.begin()
+
+    def do_commit(self, line):
+        """Saves the changes made since begin"""
+        if not storage.in_batch():
+            print("** no transaction in progress **")
+        else:
+            storage.commit()
+
+    def do_rollback(self, line):
+        """Discards the changes made since begin"""
+        if not storage.in_batch():
+            print("** no transaction in progress **")
+        else:
+            storage.rollback()
+
+    def do_import(self, line):
+        """Creates instances of a class from a JSON lines or CSV file:
+        import <class> <file>
+        """
+        args = line.split(maxsplit=1)
+        if not len(args):
+            print("** class name missing **")
+        elif args[0] not in MODELS:
+            print("** class doesn't exist **")
+        elif len(args) < 2:
+            print("** file name missing **")
+        elif not os.path.isfile(args[1]):
+            print("** file doesn't exist **")
+        else:
+            model = MODELS[args[0]]
+            count = 0
+            with open(args[1], encoding="utf-8", newline="") as data_file:
+                if args[1].endswith(".csv"):
+                    records = self.__read_csv(model, data_file)
+                else:
+                    records = self.__read_json_lines(data_file)
                 try:
-                    value = float(value)
+                    with storage.batch():
+                        now = datetime.now().isoformat()
+                        for record in records:
+                            record.setdefault("id", str(uuid.uuid4()))
+                            record.setdefault("created_at", now)
+                            record.setdefault("updated_at", now)
+                            record["__class__"] = args[0]
+                            storage.new(model(**record))
+                            count += 1
+                except ValueError as error:
+                    print(f"** {error} **")
+                    return False
+            print(count)
+
+    def do_export(self, line):
+        """Writes the instances of a class to a JSON lines or CSV file:
+        export <class> <file>
+        """
+        args = line.split(maxsplit=1)
+        if not len(args):
+            print("** class name missing **")
+        elif args[0] not in MODELS:
+            print("** class doesn't exist **")
+        elif len(args) < 2:
+            print("** file name missing **")
+        else:
+            objs = storage.all(args[0]).values()
+            with open(args[1], "w", encoding="utf-8", newline="") as data_file:
+                if args[1].endswith(".csv"):
+                    self.__write_csv(MODELS[args[0]], objs, data_file)
+                else:
+                    for obj in objs:
+                        data_file.write(json.dumps(obj.to_dict()))
+                        data_file.write("\n")
+            print(len(objs))
+
+    @staticmethod
+    def __read_json_lines(data_file):
+        """Yields the records of a JSON lines file"""
+        for number, line in enumerate(data_file, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.decoder.JSONDecodeError:
+                record = None
+            if not isinstance(record, dict):
+                raise ValueError(f"invalid record on line {number}")
+            yield record
+
+    @staticmethod
+    def __read_csv(model, data_file):
+        """Yields the records of a CSV file, converting the values of the
+        attributes declared by model to the type of their default
+        """
+        defaults = model.defaults()
+        for number, row in enumerate(csv.DictReader(data_file), 2):
+            record = {}
+            for name, value in row.items():
+                if name is None or value in ("", None):
+                    continue
+                default = defaults.get(name)
+                try:
+                    if isinstance(default, (int, float)):
+                        value = type(default)(value)
+                    elif isinstance(default, list):
+                        value = json.loads(value)
                 except ValueError:
-                    pass
-            setattr(obj, name, value)
-            obj.save()
+                    raise ValueError(f"invalid {name} on line {number}")
+                record[name] = value
+            yield record
 
-    def do_count(self, line):
-        """Retrieves the number of instances of a class"""
-        count = 0
-        if not line:
-            print(len(storage.all()))
-        elif line in MODELS:
-            for value in storage.all().values():
-                if value.__class__.__name__ == line:
-                    count += 1
-            print(count)
+    @staticmethod
+    def __write_csv(model, objs, data_file):
+        """Writes the dictionaries of objs to a CSV file"""
+        names = {"id": None, "created_at": None, "updated_at": None}
+        names.update(dict.fromkeys(model.defaults()))
+        for obj in objs:
+            names.update(dict.fromkeys(obj.to_dict()))
+        names.pop("__class__", None)
+        writer = csv.DictWriter(data_file, names)
+        writer.writeheader()
+        for obj in objs:
+            row = obj.to_dict()
+            del row["__class__"]
+            for name, value in row.items():
+                if isinstance(value, (list, dict)):
+                    row[name] = json.dumps(value)
+            writer.writerow(row)
+
+    def default(self, line):
+        """Prints the instances related to an instance, such as the
+        reviews of a place: reviews Place <id>
+        """
+        args = line.split()
+        if (len(args) < 2 or args[1] not in MODELS or
+                args[0] not in storage.RELATIONS.get(args[1], {})):
+            return cmd.Cmd.default(self, line)
+        if len(args) < 3:
+            print("** instance id missing **")
+        elif storage.get(args[1], args[2]) is None:
+            print("** no instance found **")
         else:
-            print("** class doesn't exist **")
+            objs = storage.related(args[1], args[2], args[0]).values()
+            print([str(obj) for obj in objs])
 
     def emptyline(self):
         """Define what happens when line is empty"""
         pass
 
     def do_quit(self, line):
-        """Exits the console"""
+        """Exits the console, writing the saved changes"""
+        if not storage.in_batch():
+            storage.close()
         return True
 
     def do_EOF(self, line):
-        """Exits the console"""
+        """Exits the console, writing the saved changes"""
         print()
+        if not storage.in_batch():
+            storage.close()
         return True
 
+    def run_batch(self, lines):
+        """Runs the commands of lines in one storage batch, writing their
+        output BUFFER_SIZE characters at a time, until quit
+
+        Returns the number of commands run.
+        """
+        count = 0
+        stdout = sys.stdout
+        console_stdout = self.stdout
+        buffer = io.StringIO()
+        self.stdout = buffer
+        try:
+            with redirect_stdout(buffer), storage.batch():
+                for line in lines:
+                    count += 1
+                    if self.onecmd(self.precmd(line.rstrip("\r\n"))):
+                        break
+                    if buffer.tell() >= self.BUFFER_SIZE:
+                        stdout.write(buffer.getvalue())
+                        buffer.seek(0)
+                        buffer.truncate()
+        finally:
+            self.stdout = console_stdout
+            stdout.write(buffer.getvalue())
+        return count
+
 
 if __name__ == '__main__':
-    HBNBCommand().cmdloop()
+    if len(sys.argv) == 3 and sys.argv[1] == "--batch":
+        start = time.perf_counter()
+        if sys.argv[2] == "-":
+            count = HBNBCommand().run_batch(sys.stdin)
+        else:
+            with open(sys.argv[2], encoding="utf-8") as script:
+                count = HBNBCommand().run_batch(script)
+        elapsed = time.perf_counter() - start
+        print(f"{count} commands in {elapsed:.3f}s "
+              f"({count / max(elapsed, 1e-9):.0f} commands/s)",
+              file=sys.stderr)
+    else:
+        HBNBCommand().cmdloop()
@@ -1,18 +1,17 @@
 #!/usr/bin/python3
 """Configures the models package."""
+from os import getenv
 from .city import City
 from .user import User
 from .place import Place
 from .state import State
 from .review import Review
 from .amenity import Amenity
+from .compact import compact
 from .base_model import BaseModel
 from .engine.file_storage import FileStorage
 
 
-storage = FileStorage()
-storage.reload()
-
 MODELS = {
         "City": City,
         "User": User,
@@ -22,3 +21,22 @@ MODELS = {
         "Amenity": Amenity,
         "BaseModel": BaseModel,
         }
+
+if getenv("HBNB_COMPACT_MODELS") == "1":
+    for name, model in MODELS.items():
+        MODELS[name] = FileStorage.MODELS[name] = compact(model)
+
+if getenv("HBNB_TYPE_STORAGE") == "db":
+    from .engine.db_storage import DBStorage
+    storage = DBStorage(getenv("HBNB_DB_PATH", "hbnb.db"))
+else:
+    storage = FileStorage()
+    FileStorage.journal = getenv("HBNB_STORAGE_JOURNAL") == "1"
+    FileStorage.write_behind = getenv("HBNB_STORAGE_WRITE_BEHIND") == "1"
+    FileStorage.sharded = getenv("HBNB_STORAGE_SHARDS") == "1"
+    FileStorage.binary = getenv("HBNB_STORAGE_BINARY") == "1"
+    FileStorage.lazy = getenv("HBNB_STORAGE_LAZY") == "1"
+    buckets = int(getenv("HBNB_STORAGE_BUCKETS", "0"))
+    if buckets:
+        FileStorage.BUCKETS = {"Place": buckets, "Review": buckets}
+storage.reload()
@@ -8,38 +8,84 @@ from datetime import datetime
 class BaseModel:
     """Represent the base class"""
 
+    DATETIME_FIELDS = ("created_at", "updated_at")
+
     def __init__(self, *args, **kwargs):
-        """Initializes the an instance of BaseModel"""
+        """Initializes the an instance of BaseModel
+
+        Only the attributes listed in DATETIME_FIELDS are decoded from
+        their ISO format, the other ones are set as they are, the lists
+        being copied.
+        """
         if kwargs:
-            date_format = "%Y-%m-%dT%H:%M:%S.%f"
+            attributes = {}
             for key, value in kwargs.items():
-                if key != "__class__":
+                if key in self.DATETIME_FIELDS and isinstance(value, str):
                     try:
-                        value = datetime.strptime(str(value), date_format)
+                        value = datetime.fromisoformat(value)
                     except ValueError:
                         pass
-                    setattr(self, key, value)
+                elif isinstance(value, list):
+                    value = list(value)
+                attributes[key] = value
+            attributes.pop("__class__", None)
+            self._assign(attributes)
         else:
             self.id = str(uuid.uuid4())
             self.created_at = self.updated_at = datetime.now()
             models.storage.new(self)
 
+    @classmethod
+    def defaults(cls):
+        """Returns a dictionary of the attributes declared by the class
+        with their default value
+        """
+        defaults = {}
+        for klass in reversed(cls.__mro__):
+            for name, value in vars(klass).items():
+                if (not name.startswith("_") and not name.isupper() and
+                        not callable(value) and
+                        not isinstance(value, (classmethod, staticmethod))):
+                    defaults[name] = getattr(cls, name)
+        return defaults
+
+    def __setattr__(self, name, value):
+        """Sets an attribute and marks the instance as changed in storage
+
+        Changes made in place to a mutable attribute are not tracked
+        until the next save() of the instance.
+        """
+        models.storage.touch(self, name, value)
+        super().__setattr__(name, value)
+
+    def _assign(self, attributes):
+        """Sets the attributes of the dictionary attributes, without
+        marking the instance as changed
+        """
+        self.__dict__.update(attributes)
+
+    def _attributes(self):
+        """Returns a dictionary of the attributes set on the instance"""
+        return self.__dict__
+
     def save(self):
         """Updates the updated_at attribute with the current time"""
         self.updated_at = datetime.now()
         models.storage.save()
 
     def to_dict(self):
-        """Returns a dictionary of the instance"""
-        attributes = self.__dict__.copy()
+        """Returns a dictionary of the instance, with copies of its lists"""
+        attributes = self._attributes().copy()
         attributes["__class__"] = type(self).__name__
 
         for key, value in attributes.items():
             if isinstance(value, datetime):
                 attributes[key] = value.isoformat()
+            elif isinstance(value, list):
+                attributes[key] = list(value)
 
         return attributes
 
     def __str__(self):
         """Returns the string representation of the instance"""
-        return f"[{type(self).__name__}] ({self.id}) {self.__dict__}"
+        return f"[{type(self).__name__}] ({self.id}) {self._attributes()}"
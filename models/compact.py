@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+"""Defines compact versions of the models, keeping their attributes in
+__slots__ instead of a __dict__ per instance
+
+The models themselves do not declare __slots__, so the instances still
+have room for a __dict__, but it is never created as nothing is stored
+in it.
+"""
+import models
+
+
+class Slot:
+    """Represents a declared attribute of a compact model, kept in a slot
+    and read as the default value of the model while it is not set
+    """
+
+    def __init__(self, name, member, model):
+        """Initializes the attribute name stored by the slot descriptor
+        member, with the default value of model
+        """
+        self.name = name
+        self.member = member
+        self.model = model
+
+    def __get__(self, obj, objtype=None):
+        """Returns the value of the slot, or the default value
+
+        Like the lists of the models, a default list is set on the first
+        access so that it can be changed in place.
+        """
+        if obj is not None:
+            try:
+                return self.member.__get__(obj, objtype)
+            except AttributeError:
+                pass
+        value = getattr(self.model, self.name)
+        if obj is not None and isinstance(value, list):
+            self.member.__set__(obj, value)
+            obj._order_names((self.name,))
+        return value
+
+    def __set__(self, obj, value):
+        """Sets the value of the slot"""
+        try:
+            self.member.__get__(obj)
+        except AttributeError:
+            obj._order_names((self.name,))
+        self.member.__set__(obj, value)
+
+    def __delete__(self, obj):
+        """Unsets the slot"""
+        self.member.__delete__(obj)
+        obj._unorder_name(self.name)
+
+
+class CompactModel:
+    """Represents the base of the compact models built by compact()
+
+    The declared attributes are kept in slots and any other attribute in
+    the dictionary _extra, only created when one is set. The names of
+    the attributes set are kept in _order in the order they were set,
+    so that to_dict() and str() list them like for the models. The
+    instances set in the same order share the same tuple of _orders.
+    """
+
+    __slots__ = ("_extra", "_order")
+    _fields = {}
+    _orders = {}
+
+    @classmethod
+    def defaults(cls):
+        """Returns the declared attributes of the model with their default
+        value
+        """
+        return cls._model.defaults()
+
+    def __getattr__(self, name):
+        """Returns the attribute name that is not declared by the model"""
+        if name not in ("_extra", "_order"):
+            extra = getattr(self, "_extra", None)
+            if extra is not None and name in extra:
+                return extra[name]
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __setattr__(self, name, value):
+        """Sets an attribute and marks the instance as changed in storage"""
+        if name in self._fields:
+            super().__setattr__(name, value)
+            return
+        models.storage.touch(self, name, value)
+        extra = getattr(self, "_extra", None)
+        if extra is None:
+            extra = {}
+            object.__setattr__(self, "_extra", extra)
+        if name not in extra:
+            self._order_names((name,))
+        extra[name] = value
+
+    def __delattr__(self, name):
+        """Deletes an attribute"""
+        extra = getattr(self, "_extra", None)
+        if name not in self._fields and extra is not None and name in extra:
+            del extra[name]
+            self._unorder_name(name)
+        else:
+            super().__delattr__(name)
+
+    def _order_names(self, names):
+        """Adds names, of attributes newly set, to the end of _order"""
+        order = getattr(self, "_order", ()) + tuple(names)
+        object.__setattr__(self, "_order",
+                           self._orders.setdefault(order, order))
+
+    def _unorder_name(self, name):
+        """Removes the name of an attribute deleted from _order"""
+        order = tuple(item for item in getattr(self, "_order", ())
+                      if item != name)
+        object.__setattr__(self, "_order",
+                           self._orders.setdefault(order, order))
+
+    def _assign(self, attributes):
+        """Sets the attributes of the dictionary attributes, without
+        marking the instance as changed
+        """
+        extra = getattr(self, "_extra", None)
+        names = []
+        for name, value in attributes.items():
+            member = self._fields.get(name)
+            if member is not None:
+                try:
+                    member.__get__(self)
+                except AttributeError:
+                    names.append(name)
+                member.__set__(self, value)
+            else:
+                if extra is None:
+                    extra = {}
+                    object.__setattr__(self, "_extra", extra)
+                if name not in extra:
+                    names.append(name)
+                extra[name] = value
+        if names:
+            self._order_names(names)
+
+    def _attributes(self):
+        """Returns a dictionary of the attributes set on the instance, in
+        the order they were set
+        """
+        attributes = {}
+        extra = getattr(self, "_extra", None)
+        for name in getattr(self, "_order", ()):
+            member = self._fields.get(name)
+            if member is not None:
+                attributes[name] = member.__get__(self)
+            else:
+                attributes[name] = extra[name]
+        return attributes
+
+
+def compact(model):
+    """Returns the compact version of model, a subclass keeping id,
+    created_at, updated_at and the declared attributes in __slots__
+    """
+    if issubclass(model, CompactModel):
+        return model
+    if "_compact" in vars(model):
+        return vars(model)["_compact"]
+    fields = ("id",) + model.DATETIME_FIELDS
+    fields += tuple(name for name in model.defaults() if name not in fields)
+    namespace = {
+        "__slots__": tuple(f"_{name}" for name in fields),
+        "__module__": model.__module__,
+        "__doc__": model.__doc__,
+        "_model": model,
+        }
+    cls = type(model.__name__, (CompactModel, model), namespace)
+    cls._fields = {name: vars(cls)[f"_{name}"] for name in fields}
+    for name, member in cls._fields.items():
+        setattr(cls, name, Slot(name, member, model))
+    model._compact = cls
+    return cls
@@ -0,0 +1,230 @@
+#!/usr/bin/python3
+"""Defines a Columns class"""
+import math
+from array import array
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Columns:
+    """Represents the attributes of the instances of a class kept in
+    columns, with one row per instance
+
+    The row of a key does not change while it is stored and the rows of
+    the removed keys are reused. A numeric attribute is kept in an array
+    of floats, NaN standing for a missing or non numeric value. An
+    attribute used to group rows is kept in an array of codes, one per
+    distinct value, -1 standing for an unhashable value.
+
+    The columns are added on the first request for them and read the
+    values with field(key, name). The aggregates use NumPy when it is
+    installed and a loop over the arrays otherwise. They are kept in
+    summaries, updated by every change of a row after that, except for
+    the removal of a minimum or maximum, which drops the summary.
+    """
+
+    def __init__(self, keys, field):
+        """Initializes the columns of the rows of keys"""
+        self.field = field
+        self.rows = {}
+        self.keys = []
+        self.free = []
+        self.values = {}
+        self.codes = {}
+        self.labels = {}
+        self.summaries = {}
+        for key in keys:
+            self.add(key)
+
+    def add(self, key):
+        """Adds a row for key"""
+        if self.free:
+            row = self.free.pop()
+            self.keys[row] = key
+        else:
+            row = len(self.keys)
+            self.keys.append(key)
+            for column in self.values.values():
+                column.append(math.nan)
+            for column in self.codes.values():
+                column.append(-1)
+        self.rows[key] = row
+        for name in self.values:
+            self.values[name][row] = self.number(self.field(key, name))
+        for name in self.codes:
+            self.codes[name][row] = self.code(name, self.field(key, name))
+        self.include(row)
+
+    def remove(self, key):
+        """Removes the row of key, leaving it free for another key"""
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        self.exclude(row)
+        self.keys[row] = None
+        for column in self.values.values():
+            column[row] = math.nan
+        for column in self.codes.values():
+            column[row] = -1
+        self.free.append(row)
+
+    def set(self, key, name, value):
+        """Sets the attribute name of the row of key to value"""
+        row = self.rows.get(key)
+        if row is None or (name not in self.values and
+                           name not in self.codes):
+            return
+        self.exclude(row, name)
+        if name in self.values:
+            self.values[name][row] = self.number(value)
+        if name in self.codes:
+            self.codes[name][row] = self.code(name, value)
+        self.include(row, name)
+
+    def entry(self, summary, row):
+        """Returns the code and value of row in the summary (name, by),
+        or None if it is not counted
+        """
+        name, by = summary
+        value = 0.0 if name is None else self.values[name][row]
+        code = 0 if by is None else self.codes[by][row]
+        if code < 0 or value != value:
+            return None
+        return code, value
+
+    def include(self, row, name=None):
+        """Adds row to the summaries, or to the ones of name"""
+        for summary, groups in self.summaries.items():
+            if name is not None and name not in summary:
+                continue
+            entry = self.entry(summary, row)
+            if entry is None:
+                continue
+            code, value = entry
+            group = groups.get(code)
+            if group is None:
+                groups[code] = [1, value, value, value]
+            else:
+                group[0] += 1
+                group[1] += value
+                if value < group[2]:
+                    group[2] = value
+                if value > group[3]:
+                    group[3] = value
+
+    def exclude(self, row, name=None):
+        """Removes row from the summaries, or from the ones of name,
+        dropping the ones of values whose minimum or maximum it holds
+        """
+        for summary, groups in list(self.summaries.items()):
+            if name is not None and name not in summary:
+                continue
+            entry = self.entry(summary, row)
+            if entry is None:
+                continue
+            code, value = entry
+            group = groups[code]
+            if group[0] == 1:
+                del groups[code]
+            elif summary[0] is not None and (value <= group[2] or
+                                             value >= group[3]):
+                del self.summaries[summary]
+            else:
+                group[0] -= 1
+                group[1] -= value
+
+    @staticmethod
+    def number(value):
+        """Returns value as a float, or NaN if it is not a number"""
+        if isinstance(value, (int, float)):
+            return float(value)
+        return math.nan
+
+    def code(self, name, value):
+        """Returns the code of value in the column name, or -1"""
+        codes = self.labels[name]
+        try:
+            return codes.setdefault(value, len(codes))
+        except TypeError:
+            return -1
+
+    def value_column(self, name):
+        """Returns the array of the values of name, building it if
+        needed
+        """
+        column = self.values.get(name)
+        if column is None:
+            column = array("d", (math.nan if key is None else
+                                 self.number(self.field(key, name))
+                                 for key in self.keys))
+            self.values[name] = column
+        return column
+
+    def code_column(self, name):
+        """Returns the array of the codes of name, building it if needed"""
+        column = self.codes.get(name)
+        if column is None:
+            self.labels[name] = {}
+            column = array("q", (-1 for _ in self.keys))
+            for key, row in self.rows.items():
+                column[row] = self.code(name, self.field(key, name))
+            self.codes[name] = column
+        return column
+
+    def summarize(self, name, by=None):
+        """Returns a dictionary mapping each value of by, or None if by
+        is None, to the [count, sum, min, max] of the numeric values of
+        name in its rows, or of 0 for each row if name is None
+        """
+        groups = self.summaries.get((name, by))
+        if groups is None:
+            groups = self.summaries[(name, by)] = self.compute(name, by)
+        labels = [None] if by is None else list(self.labels[by])
+        return {labels[code]: list(group) for code, group in groups.items()}
+
+    def compute(self, name, by):
+        """Returns the summary of name by by, mapping the codes of by to
+        the [count, sum, min, max] of their rows
+        """
+        if name is None:
+            values = array("d", bytes(8 * len(self.keys)))
+        else:
+            values = self.value_column(name)
+        if by is None:
+            codes = array("q", (-1 if key is None else 0
+                                for key in self.keys))
+            size = 1
+        else:
+            codes = self.code_column(by)
+            size = len(self.labels[by])
+        if numpy is None:
+            groups = {}
+            for code, value in zip(codes, values):
+                if code < 0 or value != value:
+                    continue
+                group = groups.get(code)
+                if group is None:
+                    groups[code] = [1, value, value, value]
+                else:
+                    group[0] += 1
+                    group[1] += value
+                    if value < group[2]:
+                        group[2] = value
+                    if value > group[3]:
+                        group[3] = value
+            return groups
+        numbers = numpy.array(values, dtype=float)
+        indexes = numpy.array(codes, dtype=numpy.int64)
+        valid = (indexes >= 0) & ~numpy.isnan(numbers)
+        numbers, indexes = numbers[valid], indexes[valid]
+        counts = numpy.bincount(indexes, minlength=size)
+        sums = numpy.bincount(indexes, weights=numbers, minlength=size)
+        lows = numpy.full(size, math.inf)
+        highs = numpy.full(size, -math.inf)
+        numpy.minimum.at(lows, indexes, numbers)
+        numpy.maximum.at(highs, indexes, numbers)
+        return {int(code): [int(counts[code]), float(sums[code]),
+                            float(lows[code]), float(highs[code])]
+                for code in numpy.flatnonzero(counts)}
@@ -0,0 +1,451 @@
+#!/usr/bin/python3
+"""Defines a DBStorage class"""
+import json
+import math
+import sqlite3
+from contextlib import contextmanager
+from models.engine.file_storage import FileStorage
+
+
+class DBStorage:
+    """Represents a data storage class backed by an SQLite database
+
+    Each model has its own table holding the id, the foreign keys and
+    the JSON record of every instance. Instances are built on first
+    access and kept by key; the ones created, changed or deleted are
+    written one row at a time by save().
+
+    Between begin() and commit(), save() leaves the changes in an open
+    transaction; commit() commits it and rollback() rolls it back. A
+    batch opened inside another one sets a savepoint, so that batch()
+    only rolls back to it when its block raises an exception.
+    """
+
+    MODELS = FileStorage.MODELS
+    FOREIGN_KEYS = FileStorage.FOREIGN_KEYS
+    FOREIGN_KEY_LISTS = FileStorage.FOREIGN_KEY_LISTS
+    RELATIONS = FileStorage.RELATIONS
+    OPERATORS = FileStorage.OPERATORS
+    TEXT_FIELDS = FileStorage.TEXT_FIELDS
+    WORD = FileStorage.WORD
+
+    def __init__(self, path="hbnb.db"):
+        """Initializes the storage of the database file at path"""
+        self.__path = path
+        self.__connection = None
+        self.__objects = {}
+        self.__changes = set()
+        self.__depth = 0
+
+    def all(self, cls=None):
+        """Returns a dictionary of all the objects, or of the objects of
+        class cls
+        """
+        if cls is None:
+            objects = {}
+            for _class_ in self.MODELS:
+                objects.update(self.all(_class_))
+            return objects
+        _class_ = self.__class_name(cls)
+        if _class_ not in self.MODELS:
+            return {}
+        return self.__select(_class_, "")
+
+    def count(self, cls=None, by=None):
+        """Returns the number of objects, or of objects of class cls
+
+        If by is given, returns a dictionary mapping each value of the
+        attribute by, or each id of a list of ids in FOREIGN_KEY_LISTS,
+        to the number of objects of class cls holding it.
+        """
+        if cls is None and by is None:
+            return sum(self.count(_class_) for _class_ in self.MODELS)
+        _class_ = self.__class_name(cls)
+        if by is not None:
+            if by in self.FOREIGN_KEY_LISTS.get(_class_, ()):
+                counts = {}
+                for obj in self.all(_class_).values():
+                    for id in getattr(obj, by, None) or ():
+                        counts[id] = counts.get(id, 0) + 1
+                return counts
+            return {label: group[0] for label, group
+                    in self.__summarize(_class_, None, by).items()}
+        if _class_ not in self.MODELS:
+            return 0
+        self.__flush()
+        cursor = self.__connection.execute(
+            f'SELECT COUNT(*) FROM "{_class_}"')
+        return cursor.fetchone()[0]
+
+    def get(self, cls, id):
+        """Returns the instance of class cls with the given id, or None"""
+        _class_ = self.__class_name(cls)
+        key = f"{_class_}.{id}"
+        if key in self.__objects:
+            return self.__objects[key]
+        if _class_ not in self.MODELS:
+            return None
+        return self.__select(_class_, "WHERE id = ?", (id,)).get(key)
+
+    def lookup(self, cls, name, value):
+        """Returns a dictionary of the objects of class cls whose
+        attribute name equals value, or holds it for the lists of ids
+        in FOREIGN_KEY_LISTS
+        """
+        _class_ = self.__class_name(cls)
+        if name in self.FOREIGN_KEYS.get(_class_, ()):
+            return self.__select(_class_, f"WHERE {name} = ?",
+                                 (self.__column(value),))
+        if name in self.FOREIGN_KEY_LISTS.get(_class_, ()):
+            return self.where(_class_, [(name, "contains", value)])
+        return {key: obj for key, obj in self.all(_class_).items()
+                if getattr(obj, name, None) == value}
+
+    def where(self, cls, conditions, limit=None):
+        """Returns a dictionary of at most limit objects of class cls
+        matching all conditions, (name, operator, value) tuples
+        """
+        _class_ = self.__class_name(cls)
+        if _class_ not in self.MODELS or (limit is not None and limit <= 0):
+            return {}
+        clauses, parameters, rest = [], [], []
+        for condition in conditions:
+            name, op, value = condition
+            if op == "eq" and name in self.FOREIGN_KEYS.get(_class_, ()):
+                clauses.append(f"{name} = ?")
+                parameters.append(self.__column(value))
+            else:
+                rest.append(condition)
+        where = " AND ".join(clauses)
+        objects = self.__select(_class_, f"WHERE {where}" if where else "",
+                                parameters)
+        result = {}
+        for key, obj in objects.items():
+            if all(self.__match(obj, condition) for condition in rest):
+                result[key] = obj
+                if len(result) == limit:
+                    break
+        return result
+
+    def range(self, cls, name, low=None, high=None):
+        """Returns a dictionary of the objects of class cls whose
+        attribute name is between low and high included
+        """
+        conditions = []
+        if low is not None:
+            conditions.append((name, "gte", low))
+        if high is not None:
+            conditions.append((name, "lte", high))
+        if not conditions:
+            conditions.append((name, "ne", None))
+        return self.where(cls, conditions)
+
+    def within(self, cls, south, west, north, east):
+        """Returns a dictionary of the objects of class cls located in
+        the box from (south, west) to (north, east), in degrees
+        """
+        objects = {}
+        for key, obj in self.all(cls).items():
+            latitude = getattr(obj, "latitude", None)
+            longitude = getattr(obj, "longitude", None)
+            if not all(isinstance(value, (int, float))
+                       for value in (latitude, longitude)):
+                continue
+            if west <= east:
+                inside = west <= longitude <= east
+            else:
+                inside = longitude >= west or longitude <= east
+            if inside and south <= latitude <= north:
+                objects[key] = obj
+        return objects
+
+    def near(self, cls, latitude, longitude, km):
+        """Returns a dictionary of the objects of class cls at most km
+        kilometers away from (latitude, longitude), nearest first
+        """
+        distances = []
+        for key, obj in self.within(cls, -90.0, -180.0, 90.0, 180.0).items():
+            distance = FileStorage.distance(latitude, longitude,
+                                            obj.latitude, obj.longitude)
+            if distance <= km:
+                distances.append((distance, key, obj))
+        distances.sort(key=lambda item: item[0])
+        return {key: obj for _, key, obj in distances}
+
+    def search(self, cls, text, limit=None):
+        """Returns a dictionary of at most limit objects of class cls
+        containing words of text, the most relevant first
+        """
+        _class_ = self.__class_name(cls)
+        names = self.TEXT_FIELDS.get(_class_, ())
+        objects = self.all(_class_) if names else {}
+        counts = {}
+        for key, obj in objects.items():
+            for name in names:
+                value = getattr(obj, name, None)
+                if not isinstance(value, str):
+                    continue
+                for word, _ in self.WORD.findall(value.lower()):
+                    words = counts.setdefault(key, {})
+                    words[word] = words.get(word, 0) + 1
+        scores = {}
+        for term, prefix in self.WORD.findall(text.lower()):
+            matches = {}
+            for key, words in counts.items():
+                for word, count in words.items():
+                    if word == term or (prefix and word.startswith(term)):
+                        matches.setdefault(word, {})[key] = count
+            for word, keys in matches.items():
+                weight = math.log(1 + len(objects) / len(keys))
+                for key, count in keys.items():
+                    scores[key] = (scores.get(key, 0) +
+                                   (1 + math.log(count)) * weight)
+        keys = sorted(scores, key=scores.get, reverse=True)[:limit]
+        return {key: objects[key] for key in keys}
+
+    def avg(self, cls, name, by=None):
+        """Returns the average of the numeric values of the attribute
+        name of the objects of class cls, or None if there are none
+
+        If by is given, returns a dictionary mapping each value of the
+        attribute by to the average of the objects holding it.
+        """
+        averages = {label: group[1] / group[0] for label, group
+                    in self.__summarize(cls, name, by).items()}
+        if by is None:
+            return averages.get(None)
+        return averages
+
+    def stats(self, cls, name, by=None):
+        """Returns a dictionary of the count, sum, avg, min and max of
+        the numeric values of the attribute name of the objects of class
+        cls, the last three being None if there are none
+
+        If by is given, returns a dictionary mapping each value of the
+        attribute by to the statistics of the objects holding it.
+        """
+        stats = {}
+        for label, (count, total, low, high) in self.__summarize(
+                cls, name, by).items():
+            stats[label] = {"count": count, "sum": total,
+                            "avg": total / count, "min": low, "max": high}
+        if by is None:
+            return stats.get(None, {"count": 0, "sum": 0, "avg": None,
+                                    "min": None, "max": None})
+        return stats
+
+    def related(self, cls, id, name):
+        """Returns a dictionary of the objects in relation name of the
+        instance of class cls with the given id
+        """
+        _class_, foreign_key = self.RELATIONS[self.__class_name(cls)][name]
+        return self.lookup(_class_, foreign_key, id)
+
+    def new(self, obj):
+        """Adds obj to the objects to write on the next save"""
+        key = f"{type(obj).__name__}.{obj.id}"
+        self.__objects[key] = obj
+        self.__changes.add(key)
+
+    def touch(self, obj, name, value):
+        """Marks obj as changed since the last save if it is stored,
+        before its attribute name is set to value
+        """
+        key = f"{type(obj).__name__}.{getattr(obj, 'id', None)}"
+        if self.__objects.get(key) is obj:
+            self.__changes.add(key)
+
+    def delete(self, obj):
+        """Removes obj from the database on the next save"""
+        key = f"{type(obj).__name__}.{obj.id}"
+        if self.__objects.get(key) is obj:
+            self.__objects[key] = None
+            self.__changes.add(key)
+
+    def begin(self):
+        """Starts a batch of changes, saving the pending ones first, or
+        setting a savepoint inside another batch
+        """
+        if not self.__depth:
+            self.save()
+        else:
+            self.__flush()
+            if not self.__connection.in_transaction:
+                self.__connection.execute("BEGIN")
+            self.__connection.execute(f'SAVEPOINT "batch_{self.__depth}"')
+        self.__depth += 1
+
+    def commit(self):
+        """Ends a batch of changes, saving them if it is the outermost"""
+        self.__depth = max(self.__depth - 1, 0)
+        self.save()
+        if self.__depth:
+            self.__connection.execute(f'RELEASE "batch_{self.__depth}"')
+
+    def rollback(self):
+        """Ends all batches of changes, discarding the unsaved ones"""
+        self.__depth = 0
+        if self.__connection is not None:
+            self.__connection.rollback()
+        self.__objects = {}
+        self.__changes = set()
+
+    def in_batch(self):
+        """Returns True between begin() and the matching commit()"""
+        return self.__depth > 0
+
+    @contextmanager
+    def batch(self):
+        """Context manager saving the changes made in its block once,
+        or discarding them if the block raises an exception
+
+        Inside another batch, only the changes made in the block are
+        discarded and the outer batch goes on.
+        """
+        nested = self.in_batch()
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            if nested:
+                self.__undo()
+            else:
+                self.rollback()
+            raise
+        self.commit()
+
+    def __undo(self):
+        """Ends the innermost batch, rolling back to its savepoint"""
+        self.__depth -= 1
+        savepoint = f'"batch_{self.__depth}"'
+        self.__connection.execute(f"ROLLBACK TO {savepoint}")
+        self.__connection.execute(f"RELEASE {savepoint}")
+        self.__objects = {}
+        self.__changes = set()
+
+    def save(self):
+        """Writes the changed objects to the database"""
+        self.__flush()
+        if not self.__depth:
+            self.__connection.commit()
+
+    def flush(self):
+        """Does nothing, as save() writes the changes right away"""
+
+    def close(self):
+        """Closes the database, discarding the changes not saved"""
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+        self.__objects = {}
+        self.__changes = set()
+        self.__depth = 0
+
+    def reload(self):
+        """Opens the database, creating the missing tables"""
+        if self.__connection is not None:
+            self.__connection.close()
+        self.__connection = sqlite3.connect(self.__path)
+        self.__objects = {}
+        self.__changes = set()
+        for _class_ in self.MODELS:
+            foreign_keys = self.FOREIGN_KEYS.get(_class_, ())
+            columns = "".join(f", {name} TEXT" for name in foreign_keys)
+            self.__connection.execute(
+                f'CREATE TABLE IF NOT EXISTS "{_class_}" '
+                f'(id TEXT PRIMARY KEY{columns}, record TEXT NOT NULL)')
+            for name in foreign_keys:
+                self.__connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{_class_}_{name}" '
+                    f'ON "{_class_}" ({name})')
+        self.__connection.commit()
+
+    @staticmethod
+    def __class_name(cls):
+        """Returns the name of cls, a model class or class name"""
+        if isinstance(cls, type):
+            return cls.__name__
+        if not isinstance(cls, str):
+            raise TypeError("cls must be a class or a class name")
+        return cls
+
+    def __summarize(self, cls, name, by):
+        """Returns a dictionary mapping each value of by, or None if by
+        is None, to the [count, sum, min, max] of the numeric values of
+        name of the objects of class cls, or of 0 for each if name is None
+        """
+        groups = {}
+        for obj in self.all(cls).values():
+            value = 0 if name is None else getattr(obj, name, None)
+            if not isinstance(value, (int, float)) or value != value:
+                continue
+            label = None if by is None else getattr(obj, by, None)
+            try:
+                group = groups.get(label)
+            except TypeError:
+                continue
+            if group is None:
+                groups[label] = [1, value, value, value]
+            else:
+                group[0] += 1
+                group[1] += value
+                group[2] = min(group[2], value)
+                group[3] = max(group[3], value)
+        return groups
+
+    @staticmethod
+    def __column(value):
+        """Returns value as stored in a foreign key column"""
+        if isinstance(value, (str, int, float)):
+            return value
+        return None
+
+    def __match(self, obj, condition):
+        """Returns True if obj matches condition"""
+        name, op, value = condition
+        try:
+            return bool(self.OPERATORS[op](
+                getattr(obj, name, None), value))
+        except TypeError:
+            return False
+
+    def __select(self, _class_, where, parameters=()):
+        """Returns a dictionary of the instances of the rows of the table
+        of _class_ matching where
+        """
+        self.__flush()
+        cursor = self.__connection.execute(
+            f'SELECT id, record FROM "{_class_}" {where}', parameters)
+        objects = {}
+        for id, record in cursor:
+            key = f"{_class_}.{id}"
+            if key not in self.__objects:
+                record = json.loads(record)
+                self.__objects[key] = self.MODELS[_class_](**record)
+            objects[key] = self.__objects[key]
+        return objects
+
+    def __flush(self):
+        """Writes the changed objects to the current transaction"""
+        if self.__connection is None:
+            self.reload()
+        for key in self.__changes:
+            _class_, id = key.split(".", 1)
+            obj = self.__objects[key]
+            if obj is None:
+                del self.__objects[key]
+                self.__connection.execute(
+                    f'DELETE FROM "{_class_}" WHERE id = ?', (id,))
+                continue
+            names = ("id",) + self.FOREIGN_KEYS.get(_class_, ()) + ("record",)
+            values = [id]
+            for name in names[1:-1]:
+                values.append(self.__column(getattr(obj, name, None)))
+            values.append(json.dumps(obj.to_dict()))
+            updates = ", ".join(f"{name} = excluded.{name}"
+                                for name in names[1:])
+            self.__connection.execute(
+                f'INSERT INTO "{_class_}" ({", ".join(names)}) '
+                f'VALUES ({", ".join("?" * len(names))}) '
+                f'ON CONFLICT(id) DO UPDATE SET {updates}', values)
+        self.__changes.clear()
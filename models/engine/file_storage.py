@@ -1,7 +1,24 @@
 #!/usr/bin/python3
 """Defines a FileStorage class"""
 import os
+import re
 import json
+import math
+import time
+import marshal
+import zlib
+import atexit
+import shutil
+import operator
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from models.engine.grid import Grid
+from models.engine.ranges import Ranges
+from models.engine.columns import Columns
+from models.engine.text_index import TextIndex
 from models.city import City
 from models.user import User
 from models.place import Place
@@ -11,11 +28,74 @@ from models.amenity import Amenity
 from models.base_model import BaseModel
 
 
+def read_shard(path):
+    """Returns the dictionary of the records of the JSON file at path, in
+    a worker process of FileStorage.reload()
+    """
+    with open(path, encoding="utf-8") as json_file:
+        return json.load(json_file)
+
+
 class FileStorage:
-    """Represents a data storage class"""
+    """Represents a data storage class keeping the objects in a JSON file
+
+    The serialized form of every object is cached in __records and only
+    the objects changed since the last save are serialized again. The
+    lookups and aggregates use the indexes in Ranges, Grid, TextIndex
+    and Columns, each built on its first use and kept up to date by every
+    change after that. The flags lazy, sharded, binary, write_behind and
+    journal select how the objects are read and written.
+    """
 
     __file_path = "file.json"
+    __log_path = "file.json.log"
+    __text_path = "file.json.text"
+    __shard_dir = "data"
+    __snapshot_path = "file.bin"
     __objects = {}
+    __records = {}
+    __unloaded = {}
+    __classes = {}
+    __references = {}
+    __listed = {}
+    __ranges = None
+    __grids = None
+    __texts = None
+    __text_stale = False
+    __columns = None
+    __changes = set()
+    __dirty = set()
+    __skipped = set()
+    __log_size = 0
+    __synced = None
+    __depth = 0
+    __savepoints = []
+    __lock = threading.RLock()
+    __writing = threading.Lock()
+    __flushing = threading.Condition(__lock)
+    __flusher = None
+    __pending = False
+    __closing = False
+
+    journal = False
+    write_behind = False
+    sharded = False
+    binary = False
+    lazy = False
+    COMPACT_MIN = 1000
+    BACKUPS = 1
+    FLUSH_INTERVAL = 0.05
+    FLUSH_CHANGES = 1000
+    BUCKETS = {}
+    WORKERS = None
+    PARALLEL_MIN = 1 << 20
+    GRID_SIZE = 0.1
+    EARTH_RADIUS = 6371.0
+    WORD = TextIndex.WORD
+    SHARD = re.compile(r"(\w+)(?:\.\d+)?\.json")
+    CHUNK_SIZE = 1 << 16
+    SNAPSHOT_VERSION = 1
+    EPOCH = datetime(1970, 1, 1)
 
     MODELS = {
         "City": City,
@@ -27,29 +107,1505 @@ class FileStorage:
         "BaseModel": BaseModel,
         }
 
-    def all(self):
-        """Returns the dictionary __objects"""
-        return type(self).__objects
+    FOREIGN_KEYS = {
+        "City": ("state_id",),
+        "Place": ("city_id", "user_id"),
+        "Review": ("place_id", "user_id"),
+        }
+
+    FOREIGN_KEY_LISTS = {
+        "Place": ("amenity_ids",),
+        }
+
+    RELATIONS = {
+        "State": {"cities": ("City", "state_id")},
+        "City": {"places": ("Place", "city_id")},
+        "User": {"places": ("Place", "user_id"),
+                 "reviews": ("Review", "user_id")},
+        "Place": {"reviews": ("Review", "place_id")},
+        "Amenity": {"places": ("Place", "amenity_ids")},
+        }
+
+    SORTED_FIELDS = {
+        "Place": ("price_by_night", "max_guest", "number_rooms",
+                  "number_bathrooms", "latitude", "longitude"),
+        }
+
+    GEO_FIELDS = {
+        "Place": ("latitude", "longitude"),
+        }
+
+    TEXT_FIELDS = {
+        "Place": ("name", "description"),
+        "Review": ("text",),
+        }
+
+    OPERATORS = {
+        "eq": operator.eq,
+        "ne": operator.ne,
+        "lt": operator.lt,
+        "lte": operator.le,
+        "gt": operator.gt,
+        "gte": operator.ge,
+        "contains": operator.contains,
+        }
+
+    def all(self, cls=None):
+        """Returns the dictionary __objects, or a dictionary of the
+        objects of class cls
+        """
+        with type(self).__lock:
+            objects = self.__sync()
+            if cls is None:
+                self.__load(list(type(self).__unloaded))
+                return objects
+            keys = type(self).__classes.get(self.__class_name(cls), ())
+            return self.__load(keys)
+
+    def count(self, cls=None, by=None):
+        """Returns the number of objects, or of objects of class cls
+
+        If by is given, returns a dictionary mapping each value of the
+        attribute by, or each id of a list of ids in FOREIGN_KEY_LISTS,
+        to the number of objects of class cls holding it.
+        """
+        with type(self).__lock:
+            objects = self.__sync()
+            if cls is None and by is None:
+                return len(objects) + len(type(self).__unloaded)
+            _class_ = self.__class_name(cls)
+            if by is None:
+                return len(type(self).__classes.get(_class_, ()))
+            if by in self.__referencing(_class_):
+                index = type(self).__references.get((_class_, by), {})
+                return {value: len(keys) for value, keys in index.items()}
+            return {label: group[0] for label, group
+                    in self.__table(_class_).summarize(None, by).items()}
+
+    def get(self, cls, id):
+        """Returns the instance of class cls with the given id, or None"""
+        with type(self).__lock:
+            key = f"{self.__class_name(cls)}.{id}"
+            objects = self.__sync()
+            if key in type(self).__unloaded:
+                self.__load((key,))
+            return objects.get(key)
+
+    def lookup(self, cls, name, value):
+        """Returns a dictionary of the objects of class cls whose
+        attribute name equals value, or holds it for the lists of ids
+        in FOREIGN_KEY_LISTS
+        """
+        with type(self).__lock:
+            self.__sync()
+            _class_ = self.__class_name(cls)
+            if name in self.__referencing(_class_):
+                index = type(self).__references.get((_class_, name), {})
+                try:
+                    keys = index.get(value, ())
+                except TypeError:
+                    keys = ()
+                return self.__load(keys)
+            return {key: obj for key, obj in self.all(_class_).items()
+                    if getattr(obj, name, None) == value}
+
+    def where(self, cls, conditions, limit=None):
+        """Returns a dictionary of at most limit objects of class cls
+        matching all conditions, (name, operator, value) tuples
+
+        The search is narrowed to the smallest of the index entries of
+        an equality on a foreign key, the intersection of the entries of
+        the ids contained by the lists of ids, and the ranges of values
+        of the sorted fields, which are then returned in ascending order.
+        The other conditions are checked on the records, so only the
+        matching objects are built. The values compared to the
+        attributes in DATETIME_FIELDS are decoded from their ISO format.
+        """
+        with type(self).__lock:
+            self.__sync()
+            if limit is not None and limit <= 0:
+                return {}
+            cls_ = type(self)
+            _class_ = self.__class_name(cls)
+            model = cls_.MODELS.get(_class_)
+            if model is not None:
+                conditions = [
+                    (name, op, self.__unpack_date(value))
+                    if name in model.DATETIME_FIELDS and
+                    isinstance(value, str) else (name, op, value)
+                    for name, op, value in conditions]
+            keys, used = self.__plan(_class_, conditions)
+            if keys is None:
+                keys = cls_.__classes.get(_class_, ())
+            rest = [condition for condition in conditions
+                    if condition not in used]
+            matches = []
+            for key in keys:
+                source = cls_.__objects.get(key)
+                if source is None:
+                    source = cls_.__records[key]
+                if all(self.__match(source, condition) for condition in rest):
+                    matches.append(key)
+                    if len(matches) == limit:
+                        break
+            return self.__load(matches)
+
+    def range(self, cls, name, low=None, high=None):
+        """Returns a dictionary of the objects of class cls whose
+        attribute name is between low and high included
+        """
+        conditions = []
+        if low is not None:
+            conditions.append((name, "gte", low))
+        if high is not None:
+            conditions.append((name, "lte", high))
+        if not conditions:
+            conditions.append((name, "ne", None))
+        return self.where(cls, conditions)
+
+    def within(self, cls, south, west, north, east):
+        """Returns a dictionary of the objects of class cls located in
+        the box from (south, west) to (north, east), in degrees
+
+        The box crosses the antimeridian when west is greater than east.
+        """
+        if any(value != value for value in (south, west, north, east)):
+            raise ValueError("within() needs numbers, not NaN")
+        with type(self).__lock:
+            self.__sync()
+            cls_ = type(self)
+            _class_ = self.__class_name(cls)
+            names = cls_.GEO_FIELDS.get(_class_, ("latitude", "longitude"))
+            keys = []
+            for key in self.__geo_keys(_class_, south, west, north, east):
+                source = cls_.__objects.get(key)
+                if source is None:
+                    source = cls_.__records[key]
+                latitude, longitude = (self.__field(source, name)
+                                       for name in names)
+                if not (Ranges.sortable(latitude) and
+                        Ranges.sortable(longitude)):
+                    continue
+                if west <= east:
+                    inside = west <= longitude <= east
+                else:
+                    inside = longitude >= west or longitude <= east
+                if inside and south <= latitude <= north:
+                    keys.append(key)
+            return self.__load(keys)
+
+    def near(self, cls, latitude, longitude, km):
+        """Returns a dictionary of the objects of class cls at most km
+        kilometers away from (latitude, longitude), nearest first
+        """
+        if not (math.isfinite(latitude) and math.isfinite(longitude) and
+                km == km):
+            raise ValueError("near() needs a finite position and a distance")
+        degrees = math.degrees(km / type(self).EARTH_RADIUS)
+        south = max(latitude - degrees, -90.0)
+        north = min(latitude + degrees, 90.0)
+        scale = math.cos(math.radians(max(abs(south), abs(north))))
+        if north >= 90.0 or south <= -90.0 or degrees >= 180.0 * scale:
+            west, east = -180.0, 180.0
+        else:
+            west = (longitude - degrees / scale + 180.0) % 360.0 - 180.0
+            east = (longitude + degrees / scale + 180.0) % 360.0 - 180.0
+        names = type(self).GEO_FIELDS.get(self.__class_name(cls),
+                                          ("latitude", "longitude"))
+        distances = []
+        for key, obj in self.within(cls, south, west, north, east).items():
+            distance = self.distance(latitude, longitude,
+                                     *(getattr(obj, name) for name in names))
+            if distance <= km:
+                distances.append((distance, key, obj))
+        distances.sort(key=lambda item: item[0])
+        return {key: obj for _, key, obj in distances}
+
+    @classmethod
+    def distance(cls, latitude1, longitude1, latitude2, longitude2):
+        """Returns the great circle distance in kilometers between two
+        points given in degrees
+        """
+        phi1 = math.radians(latitude1)
+        phi2 = math.radians(latitude2)
+        sin_phi = math.sin((phi2 - phi1) / 2)
+        sin_lambda = math.sin(math.radians(longitude2 - longitude1) / 2)
+        a = sin_phi ** 2 + math.cos(phi1) * math.cos(phi2) * sin_lambda ** 2
+        return 2 * cls.EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+    def search(self, cls, text, limit=None):
+        """Returns a dictionary of at most limit objects of class cls
+        containing words of text, the most relevant first
+
+        A word ending with * matches every word starting with it. The
+        objects are ranked by the sum over the words they contain of
+        (1 + log(count)) * log(1 + objects / objects with the word).
+        """
+        with type(self).__lock:
+            self.__sync()
+            _class_ = self.__class_name(cls)
+            index = self.__text_index().get(_class_)
+            if index is None:
+                return {}
+            total = len(type(self).__classes.get(_class_, ()))
+            return self.__load(index.search(text, total, limit))
+
+    def avg(self, cls, name, by=None):
+        """Returns the average of the numeric values of the attribute
+        name of the objects of class cls, or None if there are none
+
+        If by is given, returns a dictionary mapping each value of the
+        attribute by to the average of the objects holding it.
+        """
+        with type(self).__lock:
+            groups = self.__table(cls).summarize(name, by)
+            if by is None:
+                group = groups.get(None)
+                return group[1] / group[0] if group else None
+            return {label: group[1] / group[0]
+                    for label, group in groups.items()}
+
+    def stats(self, cls, name, by=None):
+        """Returns a dictionary of the count, sum, avg, min and max of
+        the numeric values of the attribute name of the objects of class
+        cls, the last three being None if there are none
+
+        If by is given, returns a dictionary mapping each value of the
+        attribute by to the statistics of the objects holding it.
+        """
+        with type(self).__lock:
+            _class_ = self.__class_name(cls)
+            groups = self.__table(_class_).summarize(name, by)
+            whole = isinstance(getattr(type(self).MODELS.get(_class_), name,
+                                       None), int)
+            stats = {label: self.__stats(group, whole)
+                     for label, group in groups.items()}
+            if by is None:
+                return stats.get(None, self.__stats(None, whole))
+            return stats
+
+    def related(self, cls, id, name):
+        """Returns a dictionary of the objects in relation name of the
+        instance of class cls with the given id
+        """
+        relations = type(self).RELATIONS[self.__class_name(cls)]
+        _class_, foreign_key = relations[name]
+        return self.lookup(_class_, foreign_key, id)
 
     def new(self, obj):
-        """Sets in __objects the obj with key <obj class name>.id"""
-        key = f"{type(obj).__name__}.{obj.id}"
-        type(self).__objects[key] = obj
+        """Sets in __objects the obj with key <obj class name>.id
+
+        The objects of its class are read first if reload() skipped
+        them, so that the next save writes them back with it.
+        """
+        with type(self).__lock:
+            _class_ = type(obj).__name__
+            key = f"{_class_}.{obj.id}"
+            objects = self.__sync()
+            if _class_ in type(self).__skipped:
+                type(self).__skipped.discard(_class_)
+                self.__read({_class_})
+            self.__remember(key)
+            if key in objects:
+                self.__unindex(key, objects[key])
+            elif key in type(self).__unloaded:
+                del type(self).__unloaded[key]
+                self.__unindex(key, type(self).__records[key])
+            objects[key] = obj
+            type(self).__changes.add(key)
+            self.__index(key, obj)
+
+    def touch(self, obj, name, value):
+        """Marks obj as changed since the last save if it is stored,
+        before its attribute name is set to value
+        """
+        cls = type(self)
+        with cls.__lock:
+            _class_ = type(obj).__name__
+            key = f"{_class_}.{getattr(obj, 'id', None)}"
+            if self.__sync().get(key) is not obj:
+                return
+            self.__remember(key)
+            cls.__changes.add(key)
+            if name in cls.FOREIGN_KEYS.get(_class_, ()):
+                index = cls.__references[(_class_, name)]
+                self.__discard(index, getattr(obj, name, None), key)
+                self.__add(index, value, key)
+            if name in cls.FOREIGN_KEY_LISTS.get(_class_, ()):
+                self.__list(key, name, value)
+            ranges = (cls.__ranges or {}).get(_class_)
+            if ranges is not None and name in ranges.indexes:
+                ranges.remove(name, getattr(obj, name, None), key)
+                ranges.insert(name, value, key)
+            text = (cls.__texts or {}).get(_class_)
+            if text is not None and name in cls.TEXT_FIELDS[_class_]:
+                text.discard(getattr(obj, name, None), key)
+                text.add(value, key)
+            if cls.__columns is not None and _class_ in cls.__columns:
+                cls.__columns[_class_].set(key, name, value)
+            grid = (cls.__grids or {}).get(_class_)
+            names = cls.GEO_FIELDS.get(_class_, ())
+            if grid is not None and name in names:
+                position = [getattr(obj, field, None) for field in names]
+                grid.discard(key, *position)
+                position[names.index(name)] = value
+                grid.add(key, *position)
+
+    def delete(self, obj):
+        """Removes obj from __objects"""
+        with type(self).__lock:
+            key = f"{type(obj).__name__}.{obj.id}"
+            if key in self.__sync():
+                self.__remember(key)
+            obj = self.__sync().pop(key, None)
+            if obj is not None:
+                type(self).__changes.add(key)
+                self.__unindex(key, obj)
+
+    def begin(self):
+        """Starts a batch of changes, saving the pending ones first"""
+        cls = type(self)
+        with cls.__lock:
+            self.__sync()
+            if not cls.__depth and cls.__changes:
+                self.save()
+                self.flush()
+            cls.__savepoints.append({})
+            cls.__depth += 1
+
+    def commit(self):
+        """Ends a batch of changes, saving them if it is the outermost"""
+        cls = type(self)
+        with cls.__lock:
+            if cls.__savepoints:
+                savepoint = cls.__savepoints.pop()
+                if cls.__savepoints:
+                    for key, state in savepoint.items():
+                        cls.__savepoints[-1].setdefault(key, state)
+            cls.__depth = max(cls.__depth - 1, 0)
+            self.save()
+
+    def rollback(self):
+        """Ends all batches of changes, restoring the objects as they
+        were at the last save
+        """
+        cls = type(self)
+        with cls.__lock:
+            self.__sync()
+            states = {}
+            for savepoint in reversed(cls.__savepoints):
+                states.update(savepoint)
+            cls.__depth = 0
+            cls.__savepoints = []
+            for key in cls.__changes | set(states):
+                if key in cls.__records:
+                    # Also holds the changes made in place before the
+                    # first one of the batch
+                    self.__put(key, cls.__records[key])
+                elif key in states:
+                    self.__restore({key: states[key]})
+                else:
+                    self.__drop(key)
+            cls.__changes.clear()
+
+    def in_batch(self):
+        """Returns True between begin() and the matching commit()"""
+        return type(self).__depth > 0
+
+    @contextmanager
+    def batch(self):
+        """Context manager saving the changes made in its block once,
+        or discarding them if the block raises an exception
+
+        Inside another batch, only the changes made in the block are
+        discarded and the outer batch goes on.
+        """
+        nested = self.in_batch()
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            if nested:
+                self.__undo()
+            else:
+                self.rollback()
+            raise
+        self.commit()
+
+    def __remember(self, key):
+        """Keeps in the innermost savepoint the state of the object
+        stored under key before its first change in the batch, as the
+        objects read from the snapshot have no record to restore
+        """
+        cls = type(self)
+        if not cls.__savepoints or key in cls.__savepoints[-1]:
+            return
+        obj = cls.__objects.get(key)
+        if obj is not None:
+            attributes = {name: list(value) if isinstance(value, list)
+                          else value
+                          for name, value in obj._attributes().items()}
+            state = (type(obj), attributes)
+        elif key in cls.__unloaded:
+            state = ()
+        else:
+            state = None
+        cls.__savepoints[-1][key] = (state, key in cls.__changes)
+
+    def __undo(self):
+        """Ends the innermost batch, restoring the objects it changed as
+        they were when it started
+        """
+        cls = type(self)
+        with cls.__lock:
+            if len(cls.__savepoints) < 2:
+                self.rollback()
+                return
+            self.__restore(cls.__savepoints.pop())
+            cls.__depth -= 1
+
+    def __restore(self, states):
+        """Restores the objects of the keys of states, a savepoint, as
+        they were when it was taken
+        """
+        cls = type(self)
+        for key, (state, changed) in states.items():
+            obj = cls.__objects.pop(key, None)
+            if obj is not None:
+                self.__unindex(key, obj)
+            if state == ():
+                cls.__unloaded[key] = None
+                self.__index(key, cls.__records[key])
+            elif state is not None:
+                model, attributes = state
+                obj = model.__new__(model)
+                obj._assign(attributes)
+                cls.__objects[key] = obj
+                self.__index(key, obj)
+            if changed:
+                cls.__changes.add(key)
+            else:
+                cls.__changes.discard(key)
 
     def save(self):
-        """Serializes __objects to the JSON file"""
-        objects_dict = {}
-        for key, value in type(self).__objects.items():
-            objects_dict[key] = value.to_dict()
-        with open(type(self).__file_path, "w", encoding="utf-8") as json_file:
-            json.dump(objects_dict, json_file)
-
-    def reload(self):
-        """Deserializes the JSON file to __objects"""
-        if os.path.isfile(type(self).__file_path):
-            with open(type(self).__file_path, encoding="utf-8") as json_file:
-                objects_dict = json.load(json_file)
-
-            for key, value in objects_dict.items():
-                _class_ = value["__class__"]
-                type(self).__objects[key] = type(self).MODELS[_class_](**value)
+        """Serializes __objects to the JSON file, or schedules it when
+        write_behind is set
+        """
+        cls = type(self)
+        with cls.__lock:
+            self.__sync()
+            self.__relist()
+            if cls.__depth:
+                return
+            if not cls.write_behind:
+                self.__write()
+                return
+            cls.__pending = True
+            if cls.__flusher is None or not cls.__flusher.is_alive():
+                cls.__flusher = threading.Thread(
+                    target=self.__run, name="FileStorage.flush",
+                    daemon=True)
+                cls.__flusher.start()
+                atexit.register(self.close)
+            cls.__flushing.notify()
+
+    def flush(self):
+        """Writes the changes scheduled by save() right away, and the
+        inverted indexes if they changed since they were last written
+        """
+        self.__write(scheduled=True, index=True)
+
+    def close(self):
+        """Writes the changes scheduled by save() and stops the thread
+        writing them
+        """
+        cls = type(self)
+        with cls.__lock:
+            flusher = cls.__flusher
+            cls.__closing = True
+            cls.__flushing.notify()
+        if flusher is not None and flusher is not threading.current_thread():
+            flusher.join()
+        with cls.__lock:
+            cls.__closing = False
+            if cls.__flusher is flusher:
+                cls.__flusher = None
+            self.flush()
+
+    def reload(self, *, classes=None):
+        """Deserializes the JSON file, or the shards when sharded, to
+        __objects, only reading the objects of classes if given
+        """
+        cls = type(self)
+        names = None
+        if classes is not None:
+            if not cls.sharded:
+                raise ValueError("reload() only reads some classes of a "
+                                 "sharded storage")
+            names = {self.__class_name(model) for model in classes}
+        with cls.__lock:
+            self.__sync()
+            cls.__ranges = None
+            cls.__grids = None
+            cls.__texts = None
+            cls.__columns = None
+            if names and os.path.isfile(cls.__file_path) and not any(
+                    map(os.path.isfile, self.__data_paths())):
+                # All the classes are split to the shards by the next save
+                names = None
+            logged = self.__read(names)
+            if logged:
+                # Read now as the next save may drop the log
+                self.__read(logged)
+            if names is None:
+                cls.__skipped = set()
+            else:
+                cls.__skipped = {_class_ for _class_ in cls.MODELS
+                                 if not cls.__classes.get(_class_)
+                                 } - names - logged
+                # Deleted before the reload, left as they are stored
+                cls.__changes = {key for key in cls.__changes
+                                 if key.split(".", 1)[0] not in
+                                 cls.__skipped}
+            if not cls.lazy:
+                self.__load(list(cls.__unloaded))
+
+    def __read(self, names=None):
+        """Reads the stored objects, or the ones of the classes of names
+        if given, and returns the names of the other classes having
+        entries in the log
+        """
+        cls = type(self)
+        paths = self.__data_paths(names)
+        split = (cls.sharded and os.path.isfile(cls.__file_path) and
+                 not any(map(os.path.isfile, self.__data_paths())))
+        if split:
+            # Written to the shards by the next save
+            paths = [cls.__file_path]
+        elif (cls.binary and not cls.sharded and
+              os.path.isfile(cls.__snapshot_path)):
+            with open(cls.__snapshot_path, "rb") as snapshot_file:
+                self.__read_snapshot(snapshot_file, names)
+            paths = []
+        paths = [path for path in paths if os.path.isfile(path)]
+        for path, key, value in self.__read_paths(paths):
+            if names is None or key.split(".", 1)[0] in names:
+                self.__put(key, value)
+                if not cls.sharded:
+                    continue
+                shard = self.__shard(key)
+                if split:
+                    cls.__dirty.add(shard)
+                elif f"{shard}.json" != os.path.basename(path):
+                    # Written with other BUCKETS, split again by the
+                    # next save
+                    cls.__dirty.add(shard)
+                    cls.__dirty.add(os.path.basename(path)[:-len(".json")])
+        cls.__log_size = 0
+        if os.path.isfile(cls.__log_path):
+            return self.__replay_log(names)
+        return set()
+
+    def __run(self):
+        """Writes the changes scheduled by save() until close(), at most
+        every FLUSH_INTERVAL seconds
+        """
+        cls = type(self)
+        while True:
+            with cls.__lock:
+                while not cls.__closing and (not cls.__pending or
+                                             cls.__depth):
+                    cls.__flushing.wait()
+                if cls.__closing:
+                    return
+                deadline = time.monotonic() + cls.FLUSH_INTERVAL
+                while (not cls.__closing and
+                       len(cls.__changes) < cls.FLUSH_CHANGES):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    cls.__flushing.wait(remaining)
+            self.__write(scheduled=True)
+
+    def __write(self, scheduled=False, index=False):
+        """Writes the changes to the JSON file, the shards or the log,
+        only if a write is scheduled and no batch is open if scheduled
+        is set, then the inverted indexes if index is set
+
+        The records to write are taken under __lock, which is released
+        while they are written unless the caller holds it too. If the
+        write fails, the objects are marked as changed again.
+        """
+        cls = type(self)
+        with cls.__lock:
+            changes = not scheduled or (cls.__pending and not cls.__depth)
+            if not changes and not (index and cls.__text_stale):
+                return
+            cls.__writing.acquire()
+            try:
+                dirty = set(cls.__dirty)
+                steps, keys = [], []
+                if changes:
+                    steps, keys = self.__collect()
+                if index:
+                    steps.extend(self.__text_steps())
+            except BaseException:
+                cls.__writing.release()
+                raise
+        try:
+            for step in steps:
+                step()
+        except BaseException:
+            cls.__writing.release()
+            with cls.__lock:
+                cls.__changes.update(keys)
+                cls.__dirty.update(dirty)
+                cls.__text_stale = cls.__texts is not None
+            raise
+        cls.__writing.release()
+
+    def __collect(self):
+        """Returns the list of the functions writing the changes to the
+        files, which only use the records taken from the storage, and
+        the keys of the changed objects
+        """
+        cls = type(self)
+        cls.__pending = False
+        size = len(cls.__objects) + len(cls.__unloaded)
+        if cls.journal and cls.__log_size < max(cls.COMPACT_MIN, size):
+            changed = self.__serialize_changes()
+            cls.__log_size += len(changed)
+            if not changed:
+                return [], []
+            cls.__text_stale = cls.__texts is not None
+            return [lambda: self.__append_log(changed)], [
+                key for key, _ in changed]
+
+        keys = [key for key, _ in self.__serialize_changes()]
+        if cls.sharded:
+            steps = self.__collect_shards()
+        elif cls.binary:
+            snapshot = (cls.SNAPSHOT_VERSION, self.__snapshot_tables())
+            steps = [lambda: self.__replace(
+                cls.__snapshot_path,
+                lambda snapshot_file: marshal.dump(snapshot, snapshot_file),
+                cls.BACKUPS, binary=True)]
+        else:
+            records = cls.__records
+            objects_dict = {key: records[key] for key in cls.__unloaded}
+            for key, value in cls.__objects.items():
+                record = records.get(key)
+                if record is None:
+                    record = value.to_dict()
+                objects_dict[key] = record
+            cls.__records = objects_dict
+            steps = [lambda: self.__replace(
+                cls.__file_path,
+                lambda json_file: self.__write_records(
+                    json_file, objects_dict.items()),
+                cls.BACKUPS)]
+        cls.__dirty.clear()
+        cls.__log_size = 0
+        steps.append(self.__remove_log)
+        cls.__text_stale = cls.__texts is not None
+        if cls.journal:
+            steps.extend(self.__text_steps())
+        return steps, keys
+
+    def __text_steps(self):
+        """Returns a list of the function writing the inverted indexes if
+        they changed since they were last written and match the files,
+        or an empty list
+        """
+        cls = type(self)
+        if (not cls.__text_stale or cls.__texts is None or
+                cls.__changes or cls.__depth or cls.__skipped):
+            return []
+        cls.__text_stale = False
+        return [self.__text_index_writer()]
+
+    def __remove_log(self):
+        """Removes the log, folded in the files written before"""
+        self.__remove_file(type(self).__log_path)
+
+    @staticmethod
+    def __remove_file(path):
+        """Removes the file at path if it exists"""
+        if os.path.isfile(path):
+            os.remove(path)
+
+    def __collect_shards(self):
+        """Returns the list of the functions rewriting the shards changed
+        since they were last written, then removing the ones written with
+        other BUCKETS
+        """
+        cls = type(self)
+        records = cls.__records
+        shards = {name: {} for name in cls.__dirty}
+        for _class_ in {name.split(".", 1)[0] for name in shards}:
+            for key in cls.__classes.get(_class_, ()):
+                shard = shards.get(self.__shard(key))
+                if shard is None:
+                    continue
+                record = records.get(key)
+                if record is None:
+                    record = cls.__objects[key].to_dict()
+                    records[key] = record
+                shard[key] = record
+        steps = [lambda: os.makedirs(cls.__shard_dir, exist_ok=True)]
+        stale = []
+        for name, shard in sorted(shards.items()):
+            path = os.path.join(cls.__shard_dir, f"{name}.json")
+            if self.__stale(name):
+                stale.append(path)
+                continue
+            steps.append(lambda path=path, shard=shard: self.__replace(
+                path, lambda json_file: self.__write_records(
+                    json_file, shard.items()), cls.BACKUPS))
+        for path in stale:
+            steps.append(lambda path=path: self.__remove_file(path))
+        return steps
+
+    def __shard(self, key):
+        """Returns the name of the shard holding the record of key: its
+        class name, followed by its bucket for the classes in BUCKETS
+        """
+        _class_, id = key.split(".", 1)
+        buckets = type(self).BUCKETS.get(_class_)
+        if not buckets:
+            return _class_
+        return f"{_class_}.{zlib.crc32(id.encode('utf-8')) % buckets}"
+
+    def __stale(self, name):
+        """Returns True if the shard name was written with other BUCKETS"""
+        _class_, _, bucket = name.partition(".")
+        buckets = type(self).BUCKETS.get(_class_)
+        if not buckets:
+            return bool(bucket)
+        return not bucket.isdigit() or int(bucket) >= buckets
+
+    def __data_paths(self, names=None):
+        """Returns the paths of the files holding the records: the JSON
+        file, or the stored shards of the classes of names, all of them
+        if None, whatever their BUCKETS, when sharded
+        """
+        cls = type(self)
+        if not cls.sharded:
+            return [cls.__file_path]
+        if names is None:
+            names = cls.MODELS
+        try:
+            files = sorted(os.listdir(cls.__shard_dir))
+        except OSError:
+            return []
+        paths = []
+        for name in files:
+            match = cls.SHARD.fullmatch(name)
+            if match and match.group(1) in names:
+                paths.append(os.path.join(cls.__shard_dir, name))
+        return paths
+
+    def __read_paths(self, paths):
+        """Yields the (path, key, record) triples of the JSON files at
+        paths, decoding them in WORKERS forked processes if they hold
+        PARALLEL_MIN bytes or more
+        """
+        cls = type(self)
+        workers = min(len(paths), cls.WORKERS or os.cpu_count() or 1)
+        # A process started otherwise imports the main module again, and
+        # with it the models, which reload the storage
+        if (workers > 1 and
+                "fork" in multiprocessing.get_all_start_methods() and
+                sum(map(os.path.getsize, paths)) >= cls.PARALLEL_MIN):
+            context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(workers, context) as executor:
+                shards = executor.map(read_shard, paths)
+                for path, records in zip(paths, shards):
+                    for key, record in records.items():
+                        yield path, key, record
+            return
+        for path in paths:
+            with open(path, encoding="utf-8") as json_file:
+                for key, record in self.__read_records(json_file):
+                    yield path, key, record
+
+    def __put(self, key, record):
+        """Stores the record read under key, replacing its instance"""
+        cls = type(self)
+        if key in cls.__objects:
+            self.__unindex(key, cls.__objects.pop(key))
+        elif key in cls.__unloaded:
+            self.__unindex(key, cls.__records[key])
+        cls.__records[key] = record
+        cls.__unloaded[key] = None
+        cls.__changes.discard(key)
+        self.__index(key, record)
+
+    def __put_object(self, key, obj):
+        """Stores the instance obj read under key, replacing the stored
+        one
+        """
+        cls = type(self)
+        self.__drop(key)
+        cls.__records.pop(key, None)
+        cls.__objects[key] = obj
+        cls.__changes.discard(key)
+        self.__index(key, obj)
+
+    def __drop(self, key):
+        """Removes the instance or record stored under key"""
+        cls = type(self)
+        if key in cls.__objects:
+            self.__unindex(key, cls.__objects.pop(key))
+        elif key in cls.__unloaded:
+            del cls.__unloaded[key]
+            self.__unindex(key, cls.__records.pop(key))
+
+    @staticmethod
+    def __replace(path, write, backups=0, binary=False):
+        """Replaces the file at path by the one written by write(file),
+        a text file or a binary one if binary is set, keeping the
+        previous one as the first of backups copies
+        """
+        temp_path = f"{path}.tmp"
+        try:
+            if binary:
+                temp_file = open(temp_path, "wb")
+            else:
+                temp_file = open(temp_path, "w", encoding="utf-8")
+            with temp_file:
+                write(temp_file)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+        except BaseException:
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+            raise
+        if backups and os.path.isfile(path):
+            for i in range(backups - 1, 0, -1):
+                if os.path.isfile(f"{path}.{i}"):
+                    os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+            if os.path.isfile(f"{path}.1"):
+                os.remove(f"{path}.1")
+            try:
+                os.link(path, f"{path}.1")
+            except OSError:
+                shutil.copyfile(path, f"{path}.1")
+        os.replace(temp_path, path)
+        try:
+            directory = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(directory)
+        except OSError:
+            pass
+        finally:
+            os.close(directory)
+
+    def __snapshot_tables(self):
+        """Returns the objects as written to the snapshot, a dictionary
+        mapping each class name to a pair of the names of the attributes
+        and of the list of the rows of values of its objects
+        """
+        cls = type(self)
+        tables = {}
+        for _class_, keys in cls.__classes.items():
+            if not keys:
+                continue
+            model = cls.MODELS[_class_]
+            fields = {"id": None}
+            fields.update(dict.fromkeys(model.DATETIME_FIELDS))
+            fields.update(dict.fromkeys(model.defaults()))
+            sources = []
+            for key in keys:
+                source = cls.__objects.get(key)
+                if source is None:
+                    source = cls.__records[key]
+                else:
+                    source = source._attributes()
+                fields.update(dict.fromkeys(source))
+                sources.append(source)
+            fields.pop("__class__", None)
+            dates = model.DATETIME_FIELDS
+            rows = [tuple(self.__pack(source.get(name, ...), name in dates)
+                          for name in fields)
+                    for source in sources]
+            tables[_class_] = (tuple(fields), rows)
+        return tables
+
+    def __read_snapshot(self, snapshot_file, names=None):
+        """Builds the objects written to snapshot_file, or the ones of
+        the classes of names if given, replacing the stored ones
+        """
+        cls = type(self)
+        # Much faster than marshal.load(), which reads the file in
+        # small pieces
+        version, tables = marshal.loads(snapshot_file.read())
+        if version != cls.SNAPSHOT_VERSION:
+            raise ValueError(f"Unknown snapshot version {version}")
+        epoch = cls.EPOCH
+        microsecond = timedelta(microseconds=1)
+        for _class_, (fields, rows) in tables.items():
+            if names is not None and _class_ not in names:
+                continue
+            model = cls.MODELS[_class_]
+            dates = [i for i, name in enumerate(fields)
+                     if name in model.DATETIME_FIELDS]
+            for row in rows:
+                if dates:
+                    row = list(row)
+                    for i in dates:
+                        if type(row[i]) is int:
+                            row[i] = epoch + row[i] * microsecond
+                        elif isinstance(row[i], str):
+                            row[i] = self.__unpack_date(row[i])
+                obj = model.__new__(model)
+                obj._assign({name: value for name, value in zip(fields, row)
+                             if value is not ...})
+                self.__put_object(f"{_class_}.{obj.id}", obj)
+
+    @classmethod
+    def __pack(cls, value, date):
+        """Returns value as written to the snapshot: a datetime as an
+        integer in the attributes listed in DATETIME_FIELDS, date being
+        set, and in ISO format in the other ones
+        """
+        if isinstance(value, str) and date:
+            value = cls.__unpack_date(value)
+        if not isinstance(value, datetime):
+            return value
+        if date and value.tzinfo is None:
+            return (value - cls.EPOCH) // timedelta(microseconds=1)
+        return value.isoformat()
+
+    @staticmethod
+    def __unpack_date(value):
+        """Returns the datetime of value, in ISO format, or value if it
+        is not a valid one
+        """
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+
+    @staticmethod
+    def __write_records(json_file, items):
+        """Writes the (key, record) pairs of items to json_file as a JSON
+        object, one record at a time
+        """
+        separator = ""
+        json_file.write("{")
+        for key, record in items:
+            json_file.write(f"{separator}{json.dumps(key)}: "
+                            f"{json.dumps(record)}")
+            separator = ", "
+        json_file.write("}")
+
+    def __read_records(self, json_file):
+        """Yields the (key, record) pairs of the JSON object in json_file,
+        reading it CHUNK_SIZE characters at a time
+        """
+        decoder = json.JSONDecoder()
+        chunk_size = type(self).CHUNK_SIZE
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def fill():
+            """Appends the next chunk of json_file to the buffer"""
+            nonlocal buffer, pos, eof
+            chunk = json_file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+        def peek():
+            """Moves pos past whitespace and returns the next character"""
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return buffer[pos:pos + 1]
+                fill()
+
+        def expect(chars):
+            """Moves pos past the next character, one of chars"""
+            nonlocal pos
+            char = peek()
+            if not char or char not in chars:
+                raise json.JSONDecodeError(
+                    f"Expecting one of {chars!r}", buffer, pos)
+            pos += 1
+            return char
+
+        def value():
+            """Decodes the JSON value at pos"""
+            nonlocal pos
+            peek()
+            while True:
+                try:
+                    result, end = decoder.raw_decode(buffer, pos)
+                    if end < len(buffer) or eof:
+                        pos = end
+                        return result
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                # The value may go on in the next chunk
+                fill()
+
+        expect("{")
+        char = expect('"}')
+        while char != "}":
+            pos -= 1
+            key = value()
+            expect(":")
+            yield key, value()
+            if expect(",}") == ",":
+                expect('"')
+            else:
+                char = "}"
+        if peek():
+            raise json.JSONDecodeError("Extra data", buffer, pos)
+
+    @staticmethod
+    def __class_name(cls):
+        """Returns the name of cls, a model class or class name"""
+        if isinstance(cls, type):
+            return cls.__name__
+        if not isinstance(cls, str):
+            raise TypeError("cls must be a class or a class name")
+        return cls
+
+    @staticmethod
+    def __add(index, value, key):
+        """Adds key to the entry of index for value"""
+        try:
+            index.setdefault(value, {})[key] = None
+        except TypeError:
+            pass
+
+    @staticmethod
+    def __discard(index, value, key):
+        """Removes key from the entry of index for value"""
+        try:
+            keys = index.get(value)
+        except TypeError:
+            return
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del index[value]
+
+    @staticmethod
+    def __ids(value):
+        """Returns value if it is a list of ids, or an empty tuple"""
+        if isinstance(value, (list, tuple, set)):
+            return value
+        return ()
+
+    def __list(self, key, name, value):
+        """Indexes the ids of the list value as the ones referenced by
+        the attribute name of the object stored under key, replacing the
+        ones indexed before
+        """
+        cls = type(self)
+        _class_ = key.split(".", 1)[0]
+        index = cls.__references.setdefault((_class_, name), {})
+        ids = tuple(self.__ids(value))
+        listed = cls.__listed.pop((key, name), ())
+        if ids == listed:
+            if ids:
+                cls.__listed[(key, name)] = ids
+            return
+        for id in listed:
+            self.__discard(index, id, key)
+        for id in ids:
+            self.__add(index, id, key)
+        if ids:
+            cls.__listed[(key, name)] = ids
+
+    def __relist(self):
+        """Indexes again the lists of ids of the changed objects, which
+        may have been changed in place
+        """
+        cls = type(self)
+        for key in cls.__changes:
+            names = cls.FOREIGN_KEY_LISTS.get(key.split(".", 1)[0])
+            obj = cls.__objects.get(key)
+            if names and obj is not None:
+                for name in names:
+                    self.__list(key, name, self.__field(obj, name))
+
+    def __referencing(self, _class_):
+        """Returns the names of the attributes of _class_ indexed in
+        __references
+        """
+        cls = type(self)
+        return (cls.FOREIGN_KEYS.get(_class_, ()) +
+                cls.FOREIGN_KEY_LISTS.get(_class_, ()))
+
+    def __stamp(self):
+        """Returns the size and modification time of the JSON file, or of
+        the shards, of the snapshot and of the log file, or None for a
+        missing one
+        """
+        cls = type(self)
+        stamp = []
+        for path in self.__data_paths() + [cls.__snapshot_path,
+                                           cls.__log_path]:
+            try:
+                stat = os.stat(path)
+                stamp.append([stat.st_size, stat.st_mtime_ns])
+            except OSError:
+                stamp.append(None)
+        return stamp
+
+    def __field(self, source, name):
+        """Returns the attribute name of source, an instance or the
+        record of an instance
+        """
+        if isinstance(source, dict):
+            model = type(self).MODELS[source["__class__"]]
+            value = source.get(name, getattr(model, name, None))
+            if name in model.DATETIME_FIELDS and isinstance(value, str):
+                return self.__unpack_date(value)
+            return value
+        attributes = source._attributes()
+        if name in attributes:
+            return attributes[name]
+        return getattr(type(source), name, None)
+
+    @staticmethod
+    def __stats(group, whole):
+        """Returns the statistics of group, [count, sum, min, max] or
+        None, the sum, min and max as integers if whole is set and they
+        have no fractional part
+        """
+        if group is None:
+            return {"count": 0, "sum": 0, "avg": None, "min": None,
+                    "max": None}
+        count, total, low, high = group
+        if whole and all(value.is_integer() for value in group[1:]):
+            total, low, high = int(total), int(low), int(high)
+        return {"count": count, "sum": total, "avg": group[1] / count,
+                "min": low, "max": high}
+
+    def __value(self, key, name):
+        """Returns the attribute name of the instance stored under key"""
+        cls = type(self)
+        source = cls.__objects.get(key)
+        if source is None:
+            source = cls.__records[key]
+        return self.__field(source, name)
+
+    def __match(self, source, condition):
+        """Returns True if source, an instance or the record of an
+        instance, matches condition
+        """
+        name, op, value = condition
+        try:
+            return bool(type(self).OPERATORS[op](
+                self.__field(source, name), value))
+        except TypeError:
+            return False
+
+    def __index(self, key, source):
+        """Adds source, an instance or record stored under key, to the
+        indexes
+        """
+        cls = type(self)
+        _class_ = key.split(".", 1)[0]
+        cls.__classes.setdefault(_class_, {})[key] = None
+        for name in cls.FOREIGN_KEYS.get(_class_, ()):
+            index = cls.__references.setdefault((_class_, name), {})
+            self.__add(index, self.__field(source, name), key)
+        for name in cls.FOREIGN_KEY_LISTS.get(_class_, ()):
+            self.__list(key, name, self.__field(source, name))
+        ranges = (cls.__ranges or {}).get(_class_)
+        if ranges is not None:
+            for name in ranges.indexes:
+                ranges.insert(name, self.__field(source, name), key)
+        text = (cls.__texts or {}).get(_class_)
+        if text is not None:
+            for name in cls.TEXT_FIELDS[_class_]:
+                text.add(self.__field(source, name), key)
+        grid = (cls.__grids or {}).get(_class_)
+        if grid is not None:
+            grid.add(key, *(self.__field(source, name)
+                            for name in cls.GEO_FIELDS[_class_]))
+        if cls.__columns is not None and _class_ in cls.__columns:
+            cls.__columns[_class_].add(key)
+
+    def __unindex(self, key, source):
+        """Removes source, an instance or record stored under key, from
+        the indexes
+        """
+        cls = type(self)
+        _class_ = key.split(".", 1)[0]
+        cls.__classes[_class_].pop(key, None)
+        for name in cls.FOREIGN_KEYS.get(_class_, ()):
+            index = cls.__references[(_class_, name)]
+            self.__discard(index, self.__field(source, name), key)
+        for name in cls.FOREIGN_KEY_LISTS.get(_class_, ()):
+            self.__list(key, name, None)
+        ranges = (cls.__ranges or {}).get(_class_)
+        if ranges is not None:
+            for name in ranges.indexes:
+                ranges.remove(name, self.__field(source, name), key)
+        text = (cls.__texts or {}).get(_class_)
+        if text is not None:
+            for name in cls.TEXT_FIELDS[_class_]:
+                text.discard(self.__field(source, name), key)
+        grid = (cls.__grids or {}).get(_class_)
+        if grid is not None:
+            grid.discard(key, *(self.__field(source, name)
+                                for name in cls.GEO_FIELDS[_class_]))
+        if cls.__columns is not None and _class_ in cls.__columns:
+            cls.__columns[_class_].remove(key)
+
+    def __sorted_index(self, _class_):
+        """Returns the Ranges of the attributes of _class_ in
+        SORTED_FIELDS, building them if needed
+        """
+        cls = type(self)
+        if cls.__ranges is None:
+            cls.__ranges = {}
+        ranges = cls.__ranges.get(_class_)
+        if ranges is None:
+            ranges = Ranges(cls.__classes.get(_class_, ()),
+                            cls.SORTED_FIELDS[_class_], self.__value)
+            cls.__ranges[_class_] = ranges
+        return ranges
+
+    def __table(self, cls):
+        """Returns the Columns of the objects of class cls, building
+        them if needed
+        """
+        cls_ = type(self)
+        self.__sync()
+        _class_ = self.__class_name(cls)
+        if cls_.__columns is None:
+            cls_.__columns = {}
+        table = cls_.__columns.get(_class_)
+        if table is None:
+            table = Columns(cls_.__classes.get(_class_, ()), self.__value)
+            cls_.__columns[_class_] = table
+        return table
+
+    def __text_index(self):
+        """Returns the TextIndex of each class in TEXT_FIELDS, reading
+        them from __text_path or building them if needed
+        """
+        cls = type(self)
+        if cls.__texts is None and not cls.__changes and not cls.__skipped:
+            self.__read_text_index()
+        if cls.__texts is None:
+            cls.__texts = {
+                model: TextIndex(cls.__classes.get(model, ()), names,
+                                 self.__value)
+                for model, names in cls.TEXT_FIELDS.items()}
+            cls.__text_stale = True
+        return cls.__texts
+
+    def __text_index_writer(self):
+        """Returns a function writing the text indexes to __text_path,
+        each key being replaced by its position in a list of the keys
+        """
+        cls = type(self)
+        positions = {}
+        postings = {model: text.dump(positions)
+                    for model, text in cls.__texts.items()}
+        keys = list(positions)
+
+        def write():
+            """Writes the indexes with the stamp of the files written"""
+            text_index = {"stamp": self.__stamp(), "keys": keys,
+                          "postings": postings}
+            self.__replace(cls.__text_path,
+                           lambda text_file: json.dump(text_index, text_file))
+        return write
+
+    def __read_text_index(self):
+        """Reads the text indexes from __text_path if they match the
+        JSON and log files
+        """
+        cls = type(self)
+        if not os.path.isfile(cls.__text_path):
+            return
+        with open(cls.__text_path, encoding="utf-8") as text_file:
+            try:
+                text_index = json.load(text_file)
+            except ValueError:
+                return
+        if text_index.get("stamp") != self.__stamp():
+            return
+        keys = text_index["keys"]
+        cls.__texts = {model: TextIndex.load(
+            text_index["postings"].get(model, {}), keys)
+            for model in cls.TEXT_FIELDS}
+        cls.__text_stale = False
+
+    def __geo_keys(self, _class_, south, west, north, east):
+        """Returns the keys of the instances of _class_ in the cells of
+        the Grid overlapping the given box, building it if needed
+        """
+        cls = type(self)
+        if _class_ not in cls.GEO_FIELDS:
+            return list(cls.__classes.get(_class_, ()))
+        if cls.__grids is None:
+            cls.__grids = {}
+        grid = cls.__grids.get(_class_)
+        if grid is None:
+            grid = Grid(cls.__classes.get(_class_, ()),
+                        cls.GEO_FIELDS[_class_], self.__value, cls.GRID_SIZE)
+            cls.__grids[_class_] = grid
+        return grid.keys(south, west, north, east)
+
+    def __plan(self, _class_, conditions):
+        """Returns the smallest list of keys given by an index for
+        conditions, or None, and the conditions it satisfies
+        """
+        cls = type(self)
+        plans = []
+        bounds = {}
+        entries = []
+        contained = []
+        for condition in conditions:
+            name, op, value = condition
+            if ((op == "eq" and name in cls.FOREIGN_KEYS.get(_class_, ())) or
+                    (op == "contains" and
+                     name in cls.FOREIGN_KEY_LISTS.get(_class_, ()))):
+                index = cls.__references.get((_class_, name), {})
+                try:
+                    keys = index.get(value, {})
+                except TypeError:
+                    keys = {}
+                if op == "eq":
+                    plans.append((len(keys), keys, [condition]))
+                else:
+                    entries.append(keys)
+                    contained.append(condition)
+            elif (op in ("eq", "lt", "lte", "gt", "gte") and
+                    name in cls.SORTED_FIELDS.get(_class_, ()) and
+                    Ranges.sortable(value)):
+                bounds.setdefault(name, []).append(condition)
+        for name, used in bounds.items():
+            count, keys = self.__sorted_index(_class_).select(
+                name, [(op, value) for _, op, value in used])
+            plans.append((count, keys, used))
+        if entries:
+            entries.sort(key=len)
+            keys = [key for key in entries[0]
+                    if all(key in entry for entry in entries[1:])]
+            plans.append((len(keys), keys, contained))
+        if not plans:
+            return None, []
+        _, keys, used = min(plans, key=lambda plan: plan[0])
+        return keys, used
+
+    def __load(self, keys):
+        """Returns a dictionary of the instances stored under keys,
+        building the ones that are not loaded yet
+        """
+        cls = type(self)
+        with cls.__lock:
+            objects = cls.__objects
+            unloaded = cls.__unloaded
+            result = {}
+            for key in keys:
+                if key in unloaded:
+                    record = cls.__records[key]
+                    objects[key] = cls.MODELS[record["__class__"]](**record)
+                    del unloaded[key]
+                result[key] = objects[key]
+            return result
+
+    def __sync(self):
+        """Returns __objects after rebuilding the state derived from it
+        if it was replaced since the last call
+        """
+        cls = type(self)
+        if cls.__objects is not cls.__synced:
+            cls.__changes = set(cls.__records) | set(cls.__objects)
+            cls.__records = {}
+            cls.__unloaded = {}
+            cls.__classes = {}
+            cls.__references = {}
+            cls.__listed = {}
+            cls.__ranges = None
+            cls.__grids = None
+            cls.__texts = None
+            cls.__columns = None
+            cls.__skipped = set()
+            for key, obj in cls.__objects.items():
+                self.__index(key, obj)
+            cls.__synced = cls.__objects
+        return cls.__objects
+
+    def __serialize_changes(self):
+        """Refreshes __records for the objects changed since the last save
+
+        Returns the list of (key, record) pairs refreshed, with a record
+        of None for the deleted objects.
+        """
+        cls = type(self)
+        changed = []
+        for key in cls.__changes:
+            obj = cls.__objects.get(key)
+            cls.__dirty.add(self.__shard(key))
+            if obj is None:
+                cls.__records.pop(key, None)
+                changed.append((key, None))
+            else:
+                record = obj.to_dict()
+                cls.__records[key] = record
+                changed.append((key, record))
+        cls.__changes.clear()
+        return changed
+
+    def __append_log(self, changed):
+        """Appends the (key, record) pairs of the objects changed since
+        the last save to the log
+        """
+        with open(type(self).__log_path, "a", encoding="utf-8") as log_file:
+            for key, record in changed:
+                log_file.write(json.dumps({"key": key, "value": record}))
+                log_file.write("\n")
+
+    def __replay_log(self, names=None):
+        """Applies the entries of the log to the stored records, or to
+        the ones of the classes of names if given, marking their shards
+        as changed, and returns the names of the other classes having
+        entries
+        """
+        cls = type(self)
+        size = 0
+        skipped = set()
+        with open(cls.__log_path, encoding="utf-8") as log_file:
+            for line in log_file:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    break
+                _class_ = entry["key"].split(".", 1)[0]
+                if names is not None and _class_ not in names:
+                    skipped.add(_class_)
+                else:
+                    if entry["value"] is None:
+                        self.__drop(entry["key"])
+                    else:
+                        self.__put(entry["key"], entry["value"])
+                    # Only in the log, written to the shards by the
+                    # compaction removing it
+                    cls.__dirty.add(self.__shard(entry["key"]))
+                size += len(line.encode("utf-8"))
+                cls.__log_size += 1
+        if size < os.path.getsize(cls.__log_path):
+            # Drop the tail left by a save interrupted mid-write
+            os.truncate(cls.__log_path, size)
+        return skipped
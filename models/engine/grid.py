@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""Defines a Grid class"""
+import math
+
+
+class Grid:
+    """Represents the instances of a class kept in the cells of a grid of
+    size degrees by latitude and longitude, so that a search in a box
+    only checks the instances of the cells overlapping it
+
+    The grid is built from the positions read with field(key, name), the
+    names being the latitude and the longitude, and kept up to date by
+    add() and discard().
+    """
+
+    def __init__(self, keys, names, field, size=0.1):
+        """Initializes the grid of the instances of keys"""
+        self.size = size
+        self.cells = {}
+        for key in keys:
+            self.add(key, *(field(key, name) for name in names))
+
+    def cell(self, latitude, longitude):
+        """Returns the cell holding (latitude, longitude), or None if they
+        are not numbers
+        """
+        for value in (latitude, longitude):
+            if not isinstance(value, (int, float)) or value != value:
+                return None
+        return (math.floor(latitude / self.size),
+                math.floor(longitude / self.size))
+
+    def add(self, key, latitude, longitude):
+        """Adds key to the cell holding (latitude, longitude)"""
+        cell = self.cell(latitude, longitude)
+        if cell is not None:
+            self.cells.setdefault(cell, {})[key] = None
+
+    def discard(self, key, latitude, longitude):
+        """Removes key from the cell holding (latitude, longitude)"""
+        keys = self.cells.get(self.cell(latitude, longitude))
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self.cells[self.cell(latitude, longitude)]
+
+    def keys(self, south, west, north, east):
+        """Returns the keys of the cells overlapping the box from (south,
+        west) to (north, east), clamped to the valid coordinates, which
+        crosses the antimeridian when west is greater than east
+        """
+        south = min(max(south, -90.0), 90.0)
+        north = min(max(north, -90.0), 90.0)
+        west = min(max(west, -180.0), 180.0)
+        east = min(max(east, -180.0), 180.0)
+        rows = range(self.cell(south, 0)[0], self.cell(north, 0)[0] + 1)
+        first, last = self.cell(0, west)[1], self.cell(0, east)[1]
+        if west <= east:
+            columns = set(range(first, last + 1))
+        else:
+            columns = set(range(first, self.cell(0, 180.0)[1] + 1))
+            columns.update(range(self.cell(0, -180.0)[1], last + 1))
+        if len(rows) * len(columns) > len(self.cells):
+            cells = [cell for cell in self.cells
+                     if cell[0] in rows and cell[1] in columns]
+        else:
+            cells = [(row, column) for row in rows for column in columns]
+        keys = []
+        for cell in cells:
+            keys.extend(self.cells.get(cell, ()))
+        return keys
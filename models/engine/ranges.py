@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+"""Defines a Ranges class"""
+from bisect import bisect_left, insort
+
+
+class Ranges:
+    """Represents the numeric attributes of the instances of a class kept
+    in lists of (value, key) pairs sorted with bisect, so that the keys
+    of a range of values are found in O(log n + k)
+
+    The lists are built from the values read with field(key, name) and
+    kept up to date by insert() and remove().
+    """
+
+    # Sorts after the keys of equal values
+    LAST = "\U0010ffff"
+
+    def __init__(self, keys, names, field):
+        """Initializes the sorted lists of the attributes names of the
+        instances of keys
+        """
+        self.indexes = {name: [] for name in names}
+        for key in keys:
+            for name, index in self.indexes.items():
+                value = field(key, name)
+                if self.sortable(value):
+                    index.append((value, key))
+        for index in self.indexes.values():
+            index.sort()
+
+    @staticmethod
+    def sortable(value):
+        """Returns True if value can be kept in a sorted list"""
+        return isinstance(value, (int, float)) and value == value
+
+    def insert(self, name, value, key):
+        """Inserts the pair (value, key) in the list of name"""
+        if self.sortable(value):
+            insort(self.indexes[name], (value, key))
+
+    def remove(self, name, value, key):
+        """Removes the pair (value, key) from the list of name"""
+        if self.sortable(value):
+            index = self.indexes[name]
+            i = bisect_left(index, (value, key))
+            if i < len(index) and index[i][1] == key:
+                del index[i]
+
+    def select(self, name, bounds):
+        """Returns the number and an iterator of the keys, in ascending
+        order of value, of the values of name within bounds, (operator,
+        value) pairs with an operator among eq, lt, lte, gt and gte
+        """
+        index = self.indexes[name]
+        start, stop = 0, len(index)
+        for op, value in bounds:
+            if op in ("eq", "gte"):
+                start = max(start, bisect_left(index, (value,)))
+            if op == "gt":
+                start = max(start, bisect_left(index, (value, self.LAST)))
+            if op in ("eq", "lte"):
+                stop = min(stop, bisect_left(index, (value, self.LAST)))
+            if op == "lt":
+                stop = min(stop, bisect_left(index, (value,)))
+        return max(stop - start, 0), (index[i][1] for i in range(start,
+                                                                 stop))
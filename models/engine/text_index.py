@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+"""Defines a TextIndex class"""
+import re
+import math
+from bisect import bisect_left
+
+
+class TextIndex:
+    """Represents the inverted index of the words of the text attributes
+    of the instances of a class, mapping each word to the number of
+    times each key holds it
+
+    The index is built from the texts read with field(key, name) and
+    kept up to date by add() and discard(). The sorted list of its words,
+    used by the prefix searches, is built again after a word is added or
+    removed.
+    """
+
+    WORD = re.compile(r"(\w+)(\*?)")
+
+    def __init__(self, keys, names, field):
+        """Initializes the index of the attributes names of the instances
+        of keys
+        """
+        self.words = {}
+        self.vocabulary = None
+        for key in keys:
+            for name in names:
+                self.add(field(key, name), key)
+
+    def add(self, text, key):
+        """Counts the words of text for key"""
+        if not isinstance(text, str):
+            return
+        for word, _ in self.WORD.findall(text.lower()):
+            counts = self.words.get(word)
+            if counts is None:
+                counts = self.words[word] = {}
+                self.vocabulary = None
+            counts[key] = counts.get(key, 0) + 1
+
+    def discard(self, text, key):
+        """Uncounts the words of text for key"""
+        if not isinstance(text, str):
+            return
+        for word, _ in self.WORD.findall(text.lower()):
+            counts = self.words.get(word)
+            if counts is None or key not in counts:
+                continue
+            counts[key] -= 1
+            if not counts[key]:
+                del counts[key]
+                if not counts:
+                    del self.words[word]
+                    self.vocabulary = None
+
+    def search(self, text, total, limit=None):
+        """Returns the list of at most limit keys holding words of text,
+        the most relevant first, among total instances
+
+        A word ending with * matches every word starting with it. The
+        keys are ranked by the sum over the words they hold of
+        (1 + log(count)) * log(1 + total / keys holding the word).
+        """
+        scores = {}
+        for word, prefix in self.WORD.findall(text.lower()):
+            matches = [word]
+            if prefix:
+                if self.vocabulary is None:
+                    self.vocabulary = sorted(self.words)
+                i = bisect_left(self.vocabulary, word)
+                matches = []
+                while (i < len(self.vocabulary) and
+                       self.vocabulary[i].startswith(word)):
+                    matches.append(self.vocabulary[i])
+                    i += 1
+            for match in matches:
+                counts = self.words.get(match, {})
+                if not counts:
+                    continue
+                weight = math.log(1 + total / len(counts))
+                for key, count in counts.items():
+                    scores[key] = (scores.get(key, 0) +
+                                   (1 + math.log(count)) * weight)
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+    def dump(self, positions):
+        """Returns the words as written to a file, mapping each word to a
+        flat list of the positions and counts of its keys, each key being
+        given the next position in the dictionary positions if it has none
+        """
+        words = {}
+        for word, counts in self.words.items():
+            pairs = words[word] = []
+            for key, count in counts.items():
+                pairs.append(positions.setdefault(key, len(positions)))
+                pairs.append(count)
+        return words
+
+    @classmethod
+    def load(cls, words, keys):
+        """Returns the index of words, as returned by dump(), keys being
+        the list of the keys by position
+        """
+        index = cls((), (), None)
+        index.words = {word: {keys[pairs[i]]: pairs[i + 1]
+                              for i in range(0, len(pairs), 2)}
+                       for word, pairs in words.items()}
+        return index
@@ -3,6 +3,25 @@
 from models.base_model import BaseModel
 
 
+class InstanceList:
+    """Descriptor of a list attribute owned by each instance
+
+    The class attribute reads as an empty list; an instance without the
+    attribute gets its own empty list on first access, so changing it
+    in place never changes the other instances.
+    """
+
+    def __set_name__(self, owner, name):
+        """Stores the name of the attribute"""
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        """Returns the list of obj, or a new empty list for the class"""
+        if obj is None:
+            return []
+        return obj.__dict__.setdefault(self.name, [])
+
+
 class Place(BaseModel):
     """Represents a place"""
 
@@ -16,7 +35,7 @@ class Place(BaseModel):
     price_by_night = 0
     latitude = 0.0
     longitude = 0.0
-    amenity_ids = []
+    amenity_ids = InstanceList()
 
     def __init__(self, *args, **kwargs):
         """Initializes the place"""
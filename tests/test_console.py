@@ -0,0 +1,492 @@
+#!/usr/bin/python3
+"""
+Unittest for console([..])
+
+This module contains the required tests for the specified module
+"""
+import unittest
+import os
+from io import StringIO
+from console import HBNBCommand
+from models import storage
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from unittest.mock import patch
+
+
+def setUpModule():
+    FileStorage._FileStorage__objects = {}
+
+
+def tearDownModule():
+    FileStorage._FileStorage__objects = {}
+    for fname in ("file.json", "file.json.1", "test_hbnb.db"):
+        if os.path.exists(fname):
+            os.remove(fname)
+
+
+def run(line):
+    """Runs line through the console and returns what it printed"""
+    with patch("sys.stdout", new=StringIO()) as mock_print:
+        console = HBNBCommand()
+        console.onecmd(console.precmd(line))
+    return mock_print.getvalue()
+
+
+class TestPrecmd(unittest.TestCase):
+    def testDotNotation(self):
+        console = HBNBCommand()
+        lines = {
+            'create User': 'create User',
+            'User.all()': 'all User',
+            'User.show("1234-ab")': 'show User 1234-ab',
+            'User.show( "1234-ab" )': 'show User 1234-ab',
+            'User.update("12", "name", "Ada Lovelace")':
+                'update User 12 name "Ada Lovelace"',
+            'User.update("12", "age", 89)': 'update User 12 age 89',
+            'User.update("12", "ratio", -1.5)': 'update User 12 ratio -1.5',
+            'User.update("12", {"a": 1, "b": [1, 2]})':
+                'update User 12 {"a": 1, "b": [1, 2]}',
+            'Place.import("places.csv")': 'import Place places.csv',
+            'Place.where(city_id="c1", price_by_night__lt=100).limit(20)':
+                'where Place city_id="c1" price_by_night__lt=100 limit=20',
+            'Place.where().select("name", "max_guest")':
+                'where Place select=name,max_guest',
+            'User.update("12", {"a": "b)"})': 'update User 12 {"a": "b)"}',
+            'Review.count(by="place_id")': 'count Review by="place_id"',
+            'Place.stats("price_by_night", by="city_id")':
+                'stats Place price_by_night by="city_id"',
+            'User.show(': 'User.show(',
+            'all': 'all',
+        }
+        for line, command in lines.items():
+            self.assertEqual(console.precmd(line), command)
+
+
+class TestCountCommand(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def testCount(self):
+        run("create User")
+        run("create User")
+        run("create Place")
+        self.assertEqual(run("count User"), "2\n")
+        self.assertEqual(run("User.count()"), "2\n")
+        self.assertEqual(run("count Review"), "0\n")
+        self.assertEqual(run("count"), "3\n")
+
+    def testCountInvalidClass(self):
+        self.assertEqual(run("count Foo"), "** class doesn't exist **\n")
+
+
+class TestAllCommand(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def testAllClass(self):
+        u_id = run("create User").strip()
+        run("create Place")
+        user = storage.all()["User.{}".format(u_id)]
+        self.assertEqual(run("all User"), "{}\n".format([str(user)]))
+        self.assertEqual(run("User.all()"), "{}\n".format([str(user)]))
+
+    def testAllAfterDestroy(self):
+        u_id = run("create User").strip()
+        run("destroy User {}".format(u_id))
+        self.assertEqual(run("all User"), "[]\n")
+        self.assertEqual(run("count User"), "0\n")
+
+
+class TestRelationCommands(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def testReviewsOfPlace(self):
+        p_id = run("create Place").strip()
+        r_id = run("create Review").strip()
+        run('update Review {} place_id "{}"'.format(r_id, p_id))
+        review = storage.all()["Review.{}".format(r_id)]
+        self.assertEqual(run('Place.reviews("{}")'.format(p_id)),
+                         "{}\n".format([str(review)]))
+        run("destroy Review {}".format(r_id))
+        self.assertEqual(run("reviews Place {}".format(p_id)), "[]\n")
+
+    def testRelationErrors(self):
+        self.assertEqual(run("reviews Place"),
+                         "** instance id missing **\n")
+        self.assertEqual(run("reviews Place 1234"),
+                         "** no instance found **\n")
+        self.assertEqual(run("reviews State 1234"),
+                         "*** Unknown syntax: reviews State 1234\n")
+
+
+class TestWhereCommand(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.ids = []
+        for city_id, price in (("c1", 50), ("c1", 150), ("c2", 80)):
+            p_id = run("create Place").strip()
+            run('update Place {} city_id "{}"'.format(p_id, city_id))
+            run("update Place {} price_by_night {}".format(p_id, price))
+            self.ids.append(p_id)
+
+    def place(self, p_id):
+        return str(storage.all()["Place.{}".format(p_id)])
+
+    def testWhere(self):
+        self.assertEqual(run('Place.where(city_id="c1", '
+                             'price_by_night__lt=100)'),
+                         "{}\n".format([self.place(self.ids[0])]))
+        self.assertEqual(run("where Place price_by_night__gte=80 limit=1"),
+                         "{}\n".format([self.place(self.ids[2])]))
+        self.assertEqual(run('where Place city_id="c3"'), "[]\n")
+
+    def testWhereSelect(self):
+        expected = [{"id": self.ids[2], "price_by_night": 80,
+                     "max_guest": 0}]
+        self.assertEqual(run('Place.where(city_id="c2")'
+                             '.select("price_by_night", "max_guest")'),
+                         "{}\n".format(expected))
+
+    def testWhereErrors(self):
+        self.assertEqual(run("where"), "** class name missing **\n")
+        self.assertEqual(run("where Foo"), "** class doesn't exist **\n")
+        self.assertEqual(run("where Place price__like=1"),
+                         "** unknown operator like **\n")
+        self.assertEqual(run("where Place limit=x"),
+                         "** invalid limit **\n")
+        self.assertEqual(run("where Place price"),
+                         "** invalid condition price **\n")
+
+
+class TestGeoCommands(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.ids = []
+        for latitude, longitude in ((37.7749, -122.4194),
+                                    (34.0522, -118.2437)):
+            p_id = run("create Place").strip()
+            run("update Place {} latitude {}".format(p_id, latitude))
+            run("update Place {} longitude {}".format(p_id, longitude))
+            self.ids.append(p_id)
+
+    def place(self, p_id):
+        return str(storage.all()["Place.{}".format(p_id)])
+
+    def testNear(self):
+        self.assertEqual(run("Place.near(34, -118, 600)"),
+                         "{}\n".format([self.place(self.ids[1]),
+                                        self.place(self.ids[0])]))
+        self.assertEqual(run("near Place 37.77 -122.42 10"),
+                         "{}\n".format([self.place(self.ids[0])]))
+
+    def testWithin(self):
+        self.assertEqual(run("Place.within(33, -119, 35, -118)"),
+                         "{}\n".format([self.place(self.ids[1])]))
+        self.assertEqual(run("within Place 0 0 1 1"), "[]\n")
+
+    def testGeoErrors(self):
+        self.assertEqual(run("near"), "** class name missing **\n")
+        self.assertEqual(run("within Foo 0 0 1 1"),
+                         "** class doesn't exist **\n")
+        self.assertEqual(run("near Place 1 2"),
+                         "** invalid coordinates **\n")
+        self.assertEqual(run("within Place a 0 1 1"),
+                         "** invalid coordinates **\n")
+        self.assertEqual(run("within Place -inf -180 inf 180"),
+                         "** invalid coordinates **\n")
+        self.assertEqual(run("near Place nan 0 10"),
+                         "** invalid coordinates **\n")
+
+
+class TestSearchCommand(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.ids = []
+        for text in ("Quiet and clean", "Clean but noisy"):
+            r_id = run("create Review").strip()
+            run('update Review {} {{"text": "{}"}}'.format(r_id, text))
+            self.ids.append(r_id)
+
+    def review(self, r_id):
+        return str(storage.all()["Review.{}".format(r_id)])
+
+    def testSearch(self):
+        self.assertEqual(run('Review.search("quiet clean")'),
+                         "{}\n".format([self.review(self.ids[0]),
+                                        self.review(self.ids[1])]))
+        self.assertEqual(run("search Review nois*"),
+                         "{}\n".format([self.review(self.ids[1])]))
+        self.assertEqual(run('Review.search("clean").limit(1)'),
+                         "{}\n".format([self.review(self.ids[0])]))
+
+    def testSearchErrors(self):
+        self.assertEqual(run("search"), "** class name missing **\n")
+        self.assertEqual(run("search Foo a"), "** class doesn't exist **\n")
+        self.assertEqual(run("search Review"), "** words missing **\n")
+
+
+class TestAmenityCommands(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def testPlacesOfAmenities(self):
+        a1 = run("create Amenity").strip()
+        a2 = run("create Amenity").strip()
+        p1 = run("create Place").strip()
+        p2 = run("create Place").strip()
+        run('update Place {} {{"amenity_ids": ["{}", "{}"]}}'
+            .format(p1, a1, a2))
+        run('update Place {} {{"amenity_ids": ["{}"]}}'.format(p2, a1))
+        place = str(storage.all()["Place.{}".format(p1)])
+        self.assertEqual(run('Place.where(amenity_ids__contains="{}", '
+                             'amenity_ids__contains="{}")'.format(a1, a2)),
+                         "{}\n".format([place]))
+        run('update Place {} {{"amenity_ids": []}}'.format(p1))
+        self.assertEqual(run("places Amenity {}".format(a2)), "[]\n")
+
+
+class TestAggregateCommands(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = []
+        for city_id, price in (("c1", 100), ("c1", 50), ("c2", 80)):
+            p_id = run("create Place").strip()
+            run('update Place {} {{"city_id": "{}", "price_by_night": {}}}'
+                .format(p_id, city_id, price))
+            self.places.append(p_id)
+        for p_id in self.places[:2]:
+            r_id = run("create Review").strip()
+            run('update Review {} place_id "{}"'.format(r_id, p_id))
+
+    def testCountBy(self):
+        p1, p2, p3 = self.places
+        self.assertEqual(run('Review.count(by="place_id")'),
+                         "{}\n".format({p1: 1, p2: 1}))
+        self.assertEqual(run("count Place by=city_id"),
+                         "{'c1': 2, 'c2': 1}\n")
+        self.assertEqual(run("count by=city_id"),
+                         "** class name missing **\n")
+        self.assertEqual(run("count Foo by=city_id"),
+                         "** class doesn't exist **\n")
+
+    def testStats(self):
+        self.assertEqual(
+            run('Place.stats("price_by_night", by="city_id")'),
+            "{}\n".format({
+                "c1": {"count": 2, "sum": 150, "avg": 75.0, "min": 50,
+                       "max": 100},
+                "c2": {"count": 1, "sum": 80, "avg": 80.0, "min": 80,
+                       "max": 80}}))
+        run('update Place {} price_by_night 20'.format(self.places[2]))
+        self.assertEqual(
+            run("stats Place price_by_night"),
+            "{}\n".format({"count": 3, "sum": 170, "avg": 170 / 3,
+                           "min": 20, "max": 100}))
+
+    def testStatsErrors(self):
+        self.assertEqual(run("stats"), "** class name missing **\n")
+        self.assertEqual(run("stats Foo price_by_night"),
+                         "** class doesn't exist **\n")
+        self.assertEqual(run("stats Place"),
+                         "** attribute name missing **\n")
+
+
+class TestTransactionCommands(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.storage = storage
+
+    def tearDown(self):
+        self.storage.rollback()
+
+    def testCommit(self):
+        run("begin")
+        with patch("models.engine.file_storage.open") as mock_file:
+            u_id = run("create User").strip()
+            run('update User {} first_name "Ada"'.format(u_id))
+            self.assertEqual(mock_file.call_count, 0)
+        self.assertEqual(run("commit"), "")
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.get("User", u_id).first_name, "Ada")
+
+    def testRollback(self):
+        u_id = run("create User").strip()
+        run("begin")
+        new_id = run("create User").strip()
+        run("destroy User {}".format(u_id))
+        self.assertEqual(run("count User"), "1\n")
+        run("rollback")
+        self.assertEqual(run("count User"), "1\n")
+        self.assertIsNotNone(storage.get("User", u_id))
+        self.assertIsNone(storage.get("User", new_id))
+
+    def testFailedImportKeepsTransaction(self):
+        with open("places.jsonl", "w", encoding="utf-8") as data_file:
+            data_file.write('{"name": "Loft"}\n[1]\n')
+        try:
+            run("begin")
+            u_id = run("create User").strip()
+            self.assertEqual(run("import Place places.jsonl"),
+                             "** invalid record on line 2 **\n")
+            self.assertTrue(self.storage.in_batch())
+            self.assertEqual(run("count Place"), "0\n")
+            self.assertIsNotNone(self.storage.get("User", u_id))
+            self.assertEqual(run("commit"), "")
+            self.assertEqual(run("count User"), "1\n")
+        finally:
+            os.remove("places.jsonl")
+
+    def testNoTransaction(self):
+        self.assertEqual(run("commit"), "** no transaction in progress **\n")
+        self.assertEqual(run("rollback"),
+                         "** no transaction in progress **\n")
+
+
+class TestDBTransactionCommands(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("test_hbnb.db"):
+            os.remove("test_hbnb.db")
+        self.storage = DBStorage("test_hbnb.db")
+        self.storage.reload()
+        self.patchers = [patch("models.storage", self.storage),
+                         patch("console.storage", self.storage)]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        self.storage.close()
+        for patcher in self.patchers:
+            patcher.stop()
+
+    testFailedImportKeepsTransaction = \
+        TestTransactionCommands.testFailedImportKeepsTransaction
+
+
+class TestImportExportCommands(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        for fname in ("places.jsonl", "places.csv"):
+            if os.path.exists(fname):
+                os.remove(fname)
+
+    @patch("os.replace")
+    @patch("os.fsync")
+    def testImportJsonLines(self, mock_fsync, mock_replace):
+        with open("places.jsonl", "w", encoding="utf-8") as data_file:
+            data_file.write('{"name": "Loft", "price_by_night": 80}\n\n')
+            data_file.write('{"id": "p2", "amenity_ids": ["a1"]}\n')
+        with patch("models.engine.file_storage.open") as mock_file:
+            self.assertEqual(run("import Place places.jsonl"), "2\n")
+            self.assertEqual(mock_file.call_count, 1)
+        place = storage.get("Place", "p2")
+        self.assertEqual(place.amenity_ids, ["a1"])
+        loft = storage.lookup("Place", "name", "Loft")
+        self.assertEqual([p.price_by_night for p in loft.values()], [80])
+
+    def testImportInvalidJsonLines(self):
+        with open("places.jsonl", "w", encoding="utf-8") as data_file:
+            data_file.write('{"name": "Loft"}\n[1]\n')
+        self.assertEqual(run("import Place places.jsonl"),
+                         "** invalid record on line 2 **\n")
+        self.assertEqual(storage.count("Place"), 0)
+
+    def testImportCsv(self):
+        with open("places.csv", "w", encoding="utf-8") as data_file:
+            data_file.write("name,price_by_night,latitude,amenity_ids,note\n")
+            data_file.write('Loft,80,1.5,"[""a1""]",quiet\n')
+            data_file.write("Flat,,,,\n")
+        self.assertEqual(run("import Place places.csv"), "2\n")
+        loft = list(storage.lookup("Place", "name", "Loft").values())[0]
+        self.assertEqual(loft.price_by_night, 80)
+        self.assertEqual(loft.latitude, 1.5)
+        self.assertEqual(loft.amenity_ids, ["a1"])
+        self.assertEqual(loft.note, "quiet")
+        flat = list(storage.lookup("Place", "name", "Flat").values())[0]
+        self.assertNotIn("price_by_night", flat.__dict__)
+
+    def testImportInvalidCsv(self):
+        with open("places.csv", "w", encoding="utf-8") as data_file:
+            data_file.write("name,price_by_night\nLoft,cheap\n")
+        self.assertEqual(run("import Place places.csv"),
+                         "** invalid price_by_night on line 2 **\n")
+
+    def testExportImport(self):
+        p_id = run("create Place").strip()
+        run('update Place {} name "Loft"'.format(p_id))
+        run('update Place {} {{"amenity_ids": ["a1"]}}'.format(p_id))
+        place = storage.get("Place", p_id).to_dict()
+        for fname in ("places.jsonl", "places.csv"):
+            self.assertEqual(run("export Place {}".format(fname)), "1\n")
+            FileStorage._FileStorage__objects = {}
+            self.assertEqual(run("import Place {}".format(fname)), "1\n")
+            self.assertEqual(storage.get("Place", p_id).to_dict(), place)
+
+    def testErrors(self):
+        self.assertEqual(run("import"), "** class name missing **\n")
+        self.assertEqual(run("export Foo f"), "** class doesn't exist **\n")
+        self.assertEqual(run("export Place"), "** file name missing **\n")
+        self.assertEqual(run("import Place nofile.jsonl"),
+                         "** file doesn't exist **\n")
+
+
+class TestQuitCommands(unittest.TestCase):
+    def testQuitClosesStorage(self):
+        for line in ("quit", "EOF"):
+            with patch.object(storage, "close") as close:
+                run(line)
+                close.assert_called_once_with()
+
+    def testQuitInTransaction(self):
+        run("begin")
+        with patch.object(storage, "close") as close:
+            run("quit")
+            close.assert_not_called()
+        storage.rollback()
+
+
+class TestRunBatch(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        storage.save()
+
+    @patch("os.replace")
+    @patch("os.fsync")
+    def testRunBatch(self, mock_fsync, mock_replace):
+        lines = ["create User\n", "create User\n", "count User\n",
+                 "\n", "foo\n", "quit\n", "create User\n"]
+        with patch("models.engine.file_storage.open") as mock_file:
+            with patch("sys.stdout", new=StringIO()) as mock_print:
+                count = HBNBCommand().run_batch(lines)
+            self.assertEqual(mock_file.call_count, 1)
+        self.assertEqual(count, 6)
+        output = mock_print.getvalue().split("\n")
+        self.assertEqual(output[2:], ["2", "*** Unknown syntax: foo", ""])
+        self.assertEqual(storage.count("User"), 2)
+        self.assertFalse(storage.in_batch())
+
+    def testRunBatchFailedImport(self):
+        with open("places.jsonl", "w", encoding="utf-8") as data_file:
+            data_file.write('{"name": "Loft"}\n[1]\n')
+        try:
+            with patch("sys.stdout", new=StringIO()):
+                HBNBCommand().run_batch(["create User",
+                                         "import Place places.jsonl",
+                                         "create User"])
+        finally:
+            os.remove("places.jsonl")
+        self.assertEqual(storage.count("User"), 2)
+        self.assertEqual(storage.count("Place"), 0)
+
+    def testRunBatchFlushesOutput(self):
+        console = HBNBCommand()
+        console_stdout = console.stdout
+        with patch.object(HBNBCommand, "BUFFER_SIZE", 10):
+            with patch("sys.stdout", new=StringIO()) as mock_print:
+                console.run_batch(["create User"] * 3)
+        self.assertEqual(len(mock_print.getvalue().split()), 3)
+        self.assertIs(console.stdout, console_stdout)
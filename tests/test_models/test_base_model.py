@@ -23,8 +23,9 @@ def setUpModule():
 
 def tearDownModule():
     FileStorage._FileStorage__objects = {}
-    if os.path.exists("file.json"):
-        os.remove("file.json")
+    for fname in ("file.json", "file.json.1"):
+        if os.path.exists(fname):
+            os.remove(fname)
 
 
 class TestAllBaseModelDocstrings(unittest.TestCase):
@@ -107,7 +108,9 @@ class TestSaveMethod(unittest.TestCase):
         self.assertEqual(type(b1.updated_at), datetime.datetime)
         self.assertGreater(b1.updated_at, prev_time)
 
-    def testSaveToStorage(self):
+    @patch("os.replace")
+    @patch("os.fsync")
+    def testSaveToStorage(self, mock_fsync, mock_replace):
         b1 = BaseModel()
         prev_time = b1.updated_at
         fname = "file.json"
@@ -118,7 +121,8 @@ class TestSaveMethod(unittest.TestCase):
             # all_vals = list(map(lambda v: v.to_dict(), all_o.values()))
             f_dict = {k: v.to_dict() for k, v in zip(al_k, all_o.values())}
             fcontent = json.dumps(f_dict)
-            mock_f.assert_called_once_with(fname, 'w', encoding='utf-8')
+            mock_f.assert_called_once_with(fname + '.tmp', 'w',
+                                           encoding='utf-8')
         self.assertEqual(type(b1.updated_at), datetime.datetime)
         self.assertGreater(b1.updated_at, prev_time)
 
@@ -178,6 +182,22 @@ class TestBaseModelFromDict(unittest.TestCase):
         self.assertGreater(b1.updated_at, b1.created_at)
         self.assertEqual(b1.name, "Te")
 
+    def testOnlyDatetimeFieldsDecoded(self):
+        c_ti = datetime.datetime.now().replace(microsecond=0)
+        cust_dict = {'__class__': 'BaseModel',
+                     'name': c_ti.isoformat(),
+                     'number': 7,
+                     'updated_at': c_ti.isoformat(),
+                     'created_at': c_ti.isoformat(),
+                     'id': str(uuid.uuid4())
+                     }
+        b1 = BaseModel(**cust_dict)
+        self.assertEqual(b1.created_at, c_ti)
+        self.assertEqual(b1.updated_at, c_ti)
+        self.assertEqual(b1.name, c_ti.isoformat())
+        self.assertEqual(b1.number, 7)
+        self.assertNotIn('__class__', b1.__dict__)
+
     def testUsingArgsOnly(self):
         unused_id = str(uuid.uuid4())
         unused_date = datetime.datetime.now() - datetime.timedelta(days=1)
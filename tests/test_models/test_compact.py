@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+"""
+Unittest for models.compact([..])
+
+This module contains the required tests for the specified module
+"""
+import unittest
+import os
+import models.compact
+from models import storage
+from models.user import User
+from models.place import Place
+from models.base_model import BaseModel
+from models.compact import compact, CompactModel
+from models.engine.file_storage import FileStorage
+
+
+def setUpModule():
+    FileStorage._FileStorage__objects = {}
+
+
+def tearDownModule():
+    FileStorage._FileStorage__objects = {}
+    for fname in ("file.json", "file.json.1"):
+        if os.path.exists(fname):
+            os.remove(fname)
+
+
+class TestAllCompactDocstrings(unittest.TestCase):
+    def testModuleDocstring(self):
+        self.assertGreater(len(models.compact.__doc__), 1)
+
+    def testClassDocstring(self):
+        self.assertGreater(len(CompactModel.__doc__), 1)
+
+    def testFnDocstring(self):
+        self.assertGreater(len(compact.__doc__), 1)
+
+
+class TestCompactFunction(unittest.TestCase):
+    def testSubclass(self):
+        CompactPlace = compact(Place)
+        self.assertTrue(issubclass(CompactPlace, Place))
+        self.assertTrue(issubclass(CompactPlace, BaseModel))
+        self.assertEqual(CompactPlace.__name__, "Place")
+
+    def testCached(self):
+        self.assertIs(compact(Place), compact(Place))
+        self.assertIs(compact(compact(Place)), compact(Place))
+        self.assertIsNot(compact(User), compact(Place))
+
+    def testNoInstanceDict(self):
+        p0 = compact(Place)()
+        p0.name = "La Casa"
+        p0.color = "blue"
+        self.assertEqual(vars(p0), {})
+
+    def testDefaults(self):
+        self.assertEqual(compact(Place).defaults(), Place.defaults())
+
+
+class TestCompactInstance(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.record = {"__class__": "Place", "id": "1234",
+                       "created_at": "2017-09-28T21:03:54.052298",
+                       "updated_at": "2017-09-28T21:03:54.052302",
+                       "name": "La Casa", "price_by_night": 120}
+
+    def testClassDefault(self):
+        p0 = compact(Place)()
+        self.assertEqual(p0.name, "")
+        self.assertEqual(p0.max_guest, 0)
+        with self.assertRaises(AttributeError):
+            compact(Place).id
+
+    def testToDict(self):
+        p0 = compact(Place)(**self.record)
+        p1 = Place(**self.record)
+        self.assertEqual(p0.to_dict(), p1.to_dict())
+        self.assertEqual(p0.name, "La Casa")
+        self.assertNotIn("description", p0.to_dict())
+
+    def testStr(self):
+        p0 = compact(Place)(**self.record)
+        p1 = Place(**self.record)
+        self.assertEqual(str(p0), str(p1))
+
+    def testAssignmentOrder(self):
+        record = dict(self.record, color="blue")
+        del record["name"]
+        models = []
+        for cls in (compact(Place), Place):
+            obj = cls(**record)
+            obj.name = "La Casa"
+            obj.max_guest = 4
+            obj.amenity_ids
+            obj.size = 3
+            del obj.price_by_night
+            obj.price_by_night = 90
+            models.append(obj)
+        self.assertEqual(list(models[0].to_dict()),
+                         list(models[1].to_dict()))
+        self.assertEqual(str(models[0]), str(models[1]))
+
+    def testExtraAttribute(self):
+        p0 = compact(Place)(**dict(self.record, color="blue"))
+        self.assertEqual(p0.color, "blue")
+        p0.size = 3
+        self.assertEqual(p0.size, 3)
+        self.assertEqual(p0.to_dict()["size"], 3)
+        del p0.size
+        with self.assertRaises(AttributeError):
+            p0.size
+        with self.assertRaises(AttributeError):
+            p0.weight
+
+    def testDeleteAttribute(self):
+        p0 = compact(Place)(**self.record)
+        del p0.name
+        self.assertEqual(p0.name, "")
+        self.assertNotIn("name", p0.to_dict())
+
+    def testAmenityIds(self):
+        p0 = compact(Place)()
+        p1 = compact(Place)()
+        p0.amenity_ids.append("abcd")
+        self.assertEqual(p0.amenity_ids, ["abcd"])
+        self.assertEqual(p1.amenity_ids, [])
+        self.assertEqual(compact(Place).amenity_ids, [])
+
+    def testStorage(self):
+        p0 = compact(Place)()
+        p0.price_by_night = 80
+        p0.city_id = "5678"
+        self.assertIs(storage.all()[f"Place.{p0.id}"], p0)
+        self.assertEqual(storage.lookup(Place, "city_id", "5678"),
+                         {f"Place.{p0.id}": p0})
+        self.assertEqual(
+            storage.where(Place, [("price_by_night", "eq", 80)]),
+            {f"Place.{p0.id}": p0})
+        p0.price_by_night = 90
+        self.assertEqual(
+            storage.where(Place, [("price_by_night", "lt", 85)]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""
+Unittest for models.engine.columns([..])
+
+This module contains the required tests for the specified module
+"""
+import math
+import unittest
+import models.engine.columns
+from models.engine.columns import Columns
+
+
+class TestAllColumnsDocstrings(unittest.TestCase):
+    def testModuleDocstring(self):
+        self.assertGreater(len(models.engine.columns.__doc__), 1)
+
+    def testClassDocstring(self):
+        self.assertGreater(len(Columns.__doc__), 1)
+
+
+class TestColumnsClass(unittest.TestCase):
+    def setUp(self):
+        self.records = {"a": {"price": 10, "city": "c1"},
+                        "b": {"price": 2.5, "city": "c2"},
+                        "c": {"price": None, "city": ["c1"]}}
+        self.columns = Columns(self.records, self.field)
+
+    def field(self, key, name):
+        return self.records[key][name]
+
+    def testRows(self):
+        self.assertEqual(self.columns.rows, {"a": 0, "b": 1, "c": 2})
+        self.columns.summarize("price")
+        self.assertEqual(self.columns.values["price"][:2].tolist(),
+                         [10.0, 2.5])
+        self.assertTrue(math.isnan(self.columns.values["price"][2]))
+
+    def testRowReused(self):
+        self.columns.summarize("price", by="city")
+        self.columns.remove("a")
+        self.records["d"] = {"price": 4, "city": "c2"}
+        self.columns.add("d")
+        self.assertEqual(self.columns.rows, {"b": 1, "c": 2, "d": 0})
+        self.assertEqual(self.columns.summarize("price", by="city"),
+                         {"c2": [2, 6.5, 2.5, 4.0]})
+
+    def testSummarize(self):
+        self.assertEqual(self.columns.summarize("price"),
+                         {None: [2, 12.5, 2.5, 10.0]})
+        self.assertEqual(self.columns.summarize("price", by="city"),
+                         {"c1": [1, 10.0, 10.0, 10.0],
+                          "c2": [1, 2.5, 2.5, 2.5]})
+
+    def testSet(self):
+        self.columns.summarize("price", by="city")
+        self.columns.set("c", "price", 6)
+        self.columns.set("c", "city", "c2")
+        self.assertEqual(self.columns.summarize("price", by="city"),
+                         {"c1": [1, 10.0, 10.0, 10.0],
+                          "c2": [2, 8.5, 2.5, 6.0]})
+
+    def testSummaryKept(self):
+        self.columns.summarize("price", by="city")
+        self.columns.summarize(None, by="city")
+        self.records["d"] = {"price": 3, "city": "c2"}
+        self.columns.add("d")
+        self.columns.set("a", "city", "c2")
+        self.assertEqual(set(self.columns.summaries),
+                         {("price", "city"), (None, "city")})
+        self.assertEqual(self.columns.summarize("price", by="city"),
+                         {"c2": [3, 15.5, 2.5, 10.0]})
+        self.assertEqual(self.columns.summarize(None, by="city"),
+                         {"c2": [3, 0.0, 0.0, 0.0]})
+
+    def testSummaryDropped(self):
+        self.columns.summarize("price", by="city")
+        self.records["d"] = {"price": 4, "city": "c2"}
+        self.columns.add("d")
+        self.columns.remove("b")
+        self.assertNotIn(("price", "city"), self.columns.summaries)
+        self.assertEqual(self.columns.summarize("price", by="city"),
+                         {"c1": [1, 10.0, 10.0, 10.0],
+                          "c2": [1, 4.0, 4.0, 4.0]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,289 @@
+#!/usr/bin/python3
+"""
+Unittest for models.engine.db_storage([..])
+
+This module contains the required tests for the specified module
+"""
+import unittest
+import os
+import sqlite3
+import models.engine.db_storage
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.base_model import BaseModel
+from models.place import Place
+from models.review import Review
+from models.user import User
+from unittest.mock import patch
+
+
+DB_PATH = "test_hbnb.db"
+
+
+def setUpModule():
+    FileStorage._FileStorage__objects = {}
+
+
+def tearDownModule():
+    FileStorage._FileStorage__objects = {}
+    for fname in (DB_PATH, "file.json"):
+        if os.path.exists(fname):
+            os.remove(fname)
+
+
+class TestAllDBStorageDocstrings(unittest.TestCase):
+    def testModuleDocstring(self):
+        self.assertGreater(len(models.engine.db_storage.__doc__), 1)
+
+    def testClassDocstring(self):
+        self.assertGreater(len(DBStorage.__doc__), 1)
+
+    def testMethodDocstrings(self):
+        for name in ("all", "count", "get", "lookup", "related", "new",
+                     "touch", "delete", "save", "reload"):
+            self.assertGreater(len(getattr(DBStorage, name).__doc__), 1)
+
+
+class TestDBStorage(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        self.storage = DBStorage(DB_PATH)
+        self.storage.reload()
+        self.patcher = patch("models.storage", self.storage)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def reopen(self):
+        self.storage = DBStorage(DB_PATH)
+        self.storage.reload()
+        self.patcher.stop()
+        self.patcher = patch("models.storage", self.storage)
+        self.patcher.start()
+
+    def testTables(self):
+        connection = sqlite3.connect(DB_PATH)
+        tables = {row[0] for row in connection.execute(
+                  "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        indexes = {row[0] for row in connection.execute(
+                   "SELECT name FROM sqlite_master WHERE type = 'index'")}
+        connection.close()
+        self.assertEqual(tables, set(FileStorage.MODELS))
+        self.assertIn("Review_place_id", indexes)
+
+    def testSaveAndReload(self):
+        u1 = User()
+        u1.first_name = "Ada"
+        u1.save()
+        self.reopen()
+        key = "User.{}".format(u1.id)
+        user = self.storage.get(User, u1.id)
+        self.assertEqual(self.storage.all(), {key: user})
+        self.assertEqual(self.storage.get(User, u1.id).to_dict(),
+                         u1.to_dict())
+
+    def testUnsavedChangesAreVisible(self):
+        u1 = User()
+        self.assertEqual(self.storage.count(User), 1)
+        self.assertIs(self.storage.get("User", u1.id), u1)
+        self.assertEqual(self.storage.all(User),
+                         {"User.{}".format(u1.id): u1})
+        self.reopen()
+        self.assertEqual(self.storage.count(User), 0)
+
+    def testUpdate(self):
+        u1 = User()
+        u1.save()
+        u1.first_name = "Ada"
+        u1.save()
+        self.reopen()
+        self.assertEqual(self.storage.get(User, u1.id).first_name, "Ada")
+        self.assertEqual(self.storage.count(), 1)
+
+    def testDelete(self):
+        u1 = User()
+        u1.save()
+        self.storage.delete(u1)
+        self.assertIsNone(self.storage.get(User, u1.id))
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(self.storage.count(), 0)
+
+    def testCount(self):
+        User()
+        User()
+        BaseModel()
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(self.storage.count(User), 2)
+        self.assertEqual(self.storage.count("Review"), 0)
+        self.assertEqual(self.storage.count("Foo"), 0)
+        with self.assertRaises(TypeError):
+            self.storage.count({})
+
+    def testLookupAndRelated(self):
+        p1 = Place()
+        r1 = Review()
+        r1.place_id = p1.id
+        Review()
+        self.storage.save()
+        self.reopen()
+        key = "Review.{}".format(r1.id)
+        self.assertEqual(list(self.storage.lookup(Review, "place_id",
+                                                  p1.id)), [key])
+        self.assertEqual(list(self.storage.related(Place, p1.id,
+                                                   "reviews")), [key])
+        review = self.storage.get(Review, r1.id)
+        review.text = "Quiet"
+        self.assertEqual(list(self.storage.lookup(Review, "text",
+                                                  "Quiet")), [key])
+
+    def testWhere(self):
+        p1 = Place()
+        p1.city_id = "c1"
+        p1.price_by_night = 50
+        p2 = Place()
+        p2.city_id = "c1"
+        p2.price_by_night = 150
+        self.storage.save()
+        self.reopen()
+        conditions = [("city_id", "eq", "c1"), ("price_by_night", "lt", 100)]
+        self.assertEqual(list(self.storage.where(Place, conditions)),
+                         ["Place.{}".format(p1.id)])
+        self.assertEqual(len(self.storage.where(Place, [], 1)), 1)
+        self.assertEqual(self.storage.where("Foo", []), {})
+        self.assertEqual(list(self.storage.range(Place, "price_by_night",
+                                                 100, 200)),
+                         ["Place.{}".format(p2.id)])
+
+    def testNearAndWithin(self):
+        p1 = Place()
+        p1.latitude = 37.7749
+        p1.longitude = -122.4194
+        p2 = Place()
+        p2.latitude = 34.0522
+        p2.longitude = -118.2437
+        self.storage.save()
+        self.reopen()
+        k1, k2 = "Place.{}".format(p1.id), "Place.{}".format(p2.id)
+        self.assertEqual(list(self.storage.near(Place, 34, -118, 600)),
+                         [k2, k1])
+        self.assertEqual(list(self.storage.within(Place, 37, -123, 38,
+                                                  -122)), [k1])
+
+    def testSearch(self):
+        r1 = Review()
+        r1.text = "Quiet and clean, very quiet"
+        r2 = Review()
+        r2.text = "Clean but noisy"
+        self.storage.save()
+        self.reopen()
+        k1, k2 = "Review.{}".format(r1.id), "Review.{}".format(r2.id)
+        self.assertEqual(list(self.storage.search(Review, "quiet clean")),
+                         [k1, k2])
+        self.assertEqual(list(self.storage.search(Review, "nois*")), [k2])
+        self.assertEqual(self.storage.search(Place, "quiet"), {})
+
+    def testAvg(self):
+        for city_id, price in (("c1", 100), ("c1", 50), ("c2", 80)):
+            place = Place()
+            place.city_id = city_id
+            place.price_by_night = price
+        self.storage.save()
+        self.assertEqual(self.storage.avg(Place, "price_by_night"),
+                         230 / 3)
+        self.assertEqual(self.storage.avg(Place, "price_by_night",
+                                          by="city_id"),
+                         {"c1": 75.0, "c2": 80.0})
+
+    def testCountByAndStats(self):
+        for city_id, price in (("c1", 100), ("c1", 50), ("c2", 80)):
+            place = Place()
+            place.city_id = city_id
+            place.price_by_night = price
+            place.amenity_ids = ["wifi"]
+        self.storage.save()
+        self.assertEqual(self.storage.count(Place, by="city_id"),
+                         {"c1": 2, "c2": 1})
+        self.assertEqual(self.storage.count(Place, by="amenity_ids"),
+                         {"wifi": 3})
+        self.assertEqual(self.storage.stats(Place, "price_by_night",
+                                            by="city_id")["c1"],
+                         {"count": 2, "sum": 150, "avg": 75.0, "min": 50,
+                          "max": 100})
+        self.assertEqual(self.storage.stats(Place, "name")["avg"], None)
+
+    def testClose(self):
+        user = User()
+        user.save()
+        other = User()
+        self.storage.close()
+        self.storage.close()
+        self.reopen()
+        self.assertEqual(list(self.storage.all(User)),
+                         ["User.{}".format(user.id)])
+
+    def testAmenityPlaces(self):
+        p1 = Place()
+        p1.amenity_ids = ["wifi", "parking"]
+        Place()
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(list(self.storage.related("Amenity", "wifi",
+                                                   "places")),
+                         ["Place.{}".format(p1.id)])
+
+    def testBatchCommit(self):
+        with self.storage.batch():
+            self.assertTrue(self.storage.in_batch())
+            for i in range(5):
+                User().save()
+            other = sqlite3.connect(DB_PATH)
+            count = other.execute('SELECT COUNT(*) FROM "User"').fetchone()
+            other.close()
+            self.assertEqual(count[0], 0)
+        self.assertFalse(self.storage.in_batch())
+        self.reopen()
+        self.assertEqual(self.storage.count(User), 5)
+
+    def testRollback(self):
+        u1 = User()
+        u1.save()
+        self.storage.begin()
+        u2 = User()
+        u2.save()
+        self.storage.get(User, u1.id).first_name = "Ada"
+        self.assertEqual(self.storage.count(User), 2)
+        self.storage.rollback()
+        self.assertEqual(self.storage.count(User), 1)
+        self.assertEqual(self.storage.get(User, u1.id).first_name, "")
+
+    def testNestedBatchRollsBackItsOwnChanges(self):
+        u1 = User()
+        u1.save()
+        self.storage.begin()
+        u2 = User()
+        self.storage.get(User, u1.id).first_name = "Ada"
+        with self.assertRaises(ValueError):
+            with self.storage.batch():
+                u3 = User()
+                self.storage.get(User, u1.id).first_name = "Grace"
+                self.storage.save()
+                raise ValueError
+        self.assertTrue(self.storage.in_batch())
+        self.assertIsNone(self.storage.get(User, u3.id))
+        self.assertEqual(self.storage.get(User, u1.id).first_name, "Ada")
+        self.storage.commit()
+        self.reopen()
+        self.assertEqual(self.storage.count(User), 2)
+        self.assertIsNotNone(self.storage.get(User, u2.id))
+        self.assertEqual(self.storage.get(User, u1.id).first_name, "Ada")
+
+    def testNestedBatchCommit(self):
+        self.storage.begin()
+        with self.storage.batch():
+            u1 = User()
+        self.assertTrue(self.storage.in_batch())
+        self.storage.rollback()
+        self.assertIsNone(self.storage.get(User, u1.id))
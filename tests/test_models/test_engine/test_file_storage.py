@@ -7,12 +7,24 @@ This module contains the required tests for the specified module
 import unittest
 import datetime
 from models.base_model import BaseModel
+from models.user import User
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.amenity import Amenity
 from models import storage
 import models.engine.file_storage
 from models.engine.file_storage import FileStorage
+from models.engine.text_index import TextIndex
 from unittest.mock import patch, mock_open
 import os
 import json
+import time
+import sys
+import marshal
+import shutil
+import threading
+import subprocess
 
 
 def fake_new_method(obj):
@@ -21,8 +33,9 @@ def fake_new_method(obj):
 
 def setUpModule():
     FileStorage._FileStorage__objects = {}
-    if os.path.exists("file.json"):
-        os.remove("file.json")
+    for fname in ("file.json", "file.json.1"):
+        if os.path.exists(fname):
+            os.remove(fname)
 
 
 class TestAllFileStorageDocstrings(unittest.TestCase):
@@ -86,6 +99,43 @@ class TestAllMethod(unittest.TestCase):
         with self.assertRaises(TypeError):
             storage.all({})
 
+    def testAllMethodWithClass(self):
+        FileStorage._FileStorage__objects = {}
+        b1 = BaseModel()
+        u1 = User()
+        k1 = '{}.{}'.format(type(b1).__name__, b1.id)
+        k2 = '{}.{}'.format(type(u1).__name__, u1.id)
+        self.assertEqual(storage.all(User), {k2: u1})
+        self.assertEqual(storage.all("BaseModel"), {k1: b1})
+        self.assertEqual(storage.all("Review"), {})
+        storage.delete(u1)
+        self.assertEqual(storage.all(User), {})
+        FileStorage._FileStorage__objects = {}
+
+
+class TestCountMethod(unittest.TestCase):
+    def testCount(self):
+        FileStorage._FileStorage__objects = {}
+        BaseModel()
+        User()
+        u1 = User()
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.count(User), 2)
+        self.assertEqual(storage.count("BaseModel"), 1)
+        self.assertEqual(storage.count("Review"), 0)
+        storage.delete(u1)
+        self.assertEqual(storage.count("User"), 1)
+        FileStorage._FileStorage__objects = {}
+
+    def testCountAfterObjectsReplaced(self):
+        User()
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(storage.count(User), 0)
+
+    def testCountWithInvalidClass(self):
+        with self.assertRaises(TypeError):
+            storage.count({})
+
 
 class TestReloadMethod(unittest.TestCase):
     def testReloadForAbsentFile(self):
@@ -149,18 +199,22 @@ class TestSaveMethod(unittest.TestCase):
         with self.assertRaises(TypeError):
             storage.save({})
 
-    def testSaveEmptyObjectsDict(self):
+    @patch("os.replace")
+    @patch("os.fsync")
+    def testSaveEmptyObjectsDict(self, mock_fsync, mock_replace):
         FileStorage._FileStorage__objects = {}
         fname = "file.json"
         fcontent = json.dumps({})
         with patch('models.engine.file_storage.open',
                    mock_open()) as mock_file:
             storage.save()
-            mock_file.assert_called_once_with(fname, 'w',
+            mock_file.assert_called_once_with(fname + '.tmp', 'w',
                                               encoding='utf-8')
         FileStorage._FileStorage__objects = {}
 
-    def testSaveMethodWithValidFile(self):
+    @patch("os.replace")
+    @patch("os.fsync")
+    def testSaveMethodWithValidFile(self, mock_fsync, mock_replace):
         FileStorage._FileStorage__objects = {}
         b1 = BaseModel()
         b2 = BaseModel()
@@ -172,6 +226,1487 @@ class TestSaveMethod(unittest.TestCase):
         with patch('models.engine.file_storage.open',
                    mock_open()) as mock_file:
             storage.save()
-            mock_file.assert_called_once_with(fname, 'w',
+            mock_file.assert_called_once_with(fname + '.tmp', 'w',
                                               encoding='utf-8')
         FileStorage._FileStorage__objects = {}
+
+
+class TestAtomicSave(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        for fname in ("file.json", "file.json.1", "file.json.2"):
+            if os.path.exists(fname):
+                os.remove(fname)
+
+    def read(self, fname):
+        with open(fname, encoding="utf-8") as json_file:
+            return json.load(json_file)
+
+    def testSaveKeepsBackup(self):
+        b1 = BaseModel()
+        storage.save()
+        first = self.read("file.json")
+        self.assertFalse(os.path.exists("file.json.1"))
+        BaseModel()
+        storage.save()
+        self.assertEqual(self.read("file.json.1"), first)
+        self.assertEqual(len(self.read("file.json")), 2)
+        self.assertFalse(os.path.exists("file.json.tmp"))
+
+    def testRotatingBackups(self):
+        with patch.object(FileStorage, "BACKUPS", 2):
+            contents = []
+            for _ in range(3):
+                BaseModel()
+                storage.save()
+                contents.append(self.read("file.json"))
+        self.assertEqual(self.read("file.json.1"), contents[1])
+        self.assertEqual(self.read("file.json.2"), contents[0])
+
+    def testInterruptedSave(self):
+        b1 = BaseModel()
+        storage.save()
+        content = self.read("file.json")
+        BaseModel()
+        with patch.object(FileStorage, "_FileStorage__write_records",
+                          side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                storage.save()
+        self.assertEqual(self.read("file.json"), content)
+        self.assertFalse(os.path.exists("file.json.tmp"))
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(list(storage.all()),
+                         ["BaseModel.{}".format(b1.id)])
+
+
+class TestWriteBehind(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        storage.save()
+        os.remove("file.json")
+        self.patchers = [patch.object(FileStorage, "write_behind", True),
+                         patch.object(FileStorage, "FLUSH_INTERVAL", 60)]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        storage.rollback()
+        storage.close()
+        for patcher in self.patchers:
+            patcher.stop()
+        FileStorage._FileStorage__objects = {}
+        for fname in ("file.json", "file.json.1"):
+            if os.path.exists(fname):
+                os.remove(fname)
+
+    def read(self):
+        with open("file.json", encoding="utf-8") as json_file:
+            return json.load(json_file)
+
+    def wait(self, condition):
+        for _ in range(200):
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def testSaveReturnsBeforeWriting(self):
+        b1 = BaseModel()
+        b1.save()
+        self.assertFalse(os.path.exists("file.json"))
+        storage.flush()
+        self.assertEqual(list(self.read()), ["BaseModel.{}".format(b1.id)])
+
+    def testGroupCommit(self):
+        with patch.object(FileStorage, "FLUSH_INTERVAL", 0.05), \
+                patch.object(FileStorage, "_FileStorage__write_records",
+                             wraps=storage._FileStorage__write_records) \
+                as write:
+            for _ in range(10):
+                BaseModel().save()
+            self.assertTrue(self.wait(lambda: write.call_count))
+            time.sleep(0.1)
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(len(self.read()), 10)
+
+    def testFlushAfterChanges(self):
+        with patch.object(FileStorage, "FLUSH_CHANGES", 3):
+            for _ in range(3):
+                BaseModel().save()
+            self.assertTrue(self.wait(lambda: os.path.exists("file.json")))
+        self.assertEqual(len(self.read()), 3)
+
+    def testReadsWhileFlushing(self):
+        keys = ["BaseModel.{}".format(BaseModel().id) for _ in range(2000)]
+        storage.save()
+        storage.flush()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        with patch.object(FileStorage, "FLUSH_INTERVAL", 0):
+            for i, key in enumerate(keys):
+                obj = storage.get(BaseModel, key.split(".", 1)[1])
+                obj.number = i
+                obj.save()
+        storage.close()
+        self.assertEqual(len(self.read()), 2000)
+        self.assertEqual(self.read()[keys[-1]]["number"], 1999)
+
+    def testChangesWhileWriting(self):
+        writing = threading.Event()
+        written = threading.Event()
+        write_records = storage._FileStorage__write_records
+
+        def slow_write(json_file, items):
+            writing.set()
+            written.wait(5)
+            write_records(json_file, items)
+
+        b1 = BaseModel()
+        with patch.object(FileStorage, "FLUSH_INTERVAL", 0), \
+                patch.object(FileStorage, "_FileStorage__write_records",
+                             side_effect=slow_write):
+            b1.save()
+            self.assertTrue(writing.wait(5))
+            changer = threading.Thread(target=b1.save)
+            changer.start()
+            changer.join(1)
+            self.assertFalse(changer.is_alive())
+            written.set()
+            storage.close()
+        self.assertEqual(self.read()["BaseModel.{}".format(b1.id)],
+                         b1.to_dict())
+
+    def testCloseWritesChanges(self):
+        BaseModel().save()
+        storage.close()
+        self.assertEqual(len(self.read()), 1)
+        BaseModel().save()
+        storage.close()
+        self.assertEqual(len(self.read()), 2)
+
+    def testBatchWaitsForCommit(self):
+        storage.begin()
+        BaseModel().save()
+        storage.flush()
+        self.assertFalse(os.path.exists("file.json"))
+        storage.commit()
+        storage.flush()
+        self.assertEqual(len(self.read()), 1)
+
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        storage.save()
+        os.remove("file.json")
+        self.patcher = patch.object(FileStorage, "sharded", True)
+        self.patcher.start()
+        self.user = User()
+        self.place = Place()
+        self.place.name = "Loft"
+        storage.save()
+
+    def tearDown(self):
+        self.patcher.stop()
+        FileStorage._FileStorage__objects = {}
+        FileStorage.journal = False
+        shutil.rmtree("data", ignore_errors=True)
+        for fname in ("file.json", "file.json.1", "file.json.log",
+                      "file.json.text"):
+            if os.path.exists(fname):
+                os.remove(fname)
+
+    def read(self, fname):
+        with open(fname, encoding="utf-8") as json_file:
+            return json.load(json_file)
+
+    def testSaveWritesShards(self):
+        self.assertFalse(os.path.exists("file.json"))
+        self.assertEqual(list(self.read("data/User.json")),
+                         ["User.{}".format(self.user.id)])
+        self.assertEqual(list(self.read("data/Place.json")),
+                         ["Place.{}".format(self.place.id)])
+
+    def testSaveWritesChangedShards(self):
+        with patch.object(FileStorage, "_FileStorage__replace") as replace:
+            self.user.first_name = "Ada"
+            City()
+            storage.delete(self.place)
+            storage.save()
+        self.assertEqual([call.args[0] for call in replace.call_args_list],
+                         [os.path.join("data", name)
+                          for name in ("City.json", "Place.json",
+                                       "User.json")])
+        with patch.object(FileStorage, "_FileStorage__replace") as replace:
+            storage.save()
+        replace.assert_not_called()
+
+    def testReloadShards(self):
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.get(Place, self.place.id).name, "Loft")
+        self.assertEqual(storage.count(), 2)
+
+    def testReloadSomeClasses(self):
+        FileStorage._FileStorage__objects = {}
+        storage.reload(classes=[Place])
+        self.assertEqual(list(storage.all()),
+                         ["Place.{}".format(self.place.id)])
+        storage.reload(classes=["User"])
+        self.assertEqual(storage.count(), 2)
+
+    def testReloadSomeClassesThenSave(self):
+        FileStorage._FileStorage__objects = {}
+        storage.reload(classes=[Place])
+        storage.save()
+        user = User()
+        storage.save()
+        self.assertEqual(sorted(self.read("data/User.json")),
+                         sorted(["User.{}".format(self.user.id),
+                                 "User.{}".format(user.id)]))
+        self.assertEqual(list(self.read("data/Place.json")),
+                         ["Place.{}".format(self.place.id)])
+
+    def testReloadSomeClassesWithLog(self):
+        FileStorage.journal = True
+        self.user.first_name = "Ada"
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload(classes=[Place])
+        self.assertEqual(storage.get(User, self.user.id).first_name, "Ada")
+        FileStorage.journal = False
+        storage.get(Place, self.place.id).name = "Barn"
+        storage.save()
+        self.assertEqual(self.read("data/User.json")[
+            "User.{}".format(self.user.id)]["first_name"], "Ada")
+
+    def testReloadSomeClassesThenSearch(self):
+        review = Review()
+        review.text = "Quiet street"
+        storage.search(Place, "loft")
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload(classes=[Place])
+        self.assertEqual(storage.search(Review, "quiet"), {})
+        self.assertEqual(list(storage.search(Place, "loft")),
+                         ["Place.{}".format(self.place.id)])
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(list(storage.search(Review, "quiet")),
+                         ["Review.{}".format(review.id)])
+
+    def testReloadSomeClassesNotSharded(self):
+        self.patcher.stop()
+        with self.assertRaises(ValueError):
+            storage.reload(classes=[Place])
+        self.patcher.start()
+
+    def testReloadSplitsJsonFile(self):
+        self.patcher.stop()
+        storage.save()
+        shutil.rmtree("data")
+        FileStorage._FileStorage__objects = {}
+        self.patcher.start()
+        storage.reload()
+        self.assertEqual(storage.count(), 2)
+        storage.save()
+        self.assertEqual(list(self.read("data/User.json")),
+                         ["User.{}".format(self.user.id)])
+
+    def testJournalCompaction(self):
+        FileStorage.journal = True
+        self.user.first_name = "Ada"
+        storage.save()
+        with patch.object(FileStorage, "COMPACT_MIN", 0):
+            self.place.name = "Barn"
+            storage.save()
+            self.assertTrue(os.path.exists("file.json.log"))
+            self.user.last_name = "Lovelace"
+            storage.save()
+        self.assertFalse(os.path.exists("file.json.log"))
+        self.assertEqual(self.read("data/User.json")[
+            "User.{}".format(self.user.id)]["last_name"], "Lovelace")
+        self.assertEqual(self.read("data/Place.json")[
+            "Place.{}".format(self.place.id)]["name"], "Barn")
+
+    def testJournalCompactionInNewProcess(self):
+        FileStorage.journal = True
+        amenity = Amenity()
+        self.place.name = "Barn"
+        storage.save()
+        env = dict(os.environ, HBNB_STORAGE_JOURNAL="1",
+                   HBNB_STORAGE_SHARDS="1", HBNB_TYPE_STORAGE="file")
+        subprocess.run([sys.executable, "-c", (
+            "from models import storage\n"
+            "from models.user import User\n"
+            "type(storage).COMPACT_MIN = 0\n"
+            "for name in 'ab':\n"
+            "    storage.get(User, '{}').first_name = name\n"
+            "    storage.save()\n".format(self.user.id))],
+            env=env, check=True)
+        self.assertFalse(os.path.exists("file.json.log"))
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.get(Place, self.place.id).name, "Barn")
+        self.assertEqual(storage.count(Amenity), 1)
+        self.assertEqual(storage.get(User, self.user.id).first_name, "b")
+
+
+class TestBuckets(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        storage.save()
+        os.remove("file.json")
+        self.patchers = [patch.object(FileStorage, "sharded", True),
+                         patch.object(FileStorage, "BUCKETS", {"Place": 4})]
+        for patcher in self.patchers:
+            patcher.start()
+        self.user = User()
+        self.places = [Place() for i in range(20)]
+        storage.save()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        FileStorage._FileStorage__objects = {}
+        shutil.rmtree("data", ignore_errors=True)
+
+    def read(self, fname):
+        with open(fname, encoding="utf-8") as json_file:
+            return json.load(json_file)
+
+    def testSaveWritesBuckets(self):
+        self.assertFalse(os.path.exists("data/Place.json"))
+        keys = []
+        for i in range(4):
+            # A bucket none of the random ids falls in has no file
+            if os.path.exists("data/Place.{}.json".format(i)):
+                keys.extend(self.read("data/Place.{}.json".format(i)))
+        self.assertEqual(sorted(keys), sorted(
+            "Place.{}".format(place.id) for place in self.places))
+        self.assertEqual(list(self.read("data/User.json")),
+                         ["User.{}".format(self.user.id)])
+
+    def testSaveWritesChangedBuckets(self):
+        key = "Place.{}".format(self.places[0].id)
+        with patch.object(FileStorage, "_FileStorage__replace") as replace:
+            self.places[0].name = "Loft"
+            storage.save()
+        replace.assert_called_once()
+        self.assertIn(key, self.read(replace.call_args.args[0]))
+
+    def testReloadBuckets(self):
+        self.places[0].name = "Loft"
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload(classes=[Place])
+        self.assertEqual(storage.count(), 20)
+        self.assertEqual(storage.get(Place, self.places[0].id).name, "Loft")
+
+    def testReloadOtherBuckets(self):
+        keys = sorted("Place.{}".format(place.id) for place in self.places)
+        for buckets in ({}, {"Place": 2}, {"Place": 8}):
+            FileStorage._FileStorage__objects = {}
+            with patch.object(FileStorage, "BUCKETS", buckets):
+                storage.reload()
+                self.assertEqual(storage.count(Place), 20)
+                storage.save()
+                files = sorted(name for name in os.listdir("data")
+                               if name.startswith("Place.") and
+                               name.endswith(".json"))
+                if buckets:
+                    self.assertLessEqual(set(files), {
+                        "Place.{}.json".format(i)
+                        for i in range(buckets["Place"])})
+                else:
+                    self.assertEqual(files, ["Place.json"])
+                stored = []
+                for name in files:
+                    stored.extend(self.read(os.path.join("data", name)))
+                self.assertEqual(sorted(stored), keys)
+                FileStorage._FileStorage__objects = {}
+                storage.reload()
+                self.assertEqual(storage.count(Place), 20)
+
+    def testReloadInParallel(self):
+        FileStorage._FileStorage__objects = {}
+        with patch.object(FileStorage, "PARALLEL_MIN", 0), \
+                patch.object(FileStorage, "WORKERS", 2):
+            storage.reload()
+        self.assertEqual(storage.count(Place), 20)
+        self.assertEqual(storage.count(User), 1)
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        storage.save()
+        os.remove("file.json")
+        self.patcher = patch.object(FileStorage, "binary", True)
+        self.patcher.start()
+        self.user = User()
+        self.user.first_name = "Ada"
+        self.place = Place()
+        self.place.amenity_ids = ["1234"]
+        self.place.rating = 4.5
+        storage.save()
+
+    def tearDown(self):
+        self.patcher.stop()
+        FileStorage._FileStorage__objects = {}
+        FileStorage.journal = False
+        for fname in ("file.json", "file.json.log", "file.bin",
+                      "file.bin.1"):
+            if os.path.exists(fname):
+                os.remove(fname)
+
+    def testSaveWritesSnapshot(self):
+        self.assertFalse(os.path.exists("file.json"))
+        with open("file.bin", "rb") as snapshot_file:
+            version, tables = marshal.load(snapshot_file)
+        self.assertEqual(version, FileStorage.SNAPSHOT_VERSION)
+        self.assertEqual(sorted(tables), ["Place", "User"])
+        fields, rows = tables["Place"]
+        self.assertEqual(fields[:4],
+                         ("id", "created_at", "updated_at", "city_id"))
+        self.assertEqual(fields[-1], "rating")
+        self.assertEqual(len(rows), 1)
+        self.assertIsInstance(rows[0][1], int)
+        self.assertIs(rows[0][3], ...)
+
+    def testReloadSnapshot(self):
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 2)
+        user = storage.get(User, self.user.id)
+        place = storage.get(Place, self.place.id)
+        self.assertEqual(user.to_dict(), self.user.to_dict())
+        self.assertEqual(place.to_dict(), self.place.to_dict())
+        self.assertEqual(place.created_at, self.place.created_at)
+        self.assertEqual(storage.lookup(Place, "amenity_ids", "1234"),
+                         {"Place.{}".format(place.id): place})
+
+    def testReloadSomeClasses(self):
+        with self.assertRaises(ValueError):
+            storage.reload(classes=[Place])
+        self.assertEqual(storage.count(), 2)
+
+    def testReloadJsonFile(self):
+        self.patcher.stop()
+        storage.save()
+        self.patcher.start()
+        os.remove("file.bin")
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 2)
+        storage.save()
+        self.assertTrue(os.path.exists("file.bin"))
+
+    def testReloadReplaysLog(self):
+        FileStorage.journal = True
+        self.user.last_name = "Lovelace"
+        storage.delete(self.place)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(list(storage.all()),
+                         ["User.{}".format(self.user.id)])
+        self.assertEqual(storage.get(User, self.user.id).last_name,
+                         "Lovelace")
+
+    def testRollback(self):
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        storage.begin()
+        storage.get(Place, self.place.id).name = "Loft"
+        storage.get(User, self.user.id).last_name = "Lovelace"
+        storage.rollback()
+        self.assertEqual(storage.count(), 2)
+        self.assertEqual(storage.get(Place, self.place.id).to_dict(),
+                         self.place.to_dict())
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.get(User, self.user.id).to_dict(),
+                         self.user.to_dict())
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        storage.save()
+        FileStorage.journal = True
+
+    def tearDown(self):
+        FileStorage.journal = False
+        FileStorage._FileStorage__objects = {}
+        for fname in ("file.json", "file.json.log"):
+            if os.path.exists(fname):
+                os.remove(fname)
+
+    def testSaveAppendsChangesOnly(self):
+        b1 = BaseModel()
+        b2 = BaseModel()
+        storage.save()
+        b1.name = "Tester"
+        b1.save()
+        with open("file.json.log", encoding="utf-8") as log_file:
+            entries = [json.loads(line) for line in log_file]
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(entries[-1]["key"], "BaseModel.{}".format(b1.id))
+        self.assertEqual(entries[-1]["value"], b1.to_dict())
+        with open("file.json", encoding="utf-8") as json_file:
+            self.assertEqual(json.load(json_file), {})
+
+    def testReloadReplaysLog(self):
+        b1 = BaseModel()
+        b2 = BaseModel()
+        storage.save()
+        storage.delete(b2)
+        b1.name = "Tester"
+        b1.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        key = "BaseModel.{}".format(b1.id)
+        self.assertEqual(list(storage.all()), [key])
+        self.assertEqual(storage.all()[key].to_dict(), b1.to_dict())
+
+    def testReloadIgnoresTruncatedEntry(self):
+        b1 = BaseModel()
+        storage.save()
+        with open("file.json.log", "a", encoding="utf-8") as log_file:
+            log_file.write('{"key": "BaseModel.1", "val')
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(list(storage.all()),
+                         ["BaseModel.{}".format(b1.id)])
+        with open("file.json.log", encoding="utf-8") as log_file:
+            self.assertEqual(len(log_file.readlines()), 1)
+
+    def testCompaction(self):
+        with patch.object(FileStorage, "COMPACT_MIN", 2):
+            b1 = BaseModel()
+            b1.save()
+            b1.save()
+            self.assertTrue(os.path.exists("file.json.log"))
+            b1.save()
+        self.assertFalse(os.path.exists("file.json.log"))
+        with open("file.json", encoding="utf-8") as json_file:
+            self.assertEqual(json.load(json_file),
+                             {"BaseModel.{}".format(b1.id): b1.to_dict()})
+
+    def testCompactionCountsUnloadedRecords(self):
+        models = [BaseModel() for _ in range(5)]
+        FileStorage.journal = False
+        storage.save()
+        FileStorage.journal = True
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        with patch.object(FileStorage, "COMPACT_MIN", 0):
+            b1 = storage.get(BaseModel, models[0].id)
+            b1.name = "Tester"
+            b1.save()
+            b1.name = "Other"
+            b1.save()
+        with open("file.json.log", encoding="utf-8") as log_file:
+            self.assertEqual(len(log_file.readlines()), 2)
+        self.assertEqual(storage.count(BaseModel), 5)
+
+
+class TestDirtyTracking(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def testSaveSerializesChangedObjectsOnly(self):
+        b1 = BaseModel()
+        b2 = BaseModel()
+        storage.save()
+        b1.name = "Tester"
+        with patch.object(BaseModel, "to_dict",
+                          autospec=True,
+                          side_effect=BaseModel.to_dict) as mock_to_dict:
+            storage.save()
+            self.assertEqual(mock_to_dict.call_args_list,
+                             [unittest.mock.call(b1)])
+        with open("file.json", encoding="utf-8") as json_file:
+            f_dict = json.load(json_file)
+        self.assertEqual(f_dict["BaseModel.{}".format(b1.id)]["name"],
+                         "Tester")
+        self.assertEqual(f_dict["BaseModel.{}".format(b2.id)], b2.to_dict())
+
+    def testSaveDropsDeletedObjects(self):
+        b1 = BaseModel()
+        b2 = BaseModel()
+        storage.save()
+        storage.delete(b2)
+        storage.save()
+        with open("file.json", encoding="utf-8") as json_file:
+            self.assertEqual(list(json.load(json_file)),
+                             ["BaseModel.{}".format(b1.id)])
+
+    def testUnstoredObjectIsNotTracked(self):
+        with patch('models.storage.new', fake_new_method):
+            b1 = BaseModel()
+        b1.name = "Tester"
+        self.assertNotIn("BaseModel.{}".format(b1.id),
+                         FileStorage._FileStorage__changes)
+
+
+class TestLookupMethod(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def testLookupForeignKey(self):
+        p1 = Place()
+        r1 = Review()
+        r2 = Review()
+        Review()
+        r1.place_id = p1.id
+        r2.place_id = p1.id
+        k1 = "Review.{}".format(r1.id)
+        k2 = "Review.{}".format(r2.id)
+        self.assertEqual(storage.lookup(Review, "place_id", p1.id),
+                         {k1: r1, k2: r2})
+        r2.place_id = "other"
+        self.assertEqual(storage.lookup("Review", "place_id", p1.id),
+                         {k1: r1})
+        self.assertEqual(storage.lookup("Review", "place_id", "other"),
+                         {k2: r2})
+        storage.delete(r1)
+        self.assertEqual(storage.lookup("Review", "place_id", p1.id), {})
+
+    def testLookupOtherAttribute(self):
+        u1 = User()
+        u1.first_name = "Ada"
+        User()
+        self.assertEqual(storage.lookup(User, "first_name", "Ada"),
+                         {"User.{}".format(u1.id): u1})
+
+    def testLookupUnhashableValue(self):
+        c1 = City()
+        c1.state_id = ["a"]
+        self.assertEqual(storage.lookup(City, "state_id", ["a"]), {})
+        c1.state_id = "a"
+        self.assertEqual(storage.lookup(City, "state_id", "a"),
+                         {"City.{}".format(c1.id): c1})
+
+    def testLookupAfterReload(self):
+        c1 = City()
+        c1.state_id = "s1"
+        c1.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(list(storage.lookup(City, "state_id", "s1")),
+                         ["City.{}".format(c1.id)])
+
+    def testRelated(self):
+        p1 = Place()
+        r1 = Review()
+        r1.place_id = p1.id
+        self.assertEqual(storage.related(Place, p1.id, "reviews"),
+                         {"Review.{}".format(r1.id): r1})
+        self.assertEqual(storage.related("User", p1.id, "places"), {})
+
+
+class TestWhereMethod(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = []
+        for city_id, price in (("c1", 50), ("c1", 150), ("c2", 80)):
+            place = Place()
+            place.city_id = city_id
+            place.price_by_night = price
+            self.places.append(place)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def keys(self, *places):
+        return ["Place.{}".format(place.id) for place in places]
+
+    def testWhereConditions(self):
+        p1, p2, p3 = self.places
+        self.assertEqual(list(storage.where(Place, [])),
+                         self.keys(p1, p2, p3))
+        self.assertEqual(list(storage.where(Place, [("city_id", "eq", "c1"),
+                                                    ("price_by_night", "lt",
+                                                     100)])),
+                         self.keys(p1))
+        self.assertEqual(list(storage.where("Place",
+                                            [("price_by_night", "gte", 80),
+                                             ("city_id", "ne", "c2")])),
+                         self.keys(p2))
+        self.assertEqual(storage.where(Place, [("city_id", "eq", "c3")]), {})
+
+    def testWhereLimit(self):
+        p1, p2, p3 = self.places
+        self.assertEqual(list(storage.where(Place, [], 2)),
+                         self.keys(p1, p2))
+        self.assertEqual(storage.where(Place, [], 0), {})
+
+    def testWhereDates(self):
+        p1, p2, p3 = self.places
+        p3.created_at = datetime.datetime(1999, 12, 31)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        storage.get(Place, p1.id)
+        conditions = [("created_at", "gt", "2000-01-01")]
+        self.assertEqual(sorted(storage.where(Place, conditions)),
+                         sorted(self.keys(p1, p2)))
+        conditions = [("created_at", "lt", "2000-01-01T00:00:00")]
+        self.assertEqual(list(storage.where(Place, conditions)),
+                         self.keys(p3))
+
+    def testWhereMismatchedTypes(self):
+        self.places[0].price_by_night = "cheap"
+        self.assertEqual(list(storage.where(Place, [("price_by_night", "lt",
+                                                     100)])),
+                         self.keys(self.places[2]))
+
+    def testWhereBuildsOnlyMatches(self):
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        with patch.object(FileStorage, "lazy", True):
+            storage.reload()
+        result = storage.where(Place, [("price_by_night", "gt", 100)])
+        self.assertEqual(list(result), self.keys(self.places[1]))
+        self.assertEqual(list(FileStorage._FileStorage__objects),
+                         self.keys(self.places[1]))
+
+
+class TestRangeMethod(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = []
+        for price, guests in ((120, 2), (50, 4), (90, 6), (200, 4)):
+            place = Place()
+            place.price_by_night = price
+            place.max_guest = guests
+            self.places.append(place)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def keys(self, *places):
+        return ["Place.{}".format(place.id) for place in places]
+
+    def testRange(self):
+        p1, p2, p3, p4 = self.places
+        self.assertEqual(list(storage.range(Place, "price_by_night", 50,
+                                            120)),
+                         self.keys(p2, p3, p1))
+        self.assertEqual(list(storage.range("Place", "price_by_night",
+                                            high=90)),
+                         self.keys(p2, p3))
+        self.assertEqual(list(storage.range(Place, "price_by_night", 100)),
+                         self.keys(p1, p4))
+        self.assertEqual(storage.range(Place, "price_by_night", 300), {})
+
+    def testRangeFollowsChanges(self):
+        p1, p2, p3, p4 = self.places
+        storage.range(Place, "price_by_night")
+        p4.price_by_night = 60
+        p2.price_by_night = "free"
+        storage.delete(p3)
+        place = Place()
+        place.price_by_night = 55
+        self.assertEqual(list(storage.range(Place, "price_by_night", 50,
+                                            120)),
+                         self.keys(place, p4, p1))
+
+    def testRangeAfterReload(self):
+        self.places[1].price_by_night = 75.5
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        with patch.object(FileStorage, "lazy", True):
+            storage.reload()
+        self.assertEqual(list(storage.range(Place, "price_by_night", 75,
+                                            76)),
+                         self.keys(self.places[1]))
+        self.assertEqual(FileStorage._FileStorage__objects,
+                         {"Place.{}".format(self.places[1].id):
+                          storage.get(Place, self.places[1].id)})
+
+    def testWhereUsesNarrowestIndex(self):
+        p1, p2, p3, p4 = self.places
+        conditions = [("price_by_night", "gte", 50),
+                      ("price_by_night", "lte", 120),
+                      ("max_guest", "gte", 4)]
+        self.assertEqual(list(storage.where(Place, conditions)),
+                         self.keys(p2, p3))
+        conditions = [("price_by_night", "gt", 90),
+                      ("price_by_night", "lt", 200)]
+        self.assertEqual(list(storage.where(Place, conditions)),
+                         self.keys(p1))
+        conditions = [("max_guest", "eq", 4), ("price_by_night", "ne", 50)]
+        self.assertEqual(list(storage.where(Place, conditions)),
+                         self.keys(p4))
+
+    def testRangeOtherAttribute(self):
+        self.places[0].name = 3
+        self.assertEqual(list(storage.range(Place, "name", 1, 5)),
+                         self.keys(self.places[0]))
+
+
+class TestGeoIndex(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = {}
+        for name, latitude, longitude in (("sf", 37.7749, -122.4194),
+                                          ("oakland", 37.8044, -122.2712),
+                                          ("la", 34.0522, -118.2437),
+                                          ("suva", -18.1, 179.9),
+                                          ("taveuni", -16.8, -179.95)):
+            place = Place()
+            place.latitude = latitude
+            place.longitude = longitude
+            self.places[name] = place
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def keys(self, *names):
+        return ["Place.{}".format(self.places[name].id) for name in names]
+
+    def testDistance(self):
+        self.assertAlmostEqual(storage.distance(37.7749, -122.4194,
+                                                34.0522, -118.2437),
+                               559.1, places=0)
+        self.assertEqual(storage.distance(10, 20, 10, 20), 0)
+
+    def testNear(self):
+        self.assertEqual(list(storage.near(Place, 37.8, -122.3, 20)),
+                         self.keys("oakland", "sf"))
+        self.assertEqual(list(storage.near("Place", 37.7749, -122.4194, 5)),
+                         self.keys("sf"))
+        self.assertEqual(list(storage.near(Place, 37.7749, -122.4194, 600)),
+                         self.keys("sf", "oakland", "la"))
+        self.assertEqual(list(storage.near(Place, -17.5, 180, 200)),
+                         self.keys("suva", "taveuni"))
+        self.assertEqual(storage.near(Place, 0, 0, 10),
+                         storage.near(User, 0, 0, 10))
+
+    def testWithin(self):
+        self.assertEqual(list(storage.within(Place, 37, -123, 38, -122)),
+                         self.keys("sf", "oakland"))
+        self.assertEqual(list(storage.within(Place, -20, 179, -15, -179)),
+                         self.keys("suva", "taveuni"))
+        self.assertEqual(list(storage.within(Place, -90, -180, 90, 180)),
+                         self.keys("sf", "oakland", "la", "suva", "taveuni"))
+        self.assertEqual(storage.within(Place, 0, 0, 1, 1), {})
+
+    def testInfiniteBox(self):
+        inf = float("inf")
+        self.assertEqual(list(storage.within(Place, -inf, -inf, inf, inf)),
+                         self.keys("sf", "oakland", "la", "suva", "taveuni"))
+        self.assertEqual(list(storage.within(Place, 37, -inf, inf, -122)),
+                         self.keys("sf", "oakland"))
+        self.assertEqual(len(storage.near(Place, 0, 0, inf)), 5)
+        with self.assertRaises(ValueError):
+            storage.within(Place, float("nan"), 0, 1, 1)
+        with self.assertRaises(ValueError):
+            storage.near(Place, float("nan"), 0, 10)
+        with self.assertRaises(ValueError):
+            storage.near(Place, 0, inf, 10)
+
+    def testGridFollowsChanges(self):
+        storage.within(Place, 0, 0, 1, 1)
+        self.places["la"].latitude = 37.79
+        self.places["la"].longitude = -122.4
+        self.places["oakland"].latitude = "north"
+        storage.delete(self.places["sf"])
+        place = Place()
+        place.latitude = 37.78
+        place.longitude = -122.41
+        self.assertEqual(list(storage.within(Place, 37, -123, 38, -122)),
+                         self.keys("la") + ["Place.{}".format(place.id)])
+
+    def testGridAfterReload(self):
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        with patch.object(FileStorage, "lazy", True):
+            storage.reload()
+        self.assertEqual(list(storage.within(Place, 37, -123, 38, -122)),
+                         self.keys("sf", "oakland"))
+        self.assertEqual(len(FileStorage._FileStorage__objects), 2)
+
+
+class TestSearchMethod(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.reviews = []
+        for text in ("Quiet and clean, very quiet street",
+                     "Clean room but noisy",
+                     "Noisy bar downstairs",
+                     "Quite far from the center"):
+            review = Review()
+            review.text = text
+            self.reviews.append(review)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        for path in ("file.json", "file.json.text"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def keys(self, *reviews):
+        return ["Review.{}".format(review.id) for review in reviews]
+
+    def testSearchRanking(self):
+        r1, r2, r3, r4 = self.reviews
+        self.assertEqual(list(storage.search(Review, "quiet clean")),
+                         self.keys(r1, r2))
+        self.assertEqual(list(storage.search("Review", "NOISY")),
+                         self.keys(r2, r3))
+        self.assertEqual(list(storage.search(Review, "quiet noisy", 1)),
+                         self.keys(r1))
+        self.assertEqual(storage.search(Review, "pool"), {})
+        self.assertEqual(storage.search(User, "quiet"), {})
+
+    def testSearchPrefix(self):
+        r1, r2, r3, r4 = self.reviews
+        self.assertEqual(list(storage.search(Review, "qui*")),
+                         self.keys(r1, r4))
+        self.assertEqual(list(storage.search(Review, "qui")), [])
+
+    def testSearchFollowsChanges(self):
+        r1, r2, r3, r4 = self.reviews
+        storage.search(Review, "quiet")
+        r2.text = "Quiet at night"
+        storage.delete(r1)
+        place = Place()
+        place.description = "Quiet loft"
+        review = Review()
+        review.text = "quiet"
+        self.assertEqual(sorted(storage.search(Review, "quiet")),
+                         sorted(self.keys(r2, review)))
+        self.assertEqual(list(storage.search(Place, "loft")),
+                         ["Place.{}".format(place.id)])
+        self.assertEqual(list(storage.search(Review, "qui*")),
+                         self.keys(r4, r2, review))
+
+    def testIndexIsSaved(self):
+        storage.save()
+        self.assertFalse(os.path.exists("file.json.text"))
+        storage.search(Review, "quiet")
+        self.reviews[2].text = "Quiet now"
+        storage.save()
+        self.assertFalse(os.path.exists("file.json.text"))
+        storage.flush()
+        self.assertTrue(os.path.exists("file.json.text"))
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        with patch.object(TextIndex, "add") as add:
+            self.assertEqual(list(storage.search(Review, "now")),
+                             self.keys(self.reviews[2]))
+        add.assert_not_called()
+
+    def testIndexIsNotSavedBySave(self):
+        storage.search(Review, "quiet")
+        storage.save()
+        storage.flush()
+        with patch.object(FileStorage, "_FileStorage__text_index_writer") \
+                as writer:
+            self.reviews[2].text = "Quiet now"
+            storage.save()
+            storage.flush()
+            storage.flush()
+        writer.assert_called_once()
+
+    def testIndexIsSavedByCompaction(self):
+        storage.search(Review, "quiet")
+        storage.save()
+        FileStorage.journal = True
+        try:
+            with patch.object(FileStorage, "COMPACT_MIN", 0):
+                for review in self.reviews:
+                    review.text = "Loud"
+                storage.save()
+                self.assertTrue(os.path.exists("file.json.log"))
+                self.assertFalse(os.path.exists("file.json.text"))
+                self.reviews[2].text = "Quiet now"
+                storage.save()
+        finally:
+            FileStorage.journal = False
+        self.assertFalse(os.path.exists("file.json.log"))
+        self.assertTrue(os.path.exists("file.json.text"))
+
+    def testStaleIndexIsRebuilt(self):
+        storage.search(Review, "quiet")
+        storage.save()
+        self.reviews[0].text = "Loud"
+        FileStorage._FileStorage__texts = None
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(list(storage.search(Review, "loud")),
+                         self.keys(self.reviews[0]))
+
+    def testIndexIgnoredWithPendingChanges(self):
+        storage.search(Review, "quiet")
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        review = Review()
+        review.text = "Quiet"
+        self.assertEqual(len(storage.search(Review, "quiet")), 2)
+
+
+class TestAmenityIndex(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.wifi = Amenity()
+        self.parking = Amenity()
+        self.places = []
+        for ids in ([self.wifi.id], [self.wifi.id, self.parking.id],
+                    [self.parking.id], []):
+            place = Place()
+            place.amenity_ids = ids
+            self.places.append(place)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def keys(self, *places):
+        return ["Place.{}".format(place.id) for place in places]
+
+    def testRelated(self):
+        p1, p2, p3, p4 = self.places
+        self.assertEqual(list(storage.related(Amenity, self.wifi.id,
+                                              "places")),
+                         self.keys(p1, p2))
+        self.assertEqual(list(storage.lookup(Place, "amenity_ids",
+                                             self.parking.id)),
+                         self.keys(p2, p3))
+
+    def testChangedInPlace(self):
+        p1, p2, p3, p4 = self.places
+        p4.amenity_ids.append(self.wifi.id)
+        p2.amenity_ids.remove(self.wifi.id)
+        p4.save()
+        self.assertEqual(list(storage.lookup(Place, "amenity_ids",
+                                             self.wifi.id)),
+                         self.keys(p1, p4))
+        self.assertEqual(storage.count(Place, "amenity_ids"),
+                         {self.wifi.id: 2, self.parking.id: 2})
+        storage.delete(p4)
+        self.assertEqual(list(storage.lookup(Place, "amenity_ids",
+                                             self.wifi.id)),
+                         self.keys(p1))
+
+    def testWhereContainsAll(self):
+        conditions = [("amenity_ids", "contains", self.wifi.id),
+                      ("amenity_ids", "contains", self.parking.id)]
+        self.assertEqual(list(storage.where(Place, conditions)),
+                         self.keys(self.places[1]))
+        conditions.append(("amenity_ids", "contains", "pool"))
+        self.assertEqual(storage.where(Place, conditions), {})
+
+    def testIndexFollowsChanges(self):
+        p1, p2, p3, p4 = self.places
+        p1.amenity_ids = [self.parking.id]
+        p4.amenity_ids = [self.wifi.id, self.parking.id]
+        storage.delete(p2)
+        conditions = [("amenity_ids", "contains", self.wifi.id),
+                      ("amenity_ids", "contains", self.parking.id)]
+        self.assertEqual(list(storage.where(Place, conditions)),
+                         self.keys(p4))
+        self.assertEqual(list(storage.related(Amenity, self.parking.id,
+                                              "places")),
+                         self.keys(p3, p1, p4))
+
+    def testIndexAfterReload(self):
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        with patch.object(FileStorage, "lazy", True):
+            storage.reload()
+        self.assertEqual(list(storage.related(Amenity, self.wifi.id,
+                                              "places")),
+                         self.keys(*self.places[:2]))
+        self.assertEqual(len(FileStorage._FileStorage__objects), 2)
+
+
+class TestAvgMethod(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = []
+        for city_id, price in (("c1", 100), ("c1", 50), ("c2", 80),
+                               ("c2", "free")):
+            place = Place()
+            place.city_id = city_id
+            place.price_by_night = price
+            self.places.append(place)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def testAvg(self):
+        self.assertEqual(storage.avg(Place, "price_by_night"),
+                         230 / 3)
+        self.assertEqual(storage.avg("Place", "price_by_night",
+                                     by="city_id"),
+                         {"c1": 75.0, "c2": 80.0})
+        self.assertIsNone(storage.avg(Place, "name"))
+        self.assertEqual(storage.avg(Review, "text", by="place_id"), {})
+
+    def testAvgFollowsChanges(self):
+        storage.avg(Place, "price_by_night", by="city_id")
+        p1, p2, p3, p4 = self.places
+        p4.price_by_night = 20
+        p2.city_id = "c3"
+        storage.delete(p1)
+        place = Place()
+        place.city_id = "c3"
+        place.price_by_night = 10
+        self.assertEqual(storage.avg(Place, "price_by_night",
+                                     by="city_id"),
+                         {"c2": 50.0, "c3": 30.0})
+        self.assertEqual(storage.avg(Place, "price_by_night"), 40.0)
+
+    def testAvgAfterReload(self):
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        with patch.object(FileStorage, "lazy", True):
+            storage.reload()
+        self.assertEqual(storage.avg(Place, "price_by_night",
+                                     by="city_id"),
+                         {"c1": 75.0, "c2": 80.0})
+        self.assertEqual(storage.avg(Place, "max_guest"), 0.0)
+        self.assertEqual(len(FileStorage._FileStorage__objects), 0)
+
+
+class TestAggregates(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = []
+        for city_id, price in (("c1", 100), ("c1", 50), ("c2", 80)):
+            place = Place()
+            place.city_id = city_id
+            place.price_by_night = price
+            place.amenity_ids = ["wifi"]
+            self.places.append(place)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def testCountBy(self):
+        self.assertEqual(storage.count(Place, by="city_id"),
+                         {"c1": 2, "c2": 1})
+        self.assertEqual(storage.count(Place, by="amenity_ids"),
+                         {"wifi": 3})
+        self.assertEqual(storage.count(Place, by="max_guest"), {0: 3})
+        self.assertEqual(storage.count(Review, by="place_id"), {})
+
+    def testStats(self):
+        self.assertEqual(storage.stats(Place, "price_by_night"),
+                         {"count": 3, "sum": 230, "avg": 230 / 3,
+                          "min": 50, "max": 100})
+        self.assertEqual(storage.stats(Place, "price_by_night",
+                                       by="city_id")["c2"],
+                         {"count": 1, "sum": 80, "avg": 80.0, "min": 80,
+                          "max": 80})
+        self.assertEqual(storage.stats(Place, "latitude"),
+                         {"count": 3, "sum": 0.0, "avg": 0.0, "min": 0.0,
+                          "max": 0.0})
+        self.assertEqual(storage.stats(Review, "text"),
+                         {"count": 0, "sum": 0, "avg": None, "min": None,
+                          "max": None})
+
+    def testAggregatesKeptUpToDate(self):
+        storage.stats(Place, "price_by_night", by="city_id")
+        storage.count(Place, by="number_rooms")
+        p1, p2, p3 = self.places
+        with patch("models.engine.columns.Columns.compute") as compute:
+            p3.price_by_night = 90
+            p3.city_id = "c1"
+            p2.number_rooms = 2
+            self.assertEqual(storage.stats(Place, "price_by_night",
+                                           by="city_id"),
+                             {"c1": {"count": 3, "sum": 240,
+                                     "avg": 80.0, "min": 50, "max": 100}})
+            self.assertEqual(storage.count(Place, by="number_rooms"),
+                             {0: 2, 2: 1})
+            self.assertEqual(compute.call_count, 0)
+
+    def testMaximumRemoved(self):
+        storage.stats(Place, "price_by_night")
+        storage.delete(self.places[0])
+        self.assertEqual(storage.stats(Place, "price_by_night"),
+                         {"count": 2, "sum": 130, "avg": 65.0, "min": 50,
+                          "max": 80})
+
+
+class TestLazyReload(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.u1 = User()
+        self.p1 = Place()
+        self.p1.city_id = "c1"
+        self.p2 = Place()
+        storage.save()
+        self.patcher = patch.object(FileStorage, "lazy", True)
+        self.patcher.start()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+
+    def tearDown(self):
+        self.patcher.stop()
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def testReloadBuildsNoInstance(self):
+        self.assertEqual(FileStorage._FileStorage__objects, {})
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.count(Place), 2)
+        self.assertEqual(FileStorage._FileStorage__objects, {})
+
+    def testGetBuildsOneInstance(self):
+        p1 = storage.get(Place, self.p1.id)
+        self.assertEqual(p1.to_dict(), self.p1.to_dict())
+        self.assertIs(storage.get("Place", self.p1.id), p1)
+        self.assertEqual(list(FileStorage._FileStorage__objects),
+                         ["Place.{}".format(self.p1.id)])
+        self.assertIsNone(storage.get(Place, "1234"))
+
+    def testAllClassBuildsClassInstances(self):
+        self.assertEqual(len(storage.all(Place)), 2)
+        self.assertEqual(len(FileStorage._FileStorage__objects), 2)
+        self.assertEqual(len(storage.all()), 3)
+
+    def testLookupUnloaded(self):
+        found = storage.lookup(Place, "city_id", "c1")
+        self.assertEqual(list(found), ["Place.{}".format(self.p1.id)])
+        self.assertEqual(len(FileStorage._FileStorage__objects), 1)
+
+    def testSaveKeepsUnloaded(self):
+        u1 = storage.get(User, self.u1.id)
+        u1.first_name = "Ada"
+        storage.save()
+        with open("file.json", encoding="utf-8") as json_file:
+            f_dict = json.load(json_file)
+        self.assertEqual(len(f_dict), 3)
+        self.assertEqual(f_dict["User.{}".format(u1.id)]["first_name"],
+                         "Ada")
+        self.assertEqual(f_dict["Place.{}".format(self.p1.id)],
+                         self.p1.to_dict())
+
+    def testNewReplacesUnloaded(self):
+        p1 = Place(**self.p1.to_dict())
+        p1.city_id = "c2"
+        storage.new(p1)
+        self.assertEqual(storage.count(Place), 2)
+        self.assertEqual(storage.lookup(Place, "city_id", "c1"), {})
+        self.assertIs(storage.get(Place, p1.id), p1)
+
+    def testEagerReload(self):
+        FileStorage._FileStorage__objects = {}
+        with patch.object(FileStorage, "lazy", False):
+            storage.reload()
+        self.assertEqual(len(FileStorage._FileStorage__objects), 3)
+
+
+class TestStreamingFile(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    def reloadFrom(self, content, chunk_size):
+        with open("file.json", "w", encoding="utf-8") as json_file:
+            json_file.write(content)
+        FileStorage._FileStorage__objects = {}
+        with patch.object(FileStorage, "CHUNK_SIZE", chunk_size):
+            storage.reload()
+        return {k: v.to_dict() for k, v in storage.all().items()}
+
+    def testSaveWritesJson(self):
+        b1 = BaseModel()
+        b1.name = 'Café "Le Monde", {a: [1]}'
+        b2 = BaseModel()
+        storage.save()
+        with open("file.json", encoding="utf-8") as json_file:
+            self.assertEqual(json.load(json_file),
+                             {"BaseModel.{}".format(b1.id): b1.to_dict(),
+                              "BaseModel.{}".format(b2.id): b2.to_dict()})
+
+    def testReloadAcrossChunks(self):
+        f_dict = {}
+        for i in range(5):
+            b = BaseModel()
+            b.name = 'Bébé "{}", }}'.format(i)
+            b.number = 123456789 * i
+            b.ratio = 0.5 + i
+            b.tags = [None, True, {"k": "v"}]
+            f_dict["BaseModel.{}".format(b.id)] = b.to_dict()
+        for content in (json.dumps(f_dict), json.dumps(f_dict, indent=4)):
+            for chunk_size in (1, 2, 7, 64, 1 << 16):
+                self.assertEqual(self.reloadFrom(content, chunk_size),
+                                 f_dict)
+
+    def testReloadEmptyObject(self):
+        for content in ("{}", " {\n} \n"):
+            for chunk_size in (1, 3, 1 << 16):
+                self.assertEqual(self.reloadFrom(content, chunk_size), {})
+
+    def testReloadInvalidFile(self):
+        b1 = BaseModel()
+        content = json.dumps({"BaseModel.{}".format(b1.id): b1.to_dict()})
+        for bad in ("", "[]", content[:-1], content[:-10], content + "x"):
+            for chunk_size in (1, 1 << 16):
+                with self.assertRaises(json.decoder.JSONDecodeError):
+                    self.reloadFrom(bad, chunk_size)
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.u1 = User()
+        self.u1.save()
+
+    def tearDown(self):
+        storage.rollback()
+        FileStorage._FileStorage__objects = {}
+        if os.path.exists("file.json"):
+            os.remove("file.json")
+
+    @patch("os.replace")
+    @patch("os.fsync")
+    def testBatchSavesOnce(self, mock_fsync, mock_replace):
+        with patch('models.engine.file_storage.open',
+                   mock_open()) as mock_file:
+            with storage.batch():
+                self.assertTrue(storage.in_batch())
+                for i in range(10):
+                    User().save()
+                self.assertEqual(mock_file.call_count, 0)
+            self.assertEqual(mock_file.call_count, 1)
+        self.assertFalse(storage.in_batch())
+        self.assertEqual(storage.count(User), 11)
+
+    @patch("os.replace")
+    @patch("os.fsync")
+    def testNestedBatches(self, mock_fsync, mock_replace):
+        with patch('models.engine.file_storage.open',
+                   mock_open()) as mock_file:
+            storage.begin()
+            storage.begin()
+            User().save()
+            storage.commit()
+            self.assertEqual(mock_file.call_count, 0)
+            storage.commit()
+            self.assertEqual(mock_file.call_count, 1)
+
+    def testRollback(self):
+        p1 = Place()
+        p1.city_id = "c1"
+        p1.save()
+        storage.begin()
+        u2 = User()
+        self.u1.first_name = "Ada"
+        self.u1.save()
+        storage.delete(p1)
+        storage.rollback()
+        self.assertFalse(storage.in_batch())
+        self.assertIsNone(storage.get(User, u2.id))
+        self.assertEqual(storage.get(User, self.u1.id).first_name, "")
+        self.assertEqual(storage.get(Place, p1.id).to_dict(), p1.to_dict())
+        self.assertEqual(list(storage.lookup(Place, "city_id", "c1")),
+                         ["Place.{}".format(p1.id)])
+        self.assertEqual(storage.count(), 2)
+
+    def testRollbackListChangedInPlace(self):
+        p1 = Place()
+        p1.amenity_ids = ["wifi"]
+        p1.save()
+        for begin in (False, True):
+            if begin:
+                storage.begin()
+            place = storage.get(Place, p1.id)
+            place.amenity_ids.append("pool")
+            place.name = "Loft"
+            storage.rollback()
+            self.assertEqual(storage.get(Place, p1.id).amenity_ids, ["wifi"])
+            self.assertEqual(storage.lookup(Place, "amenity_ids", "pool"), {})
+
+    def testBatchRollsBackOnError(self):
+        with self.assertRaises(ValueError):
+            with storage.batch():
+                User()
+                raise ValueError
+        self.assertEqual(storage.count(User), 1)
+
+    def testNestedBatchRollsBackItsOwnChanges(self):
+        p1 = Place()
+        p1.city_id = "c1"
+        p1.save()
+        storage.begin()
+        u2 = User()
+        self.u1.first_name = "Ada"
+        with self.assertRaises(ValueError):
+            with storage.batch():
+                User()
+                u3 = User()
+                u2.last_name = "Lovelace"
+                self.u1.first_name = "Grace"
+                storage.delete(p1)
+                raise ValueError
+        self.assertTrue(storage.in_batch())
+        self.assertIsNone(storage.get(User, u3.id))
+        self.assertEqual(storage.get(User, self.u1.id).first_name, "Ada")
+        self.assertNotIn("last_name", storage.get(User, u2.id).to_dict())
+        self.assertEqual(storage.get(Place, p1.id).to_dict(), p1.to_dict())
+        self.assertEqual(list(storage.lookup(Place, "city_id", "c1")),
+                         ["Place.{}".format(p1.id)])
+        self.assertEqual(storage.count(), 3)
+        storage.rollback()
+        self.assertIsNone(storage.get(User, u2.id))
+        self.assertEqual(storage.get(User, self.u1.id).first_name, "")
+
+    def testNestedBatchCommitKeepsOuterSavepoint(self):
+        storage.begin()
+        storage.begin()
+        with self.assertRaises(ValueError):
+            with storage.batch():
+                storage.begin()
+                self.u1.first_name = "Ada"
+                storage.commit()
+                raise ValueError
+        self.assertEqual(storage.get(User, self.u1.id).first_name, "")
+        self.assertTrue(storage.in_batch())
+
+    def testBeginSavesPendingChanges(self):
+        self.u1.first_name = "Ada"
+        storage.begin()
+        storage.rollback()
+        self.assertEqual(storage.get(User, self.u1.id).first_name, "Ada")
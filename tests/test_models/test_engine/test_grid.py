@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+Unittest for models.engine.grid([..])
+
+This module contains the required tests for the specified module
+"""
+import unittest
+import models.engine.grid
+from models.engine.grid import Grid
+
+
+class TestAllGridDocstrings(unittest.TestCase):
+    def testModuleDocstring(self):
+        self.assertGreater(len(models.engine.grid.__doc__), 1)
+
+    def testClassDocstring(self):
+        self.assertGreater(len(Grid.__doc__), 1)
+
+
+class TestGridClass(unittest.TestCase):
+    def setUp(self):
+        self.records = {"sf": (37.77, -122.42), "oak": (37.80, -122.27),
+                        "fiji": (-17.7, 179.95), "none": (None, 1.0),
+                        "nan": (float("nan"), 1.0)}
+        self.grid = Grid(self.records, ("lat", "lon"), self.field, 1.0)
+
+    def field(self, key, name):
+        return self.records[key][("lat", "lon").index(name)]
+
+    def testCells(self):
+        self.assertEqual(self.grid.cells,
+                         {(37, -123): {"sf": None, "oak": None},
+                          (-18, 179): {"fiji": None}})
+
+    def testCell(self):
+        self.assertEqual(self.grid.cell(-0.5, 0.5), (-1, 0))
+        self.assertIsNone(self.grid.cell("1", 0))
+        self.assertIsNone(self.grid.cell(1, float("nan")))
+
+    def testKeys(self):
+        self.assertEqual(sorted(self.grid.keys(37, -123, 38, -122)),
+                         ["oak", "sf"])
+        self.assertEqual(self.grid.keys(0, 0, 10, 10), [])
+
+    def testKeysAcrossAntimeridian(self):
+        self.assertEqual(self.grid.keys(-20, 179, -10, -179), ["fiji"])
+
+    def testKeysClamped(self):
+        self.assertEqual(sorted(self.grid.keys(-1e300, -1e300, 1e300,
+                                               1e300)),
+                         ["fiji", "oak", "sf"])
+
+    def testAddAndDiscard(self):
+        self.grid.discard("sf", 37.77, -122.42)
+        self.grid.discard("fiji", -17.7, 179.95)
+        self.grid.discard("none", None, 1.0)
+        self.grid.add("none", 1.5, 1.5)
+        self.assertEqual(self.grid.cells,
+                         {(37, -123): {"oak": None}, (1, 1): {"none": None}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""
+Unittest for models.engine.ranges([..])
+
+This module contains the required tests for the specified module
+"""
+import unittest
+import models.engine.ranges
+from models.engine.ranges import Ranges
+
+
+class TestAllRangesDocstrings(unittest.TestCase):
+    def testModuleDocstring(self):
+        self.assertGreater(len(models.engine.ranges.__doc__), 1)
+
+    def testClassDocstring(self):
+        self.assertGreater(len(Ranges.__doc__), 1)
+
+
+class TestRangesClass(unittest.TestCase):
+    def setUp(self):
+        self.records = {"a": {"price": 10}, "b": {"price": 2.5},
+                        "c": {"price": None}, "d": {"price": 10},
+                        "e": {"price": float("nan")}}
+        self.ranges = Ranges(self.records, ("price",), self.field)
+
+    def field(self, key, name):
+        return self.records[key][name]
+
+    def select(self, bounds):
+        count, keys = self.ranges.select("price", bounds)
+        return count, list(keys)
+
+    def testIndexes(self):
+        self.assertEqual(self.ranges.indexes,
+                         {"price": [(2.5, "b"), (10, "a"), (10, "d")]})
+
+    def testSortable(self):
+        self.assertTrue(Ranges.sortable(1))
+        self.assertTrue(Ranges.sortable(1.5))
+        self.assertFalse(Ranges.sortable(float("nan")))
+        self.assertFalse(Ranges.sortable("1"))
+        self.assertFalse(Ranges.sortable(None))
+
+    def testSelect(self):
+        self.assertEqual(self.select([]), (3, ["b", "a", "d"]))
+        self.assertEqual(self.select([("eq", 10)]), (2, ["a", "d"]))
+        self.assertEqual(self.select([("lt", 10)]), (1, ["b"]))
+        self.assertEqual(self.select([("lte", 10)]), (3, ["b", "a", "d"]))
+        self.assertEqual(self.select([("gt", 2.5)]), (2, ["a", "d"]))
+        self.assertEqual(self.select([("gte", 2.5), ("lt", 10)]),
+                         (1, ["b"]))
+
+    def testEmptySelect(self):
+        self.assertEqual(self.select([("gt", 10)]), (0, []))
+        self.assertEqual(self.select([("gt", 10), ("lt", 2.5)]), (0, []))
+
+    def testInsertAndRemove(self):
+        self.ranges.insert("price", 5, "c")
+        self.ranges.remove("price", 10, "a")
+        self.ranges.remove("price", 3, "b")
+        self.ranges.insert("price", None, "e")
+        self.assertEqual(self.select([("gte", 0)]), (3, ["b", "c", "d"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
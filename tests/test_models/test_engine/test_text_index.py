@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+"""
+Unittest for models.engine.text_index([..])
+
+This module contains the required tests for the specified module
+"""
+import unittest
+import models.engine.text_index
+from models.engine.text_index import TextIndex
+
+
+class TestAllTextIndexDocstrings(unittest.TestCase):
+    def testModuleDocstring(self):
+        self.assertGreater(len(models.engine.text_index.__doc__), 1)
+
+    def testClassDocstring(self):
+        self.assertGreater(len(TextIndex.__doc__), 1)
+
+
+class TestTextIndexClass(unittest.TestCase):
+    def setUp(self):
+        self.records = {"a": {"text": "Quiet room, quiet street"},
+                        "b": {"text": "Loud street"},
+                        "c": {"text": None}}
+        self.index = TextIndex(self.records, ("text",), self.field)
+
+    def field(self, key, name):
+        return self.records[key][name]
+
+    def testWords(self):
+        self.assertEqual(self.index.words,
+                         {"quiet": {"a": 2}, "room": {"a": 1},
+                          "street": {"a": 1, "b": 1}, "loud": {"b": 1}})
+
+    def testSearch(self):
+        self.assertEqual(self.index.search("QUIET", 3), ["a"])
+        self.assertEqual(self.index.search("loud street", 3), ["b", "a"])
+        self.assertEqual(self.index.search("street", 3, limit=1), ["a"])
+        self.assertEqual(self.index.search("nothing", 3), [])
+
+    def testPrefixSearch(self):
+        self.assertEqual(self.index.search("ro*", 3), ["a"])
+        self.index.add("Roof", "b")
+        self.assertEqual(sorted(self.index.search("ro*", 3)), ["a", "b"])
+
+    def testAddAndDiscard(self):
+        self.index.discard("Quiet room", "a")
+        self.index.discard("Loud", "b")
+        self.index.add("quiet", "c")
+        self.assertEqual(self.index.words,
+                         {"quiet": {"a": 1, "c": 1},
+                          "street": {"a": 1, "b": 1}})
+
+    def testDumpAndLoad(self):
+        positions = {}
+        words = self.index.dump(positions)
+        self.assertEqual(positions, {"a": 0, "b": 1})
+        self.assertEqual(words["street"], [0, 1, 1, 1])
+        index = TextIndex.load(words, list(positions))
+        self.assertEqual(index.words, self.index.words)
+        self.assertEqual(index.search("quiet", 3), ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
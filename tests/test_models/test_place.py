@@ -24,8 +24,9 @@ def setUpModule():
 
 def tearDownModule():
     FileStorage._FileStorage__objects = {}
-    if os.path.exists("file.json"):
-        os.remove("file.json")
+    for fname in ("file.json", "file.json.1"):
+        if os.path.exists(fname):
+            os.remove(fname)
 
 
 class TestAllPlaceDocstrings(unittest.TestCase):
@@ -175,6 +176,27 @@ class TestPlaceClassAttributes(unittest.TestCase):
         self.assertNotEqual(self.p0.amenity_ids, Place.amenity_ids)
         self.assertEqual(Place.amenity_ids, [])
 
+    def testAmenityIdsOwnedByInstance(self):
+        p1 = Place()
+        p2 = Place()
+        p1.amenity_ids.append("wifi")
+        self.assertEqual(p1.amenity_ids, ["wifi"])
+        self.assertEqual(p2.amenity_ids, [])
+        self.assertEqual(Place.amenity_ids, [])
+
+
+class TestDefaultsMethod(unittest.TestCase):
+    def testDefaults(self):
+        self.assertEqual(Place.defaults(),
+                         {'city_id': '', 'user_id': '', 'name': '',
+                          'description': '', 'number_rooms': 0,
+                          'number_bathrooms': 0, 'max_guest': 0,
+                          'price_by_night': 0, 'latitude': 0.0,
+                          'longitude': 0.0, 'amenity_ids': []})
+
+    def testBaseModelDefaults(self):
+        self.assertEqual(BaseModel.defaults(), {})
+
 
 class TestStrMethod(unittest.TestCase):
     def testStr(self):
@@ -221,7 +243,9 @@ class TestSaveMethod(unittest.TestCase):
         self.assertEqual(type(p1.updated_at), datetime.datetime)
         self.assertGreater(p1.updated_at, prev_time)
 
-    def testSaveToStorage(self):
+    @patch("os.replace")
+    @patch("os.fsync")
+    def testSaveToStorage(self, mock_fsync, mock_replace):
         p1 = Place()
         p1.city_id = str(uuid.uuid4())
         p1.user_id = str(uuid.uuid4())
@@ -239,7 +263,8 @@ class TestSaveMethod(unittest.TestCase):
             p1.save()
             f_dict = {k: v.to_dict() for k, v in zip(al_k, all_o.values())}
             fcontent = json.dumps(f_dict)
-            mock_f.assert_called_once_with(fname, 'w', encoding='utf-8')
+            mock_f.assert_called_once_with(fname + '.tmp', 'w',
+                                           encoding='utf-8')
         self.assertEqual(type(p1.updated_at), datetime.datetime)
         self.assertGreater(p1.updated_at, prev_time)
 
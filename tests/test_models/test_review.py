@@ -24,8 +24,9 @@ def setUpModule():
 
 def tearDownModule():
     FileStorage._FileStorage__objects = {}
-    if os.path.exists("file.json"):
-        os.remove("file.json")
+    for fname in ("file.json", "file.json.1"):
+        if os.path.exists(fname):
+            os.remove(fname)
 
 
 class TestAllReviewDocstrings(unittest.TestCase):
@@ -141,7 +142,9 @@ class TestSaveMethod(unittest.TestCase):
         self.assertEqual(type(r1.updated_at), datetime.datetime)
         self.assertGreater(r1.updated_at, prev_time)
 
-    def testSaveToStorage(self):
+    @patch("os.replace")
+    @patch("os.fsync")
+    def testSaveToStorage(self, mock_fsync, mock_replace):
         r1 = Review()
         r1.place_id = str(uuid.uuid4())
         r1.user_id = str(uuid.uuid4())
@@ -154,7 +157,8 @@ class TestSaveMethod(unittest.TestCase):
             r1.save()
             f_dict = {k: v.to_dict() for k, v in zip(al_k, all_o.values())}
             fcontent = json.dumps(f_dict)
-            mock_f.assert_called_once_with(fname, 'w', encoding='utf-8')
+            mock_f.assert_called_once_with(fname + '.tmp', 'w',
+                                           encoding='utf-8')
         self.assertEqual(type(r1.updated_at), datetime.datetime)
         self.assertGreater(r1.updated_at, prev_time)
 